@@ -38,6 +38,7 @@ sys.path.insert(0, str(_WORKSPACE))
 
 from lib.shared_state import (
     WorkItem, load_item, list_items, pending_hooks,
+    drain_memory_outbox, memory_outbox_pending,
     STATE_DIR, HOOKS_DIR, _now_iso, _append_jsonl, _read_jsonl,
 )
 
@@ -110,11 +111,12 @@ def run_sanity_check(wi: WorkItem) -> Dict[str, Any]:
     else:
         verdict = "warn"
 
-    # Write findings/followups back to the WorkItem
-    for issue in issues:
-        wi.add_finding(f"[sanity-check] {issue}", author="sanity-check")
-    for fu in followups:
-        wi.add_followup(fu, author="sanity-check")
+    # Write findings/followups back to the WorkItem (one append per file)
+    with wi.batch():
+        for issue in issues:
+            wi.add_finding(f"[sanity-check] {issue}", author="sanity-check")
+        for fu in followups:
+            wi.add_followup(fu, author="sanity-check")
 
     return {"verdict": verdict, "issues": issues, "followups": followups}
 
@@ -293,6 +295,8 @@ def scan_and_evolve(dry_run: bool = False) -> List[Dict[str, Any]]:
     for slug in scan_pending():
         result = run_evolution(slug, dry_run=dry_run)
         results.append(result)
+    if not dry_run:
+        drain_memory_outbox()  # best-effort; a failed batch is retried next scan
     return results
 
 
@@ -325,6 +329,9 @@ def main() -> None:
     # status
     p = sub.add_parser("status", help="Show evolution state")
 
+    # drain-memory
+    p = sub.add_parser("drain-memory", help="Store queued work-item summaries in agent-memory")
+
     args = parser.parse_args()
 
     if args.command == "run":
@@ -366,6 +373,13 @@ def main() -> None:
         print(f"Last scan: {state.get('last_scan', 'never')}")
         pending = scan_pending()
         print(f"Pending: {len(pending)} items")
+        print(f"Memory outbox: {memory_outbox_pending()} queued")
+
+    elif args.command == "drain-memory":
+        result = drain_memory_outbox()
+        print(json.dumps(result, indent=2))
+        if result["status"] == "error":
+            sys.exit(1)
 
 
 if __name__ == "__main__":
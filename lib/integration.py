@@ -44,7 +44,12 @@ def _run(script_path: str, args: List[str], timeout: int = 60) -> Dict[str, Any]
 
 
 def _memory(args: List[str], timeout: int = 60) -> Dict[str, Any]:
-    return _run("skills/agent-memory/scripts/memory.py", args, timeout)
+    """Run a memory command via memory_client (resident server if running)."""
+    from lib.memory_client import _run_memory_cmd
+    try:
+        return _run_memory_cmd(args, timeout)
+    except RuntimeError as e:
+        return {"status": "error", "error": str(e)}
 
 
 def _guardrails(args: List[str], timeout: int = 10) -> Dict[str, Any]:
@@ -69,6 +74,20 @@ def recall_context(query: str, limit: int = 5) -> List[Dict[str, Any]]:
     return result.get("results", [])
 
 
+def recall_contexts(queries: List[str], limit: int = 5) -> List[List[Dict[str, Any]]]:
+    """Recall context for several queries in one memory call.
+
+    Same results as calling :func:`recall_context` per query, but the queries
+    are embedded together and the store is scanned once.
+    Returns one result list per query (empty lists on error).
+    """
+    if not queries:
+        return []
+    result = _memory(["recall-batch", "--limit", str(limit), "--"] + list(queries))
+    batches = result.get("batches") or [{} for _ in queries]
+    return [b.get("results", []) for b in batches]
+
+
 def remember_outcome(
     text: str,
     skill: str,
@@ -136,21 +155,38 @@ def safe_log(action: str, tier: str, decision: str, target: Optional[str] = None
 # 2A. Unified Search (enterprise-search fan-out)
 # ---------------------------------------------------------------------------
 
+def _memory_hits(results: List[Dict[str, Any]], trace_id: str) -> List[Dict[str, Any]]:
+    """Shape memory recall results as unified-search hits."""
+    return [
+        {
+            "source": "memory",
+            "title": r.get("content", "")[:80],
+            "score": r.get("score", 0),
+            "type": r.get("type", ""),
+            "date": r.get("created_at", ""),
+            "trace_id": trace_id,
+        }
+        for r in results
+    ]
+
+
 def unified_search(
     query: str,
     sources: Optional[List[str]] = None,
     limit: int = 10,
+    trace_id: Optional[str] = None,
 ) -> Dict[str, List[Dict[str, Any]]]:
     """Search across multiple sources simultaneously.
     
     Sources: "email", "memory", "tasks". Defaults to all available.
     Returns dict keyed by source name, each with list of results.
+    Pass *trace_id* to tag hits from a composed workflow with one id.
     """
     if sources is None:
         sources = ["email", "memory"]
 
     results: Dict[str, List[Dict[str, Any]]] = {}
-    trace_id = str(uuid.uuid4())[:8]
+    trace_id = trace_id or str(uuid.uuid4())[:8]
 
     if "email" in sources:
         email_result = _email(["search", query, "--limit", str(limit)])
@@ -171,17 +207,7 @@ def unified_search(
     if "memory" in sources:
         memory_result = _memory(["recall", query, "--limit", str(limit)])
         if memory_result.get("status") != "error":
-            results["memory"] = [
-                {
-                    "source": "memory",
-                    "title": r.get("content", "")[:80],
-                    "score": r.get("score", 0),
-                    "type": r.get("type", ""),
-                    "date": r.get("created_at", ""),
-                    "trace_id": trace_id,
-                }
-                for r in memory_result.get("results", [])
-            ]
+            results["memory"] = _memory_hits(memory_result.get("results", []), trace_id)
 
     return results
 
@@ -279,19 +305,24 @@ def customer_research(customer_name: str, issue: Optional[str] = None) -> Dict[s
     Used by customer-support/research command.
     """
     query = f"{customer_name} {issue or ''}".strip()
+    trace_id = str(uuid.uuid4())[:8]
 
-    # Fan-out search
-    search_results = unified_search(query, sources=["email", "memory"])
-
-    # Recall any stored customer context
-    customer_memories = recall_context(f"customer {customer_name}", limit=3)
+    # Fan-out search (email), plus both memory recalls in one batch:
+    # the search query and any stored customer context
+    search_results = unified_search(query, sources=["email"], trace_id=trace_id)
+    batch = _memory(["recall-batch", "--limit", "10", "--", query, f"customer {customer_name}"])
+    if batch.get("status") != "error":
+        search_memories, customer_memories = (b.get("results", []) for b in batch["batches"])
+        search_results["memory"] = _memory_hits(search_memories, trace_id)
+    else:
+        customer_memories = []
 
     return {
         "customer": customer_name,
         "issue": issue,
         "email_results": search_results.get("email", []),
         "memory_results": search_results.get("memory", []),
-        "customer_context": customer_memories,
+        "customer_context": customer_memories[:3],
         "sources_searched": list(search_results.keys()),
     }
 
@@ -303,9 +334,9 @@ def deal_review_context(company: str, deal_details: Optional[str] = None) -> Dic
     """
     query = f"{company} {deal_details or 'deal contract'}".strip()
 
-    legal_context = recall_context(f"[legal] {company}", limit=3)
-    sales_context = recall_context(f"[sales] {company}", limit=3)
-    finance_context = recall_context(f"[finance] {company}", limit=3)
+    legal_context, sales_context, finance_context = recall_contexts(
+        [f"[legal] {company}", f"[sales] {company}", f"[finance] {company}"], limit=3
+    )
     email_context = unified_search(f"{company} contract", sources=["email"])
 
     return {
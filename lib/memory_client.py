@@ -1,21 +1,28 @@
 #!/usr/bin/env python3
 """
-memory_client.py — Thin subprocess wrapper for agent-memory.
+memory_client.py — Thin client for agent-memory.
 
 Provides a simple Python API for any skill to read/write the shared
 vector memory store without importing agent-memory internals.
 
+Calls go to the resident server (skills/agent-memory/scripts/server.py)
+when it is listening, which keeps the embedding model warm between calls.
+Otherwise each call falls back to a fresh ``memory.py`` subprocess.
+
 Usage:
     from lib.memory_client import remember, recall
 
     remember("Rebuilt email-manager with UID mode", importance=0.8)
     results = recall("email client changes", limit=3)
+    legal, sales = recall_batch(["[legal] Acme", "[sales] Acme"], limit=3)
+    ingest("state/outbox.jsonl")  # many memories, one embedding pass
 """
 
 from __future__ import annotations
 
 import json
 import os
+import socket
 import subprocess
 import sys
 from typing import Any, Dict, List, Optional
@@ -25,11 +32,66 @@ _WORKSPACE = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
 _MEMORY_SCRIPT = os.path.join(
     _WORKSPACE, "skills", "agent-memory", "scripts", "memory.py"
 )
+# Commands that only read the store: if the server is too slow to answer
+# them, running them again in a subprocess is safe (at worst an access
+# is counted twice).
+_READ_ONLY_COMMANDS = ("recall", "recall-batch", "timeline", "stats")
+
+# Must match DEFAULT_SOCKET_PATH in skills/agent-memory/scripts/utils.py
+_SOCKET_PATH = os.environ.get(
+    "AGENT_MEMORY_SOCKET",
+    os.path.join(
+        os.environ.get("AGENT_MEMORY_DIR", os.path.join(_WORKSPACE, "memory")),
+        "agent_memory.sock",
+    ),
+)
+
+
+def _run_via_server(args: List[str], timeout: int) -> Optional[Dict[str, Any]]:
+    """Send a subcommand to the resident server.
+
+    Returns:
+        Dict with returncode/stdout/stderr, or None if no server is
+        listening (the caller then falls back to a subprocess).
+
+    Raises:
+        RuntimeError: If the server accepted the request but failed to
+            answer — retrying via subprocess could apply a write twice.
+    """
+    if not os.path.exists(_SOCKET_PATH):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(_SOCKET_PATH)
+        except OSError:
+            return None  # stale socket file or server not accepting
+
+        try:
+            request = {"args": args, "timeout": timeout}
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            with sock.makefile("r", encoding="utf-8") as f:
+                line = f.readline()
+        except socket.timeout:
+            raise RuntimeError(f"memory server timed out after {timeout}s: {' '.join(args)}")
+        except OSError as exc:
+            raise RuntimeError(f"memory server connection lost: {exc}")
+    finally:
+        sock.close()
+
+    if not line:
+        raise RuntimeError(f"memory server closed the connection: {' '.join(args)}")
+    return json.loads(line)
 
 
 def _run_memory_cmd(args: List[str], timeout: int = 60) -> Dict[str, Any]:
     """Execute a memory.py subcommand and return parsed JSON output.
 
+    Uses the resident server when available, otherwise a subprocess.
+    Read-only commands also fall back to a subprocess if the server does
+    not answer in time (e.g. it is busy with a long ingest).
+
     Args:
         args: Arguments to pass to memory.py (e.g. ["remember", "text"]).
         timeout: Max seconds to wait (embedding can be slow on first load).
@@ -40,6 +102,17 @@ def _run_memory_cmd(args: List[str], timeout: int = 60) -> Dict[str, Any]:
     Raises:
         RuntimeError: If the command fails or returns invalid JSON.
     """
+    try:
+        reply = _run_via_server(args, timeout)
+    except RuntimeError:
+        if args[0] not in _READ_ONLY_COMMANDS:
+            raise
+        reply = None
+    if reply is not None:
+        return _parse_output(
+            args, reply.get("stdout", ""), reply.get("stderr", ""), reply.get("returncode", 1)
+        )
+
     cmd = [sys.executable, _MEMORY_SCRIPT] + args
 
     try:
@@ -55,14 +128,19 @@ def _run_memory_cmd(args: List[str], timeout: int = 60) -> Dict[str, Any]:
     except FileNotFoundError:
         raise RuntimeError(f"memory.py not found at {_MEMORY_SCRIPT}")
 
+    return _parse_output(args, result.stdout, result.stderr, result.returncode)
+
+
+def _parse_output(args: List[str], stdout: str, stderr: str, returncode: int) -> Dict[str, Any]:
+    """Parse memory.py output, shared by the server and subprocess paths."""
     # memory.py writes errors to stderr as JSON, success to stdout
-    output = result.stdout.strip()
+    output = (stdout or "").strip()
     if not output:
-        output = result.stderr.strip()
+        output = (stderr or "").strip()
 
     if not output:
         raise RuntimeError(
-            f"memory.py returned no output (exit {result.returncode}): {' '.join(args)}"
+            f"memory.py returned no output (exit {returncode}): {' '.join(args)}"
         )
 
     try:
@@ -92,20 +170,131 @@ def remember(
     return _run_memory_cmd(args)
 
 
-def recall(query: str, limit: int = 7) -> List[Dict[str, Any]]:
+def ingest(
+    path: str,
+    memory_type: str = "semantic",
+    batch_size: int = 64,
+    link: bool = False,
+    timeout: int = 600,
+) -> Dict[str, Any]:
+    """Store every memory in a markdown/JSONL file (or directory) in batches.
+
+    JSONL lines are objects with ``content`` and optional ``importance``,
+    ``type`` and ``created_at``.  Much cheaper than one :func:`remember`
+    per item: one call, one embedding pass per batch, one transaction
+    per batch.
+
+    Args:
+        path: File or directory to import.
+        memory_type: Default type for items that do not set one.
+        batch_size: Items embedded and committed together.
+        link: Auto-link the new memories (slower).
+        timeout: Max seconds to wait.
+
+    Returns:
+        Dict with status, files, chunks_imported, edges_created, seconds.
+    """
+    args = ["ingest", path, "--type", memory_type, "--batch-size", str(batch_size), "--quiet"]
+    if link:
+        args.append("--link")
+    return _run_memory_cmd(args, timeout=timeout)
+
+
+def _filter_args(
+    memory_type: Optional[str] = None,
+    min_importance: Optional[float] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    accessed_after: Optional[str] = None,
+    accessed_before: Optional[str] = None,
+    entity: Optional[str] = None,
+) -> List[str]:
+    """CLI flags for the recall filters that are set."""
+    args = []  # type: List[str]
+    if memory_type:
+        args.extend(["--type", memory_type])
+    if min_importance is not None:
+        args.extend(["--min-importance", str(min_importance)])
+    for flag, value in (
+        ("--created-after", created_after),
+        ("--created-before", created_before),
+        ("--accessed-after", accessed_after),
+        ("--accessed-before", accessed_before),
+        ("--entity", entity),
+    ):
+        if value:
+            args.extend([flag, value])
+    return args
+
+
+def recall(
+    query: str,
+    limit: int = 7,
+    mode: str = "auto",
+    memory_type: Optional[str] = None,
+    min_importance: Optional[float] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    accessed_after: Optional[str] = None,
+    accessed_before: Optional[str] = None,
+    entity: Optional[str] = None,
+) -> List[Dict[str, Any]]:
     """Search memories using hybrid vector + graph scoring.
 
+    Filters are applied in SQL before scoring, so only matching memories
+    are ranked (and returned via graph expansion).
+
     Args:
         query: Natural-language search query.
         limit: Max results to return.
+        mode: "auto", "vector", "keyword" (BM25, no model load) or
+            "hybrid" (vector + BM25 reciprocal rank fusion).
+        memory_type: Only "episodic" or "semantic" memories.
+        min_importance: Only memories with importance >= this.
+        created_after: ISO 8601 timestamp or relative age ("7d", "24h").
+        created_before: ISO 8601 timestamp or relative age.
+        accessed_after: ISO 8601 timestamp or relative age.
+        accessed_before: ISO 8601 timestamp or relative age.
+        entity: Only memories mentioning this entity/keyword.
 
     Returns:
         List of scored memory dicts (content, score, type, etc.).
     """
-    result = _run_memory_cmd(["recall", query, "--limit", str(limit)])
+    result = _run_memory_cmd(
+        ["recall", query, "--limit", str(limit), "--mode", mode]
+        + _filter_args(memory_type, min_importance, created_after, created_before,
+                       accessed_after, accessed_before, entity)
+    )
     return result.get("results", [])
 
 
+def recall_batch(
+    queries: List[str],
+    limit: int = 7,
+    mode: str = "auto",
+    **filters: Any,
+) -> List[List[Dict[str, Any]]]:
+    """Run several recalls with one embedding call and one store scan.
+
+    Args:
+        queries: Natural-language search queries.
+        limit: Max results per query.
+        mode: As for :func:`recall`.
+        **filters: Filter keywords of :func:`recall` (memory_type,
+            min_importance, created_after, ...), applied to every query.
+
+    Returns:
+        One list of scored memory dicts per query, in input order.
+    """
+    if not queries:
+        return []
+    result = _run_memory_cmd(
+        ["recall-batch", "--limit", str(limit), "--mode", mode]
+        + _filter_args(**filters) + ["--"] + list(queries)
+    )
+    return [batch.get("results", []) for batch in result.get("batches", [])]
+
+
 def forget(memory_id: str) -> Dict[str, Any]:
     """Soft-delete a memory by ID.
 
@@ -5,6 +5,40 @@ shared_state.py — Shared state for multi-agent skill coordination.
 Provides a WorkItem abstraction with append-only JSONL storage,
 agent-memory indexing, and event hooks for sanity-check/reflect/lifecycle.
 
+Loading an item does not replay its whole log: every SNAPSHOT_EVERY
+events the reduced state is saved to ``snapshots/<slug>.json`` together
+with the byte offset of the log it covers, and a load replays only the
+events after that offset.  ``compact_item`` moves old events to
+``archive/<slug>.jsonl`` and starts the log with a ``checkpoint`` event
+carrying the state, so the logs themselves stay short.
+
+``list_items`` and ``dependency_graph`` read ``index/items.db`` — a
+SQLite table with one row per item (status, project, skill,
+dependencies, timestamps, log offset) — instead of loading every item;
+filters, order and pagination run in SQL.  ``_emit`` upserts the item's
+row unless the row already reflects more of the same log.  Logs changed
+behind its back (another checkout, a compaction) are replaced or created
+by rename, which changes the ``work_items`` directory's mtime: only then
+does a listing ``stat`` every log and rebuild the rows whose mtime or
+size differ.  Rows written while another agent was appending are marked
+stale and rebuilt by the next listing.
+
+The hook bus (``hooks/<event>.jsonl``) rotates into ``hooks/segments/``
+at HOOK_SEGMENT_BYTES and drops segments after HOOK_RETENTION_DAYS.
+A ``HookConsumer`` reads it from a persisted byte offset, so each poll
+costs only the new bytes, and advances that offset only when the
+consumer acks (at-least-once delivery).
+
+All appends take an exclusive flock on the target file and write each
+batch of records with one ``os.write``, so concurrent agents never
+interleave partial lines.  ``with wi.batch():`` buffers an item's events
+and writes them as one append per file.
+
+Agent-memory indexing is asynchronous: significant events append a
+summary to ``state/memory_outbox.jsonl``, and ``drain_memory_outbox``
+(run by the evolution loop) stores the queued summaries, one per slug,
+with a single batched ingest.
+
 Usage:
     from lib.shared_state import WorkItem, list_items, load_item
 
@@ -24,6 +58,11 @@ Usage:
     wi.add_artifact({"type": "file", "label": "auth.py", "path": "src/auth.py"})
     wi.record_metric({"name": "test_coverage", "value": 87, "unit": "%"})
     wi.record_test({"name": "test_refresh", "status": "pass"})
+
+    # Bulk telemetry: one write instead of one per event
+    with wi.batch():
+        for run in results:
+            wi.record_test(run)
     wi.add_finding("Refresh tokens should expire in 7 days, not 30")
     wi.complete()
 
@@ -34,23 +73,64 @@ Usage:
     # List all
     for item in list_items(status="in_progress"):
         print(item.slug, item.title)
+
+    # Ten most recently updated
+    recent = list_items(order_by="updated_at", limit=10)
+
+    # Fold long histories into the archive
+    compact_item("backend-refresh-endpoint")
+
+    # Consume hook events with a durable cursor
+    consumer = HookConsumer("sanity-check", "completed")
+    for event in wait_for_hooks(consumer, timeout=60):
+        handle(event)
+    consumer.ack()
 """
 
 from __future__ import annotations
 
+import fcntl
 import hashlib
 import json
 import os
 import re
+import sqlite3
 import sys
+import time
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # Resolve workspace root
 _WORKSPACE = Path(os.path.realpath(os.path.join(os.path.dirname(__file__), "..")))
 STATE_DIR = _WORKSPACE / "state" / "work_items"
 HOOKS_DIR = _WORKSPACE / "state" / "hooks"
+SNAPSHOT_DIR = STATE_DIR / "snapshots"
+ARCHIVE_DIR = STATE_DIR / "archive"
+INDEX_DIR = STATE_DIR / "index"
+INDEX_PATH = INDEX_DIR / "items.db"
+HOOK_SEGMENTS_DIR = HOOKS_DIR / "segments"
+HOOK_CURSORS_DIR = HOOKS_DIR / "cursors"
+MEMORY_OUTBOX = _WORKSPACE / "state" / "memory_outbox.jsonl"
+
+# Events replayed past the last snapshot before a new one is written
+SNAPSHOT_EVERY = 100
+SNAPSHOT_VERSION = 2
+INDEX_VERSION = 3
+
+# list_items(order_by=...) choices
+LIST_ORDERS = ("slug", "updated_at")
+
+# compact_all() leaves logs with fewer events than this alone
+COMPACT_MIN_EVENTS = 500
+
+# Hook bus: active file size that triggers rotation, age at which
+# rotated segments are deleted, and wait_for_hooks poll backoff (seconds)
+HOOK_SEGMENT_BYTES = 4 * 1024 * 1024
+HOOK_RETENTION_DAYS = 30
+HOOK_POLL_MIN = 0.05
+HOOK_POLL_MAX = 2.0
 
 # Valid statuses
 STATUSES = ("todo", "in_progress", "blocked", "review", "done", "failed")
@@ -60,6 +140,7 @@ EVENT_TYPES = (
     "created", "started", "status_change", "dependency_added",
     "artifact_added", "metric_recorded", "test_recorded",
     "finding_added", "followup_added", "handoff", "completed", "failed",
+    "checkpoint",
 )
 
 
@@ -85,10 +166,56 @@ def _short_hash(text: str) -> str:
     return hashlib.sha256(text.encode()).hexdigest()[:6]
 
 
+@contextmanager
+def _locked_append(path: Path) -> Iterator[int]:
+    """Open *path* for appending under an exclusive flock; yields the fd.
+
+    If the file was replaced (compacted, rotated) while we waited for the
+    lock, the lock is retaken on the new file, so no record lands in an
+    unlinked inode.
+    """
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(fd).st_ino:
+                yield fd
+                return
+        finally:
+            os.close(fd)  # also releases the lock
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write *data* with as few write(2) calls as the kernel allows (usually one)."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _encode_records(records: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(r, default=str) + "\n" for r in records).encode()
+
+
+def _append_records(path: Path, records: List[Dict[str, Any]]) -> None:
+    """Append JSON records to a JSONL file as one locked write.
+
+    Concurrent writers cannot interleave partial lines, and a batch costs
+    one open/flock/write/close regardless of its size.
+    """
+    if not records:
+        return
+    data = _encode_records(records)
+    with _locked_append(path) as fd:
+        _write_all(fd, data)
+
+
 def _append_jsonl(path: Path, record: Dict[str, Any]) -> None:
     """Append a single JSON record to a JSONL file."""
-    with open(path, "a") as f:
-        f.write(json.dumps(record, default=str) + "\n")
+    _append_records(path, [record])
 
 
 def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
@@ -107,126 +234,567 @@ def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
     return records
 
 
+def _read_events_from(path: Path, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """Read complete records starting at byte *offset*.
+
+    A trailing line without a newline (an append still in progress) is left
+    for the next read.
+
+    Returns:
+        (records, offset just past the last complete line)
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].decode("utf-8", "replace").splitlines():
+        line = line.strip()
+        if line:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records, offset + end
+
+
+def _log_head(path: Path) -> str:
+    """Fingerprint of a log's first line; changes when the log is rewritten."""
+    with open(path, "rb") as f:
+        return _short_hash(f.readline(65536).decode("utf-8", "replace"))
+
+
+def _initial_state(slug: str) -> Dict[str, Any]:
+    return {
+        "slug": slug,
+        "title": "",
+        "project": "",
+        "source_task_id": "",
+        "intent": {"goal": "", "success_criteria": [], "constraints": []},
+        "lifecycle": {
+            "status": "todo",
+            "assignee_skill": None,
+            "orchestrator_workflow": None,
+            "timestamps": {},
+        },
+        "dependencies": {"blockers": [], "dependents": []},
+        "telemetry": {"metrics": [], "tests": [], "logs": []},
+        "artifacts": [],
+        "lessons": {"findings": [], "followups": []},
+    }
+
+
+def _apply_event(state: Dict[str, Any], ev: Dict[str, Any]) -> None:
+    """Fold one event into *state* (the WorkItem reducer)."""
+    etype = ev.get("event", "")
+    payload = ev.get("payload", {})
+    ts = ev.get("timestamp", "")
+
+    if etype == "checkpoint":
+        state.clear()
+        state.update(payload.get("state", {}))
+        return
+    state["lifecycle"]["timestamps"]["updated_at"] = ts
+
+    if etype == "created":
+        state["title"] = payload.get("title", "")
+        state["project"] = payload.get("project", "")
+        state["source_task_id"] = payload.get("source_task_id", "")
+        state["intent"] = payload.get("intent", state["intent"])
+        state["lifecycle"]["assignee_skill"] = payload.get("assignee_skill")
+        state["lifecycle"]["timestamps"]["created_at"] = ts
+        if payload.get("status"):
+            state["lifecycle"]["status"] = payload["status"]
+    elif etype == "started":
+        state["lifecycle"]["status"] = "in_progress"
+        state["lifecycle"]["timestamps"]["started_at"] = ts
+        if payload.get("assignee_skill"):
+            state["lifecycle"]["assignee_skill"] = payload["assignee_skill"]
+    elif etype == "status_change":
+        state["lifecycle"]["status"] = payload.get("status", state["lifecycle"]["status"])
+        if payload.get("status") == "done":
+            state["lifecycle"]["timestamps"]["completed_at"] = ts
+    elif etype == "completed":
+        state["lifecycle"]["status"] = "done"
+        state["lifecycle"]["timestamps"]["completed_at"] = ts
+    elif etype == "failed":
+        state["lifecycle"]["status"] = "failed"
+        state["lifecycle"]["timestamps"]["completed_at"] = ts
+    elif etype == "artifact_added":
+        art = payload.get("artifact", {})
+        if art:
+            state["artifacts"].append(art)
+    elif etype == "metric_recorded":
+        m = payload.get("metric", {})
+        if m:
+            state["telemetry"]["metrics"].append(m)
+    elif etype == "test_recorded":
+        t = payload.get("test", {})
+        if t:
+            state["telemetry"]["tests"].append(t)
+    elif etype == "finding_added":
+        f = payload.get("finding", "")
+        if f:
+            state["lessons"]["findings"].append(f)
+    elif etype == "followup_added":
+        f = payload.get("followup", "")
+        if f:
+            state["lessons"]["followups"].append(f)
+    elif etype == "dependency_added":
+        dep = payload.get("dependency", {})
+        if dep.get("blocker"):
+            bl = dep["blocker"]
+            if bl not in state["dependencies"]["blockers"]:
+                state["dependencies"]["blockers"].append(bl)
+        if dep.get("dependent"):
+            d = dep["dependent"]
+            if d not in state["dependencies"]["dependents"]:
+                state["dependencies"]["dependents"].append(d)
+    elif etype == "handoff":
+        if payload.get("to_skill"):
+            state["lifecycle"]["assignee_skill"] = payload["to_skill"]
+        if payload.get("workflow_id"):
+            state["lifecycle"]["orchestrator_workflow"] = payload["workflow_id"]
+
+
+def _load_snapshot(slug: str, path: Path, size: int) -> Optional[Dict[str, Any]]:
+    """Return the saved snapshot for *slug* if it still describes its log."""
+    try:
+        with open(SNAPSHOT_DIR / f"{slug}.json") as f:
+            snap = json.load(f)
+    except (OSError, ValueError):
+        return None
+    offset = snap.get("offset", 0)
+    if (snap.get("version") != SNAPSHOT_VERSION or not 0 < offset <= size
+            or snap.get("head") != _log_head(path)):
+        return None  # log rewritten (compacted, checked out) since
+    return snap
+
+
+def _save_snapshot(slug: str, path: Path, state: Dict[str, Any], offset: int) -> None:
+    """Atomically write the snapshot of *state* covering *offset* bytes."""
+    try:
+        SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+        target = SNAPSHOT_DIR / f"{slug}.json"
+        tmp = target.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp, "w") as f:
+            json.dump({
+                "version": SNAPSHOT_VERSION,
+                "offset": offset,
+                "head": _log_head(path),
+                "state": state,
+            }, f, default=str)
+        os.replace(tmp, target)
+    except OSError:
+        pass  # Snapshots are a cache; the log stays authoritative
+
+
+_INDEX_SQL = """
+CREATE TABLE IF NOT EXISTS items (
+    slug            TEXT PRIMARY KEY,
+    status          TEXT,
+    project         TEXT,
+    assignee_skill  TEXT,
+    updated_at      TEXT NOT NULL DEFAULT '',
+    size            INTEGER NOT NULL,
+    mtime_ns        INTEGER NOT NULL,
+    inode           INTEGER NOT NULL,
+    offset          INTEGER NOT NULL,
+    entry           TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_status ON items(status);
+CREATE INDEX IF NOT EXISTS idx_items_project ON items(project);
+CREATE INDEX IF NOT EXISTS idx_items_skill ON items(assignee_skill);
+CREATE INDEX IF NOT EXISTS idx_items_updated ON items(updated_at);
+CREATE INDEX IF NOT EXISTS idx_items_stale ON items(slug) WHERE size = -1;
+CREATE TABLE IF NOT EXISTS meta (
+    key     TEXT PRIMARY KEY,
+    value   TEXT NOT NULL
+);
+"""
+
+_index_conns = {}  # type: Dict[Tuple[int, str], sqlite3.Connection]
+
+
+def _index_db() -> sqlite3.Connection:
+    """This process's connection to the list index, created on first use.
+
+    The database lives in its own directory so its journal files do not
+    touch the ``work_items`` directory's mtime.  A file from another
+    INDEX_VERSION is rebuilt from the logs.
+    """
+    key = (os.getpid(), str(INDEX_PATH))
+    conn = _index_conns.get(key)
+    if conn is not None:
+        return conn
+    INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # Creating the file and switching it to WAL race between processes
+    with open(INDEX_PATH.with_suffix(".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        conn = sqlite3.connect(str(INDEX_PATH), timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS items")
+                conn.execute("DROP TABLE IF EXISTS meta")
+            conn.executescript(_INDEX_SQL)
+            conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            for legacy in ("index.json", "index.lock"):  # INDEX_VERSION 1 files
+                if STATE_DIR / legacy == INDEX_PATH:
+                    continue
+                try:
+                    os.unlink(STATE_DIR / legacy)
+                except OSError:
+                    pass
+    conn.execute("PRAGMA synchronous=NORMAL")  # derived data: a lost commit self-heals
+    _index_conns[key] = conn
+    return conn
+
+
+def _update_index(changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+    """Upsert *changes* (slug → entry, or None to drop) into the index.
+
+    An entry read up to an earlier offset of the same log than its row
+    (an agent that replayed before another one appended and indexed) is
+    not written.
+    """
+    conn = _index_db()
+    with conn:
+        for slug, entry in changes.items():
+            if entry is None:
+                conn.execute("DELETE FROM items WHERE slug = ?", (slug,))
+                continue
+            conn.execute(
+                """INSERT INTO items
+                   (slug, status, project, assignee_skill, updated_at, size, mtime_ns,
+                    inode, offset, entry)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(slug) DO UPDATE SET
+                       status = excluded.status, project = excluded.project,
+                       assignee_skill = excluded.assignee_skill,
+                       updated_at = excluded.updated_at, size = excluded.size,
+                       mtime_ns = excluded.mtime_ns, inode = excluded.inode,
+                       offset = excluded.offset, entry = excluded.entry
+                   WHERE excluded.inode != items.inode OR excluded.offset >= items.offset""",
+                (slug, entry["status"], entry["project"], entry["assignee_skill"],
+                 entry["updated_at"] or "", entry["size"], entry["mtime_ns"],
+                 entry["inode"], entry["offset"], json.dumps(entry, default=str)),
+            )
+
+
 def _publish_hook(event_type: str, event: Dict[str, Any]) -> None:
-    """Write event to hook bus (hooks/<event_type>.jsonl)."""
+    """Write event to hook bus (hooks/<event_type>.jsonl), rotating when full."""
+    _publish_hooks(event_type, [event])
+
+
+def _publish_hooks(event_type: str, events: List[Dict[str, Any]]) -> None:
+    """Append events of one type to the hook bus in one locked write."""
     _ensure_dirs()
     hook_file = HOOKS_DIR / f"{event_type}.jsonl"
-    _append_jsonl(hook_file, event)
+    data = _encode_records(events)
+    with _locked_append(hook_file) as fd:
+        _write_all(fd, data)
+        if os.fstat(fd).st_size >= HOOK_SEGMENT_BYTES:
+            _rotate_hook(event_type)
+
+
+def _hook_segments(event_type: str) -> List[Tuple[int, Path]]:
+    """Rotated segments of a hook stream as (start offset, path), oldest first.
+
+    A segment is named after the stream offset of its first byte, so a
+    consumer's cursor stays valid across rotations.
+    """
+    prefix = f"{event_type}."
+    segments = []
+    try:
+        names = os.listdir(HOOK_SEGMENTS_DIR)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        start = name[len(prefix):-len(".jsonl")]
+        if name.startswith(prefix) and name.endswith(".jsonl") and start.isdigit():
+            segments.append((int(start), HOOK_SEGMENTS_DIR / name))
+    return sorted(segments)
+
+
+def _hook_base(segments: List[Tuple[int, Path]]) -> int:
+    """Stream offset of the active file's first byte."""
+    if not segments:
+        return 0
+    start, path = segments[-1]
+    return start + path.stat().st_size
+
+
+def _rotate_hook(event_type: str) -> None:
+    """Move the active hook file to a segment and prune expired ones.
+
+    Caller holds the active file's lock; appenders waiting on it move on
+    to the new file (see ``_locked_append``).
+    """
+    HOOK_SEGMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    segments = _hook_segments(event_type)
+    base = _hook_base(segments)
+    os.replace(HOOKS_DIR / f"{event_type}.jsonl",
+               HOOK_SEGMENTS_DIR / f"{event_type}.{base:012d}.jsonl")
+    cutoff = time.time() - HOOK_RETENTION_DAYS * 86400
+    for _, path in segments:
+        if path.stat().st_mtime < cutoff:
+            path.unlink()
+
+
+def _read_hook_stream(
+    event_type: str, offset: int = 0, max_events: Optional[int] = None,
+) -> List[Tuple[Dict[str, Any], int]]:
+    """Hook events from stream *offset* on, each with the offset just past it.
+
+    Reads the rotated segments the offset falls in and the active file;
+    an offset into expired segments resumes at the oldest one kept, and
+    one past the end of the stream (hook dir reset) starts over.  Readers
+    do not lock: a rotation during the read is detected and the read
+    retried.
+    """
+    active = HOOKS_DIR / f"{event_type}.jsonl"
+    while True:
+        segments = _hook_segments(event_type)
+        base = _hook_base(segments)
+        records = []  # type: List[Tuple[Dict[str, Any], int]]
+        pos = offset
+        for start, path in segments + [(base, active)]:
+            if max_events is not None and len(records) >= max_events:
+                break
+            try:
+                with open(path, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if pos >= start + size:
+                        continue
+                    pos = max(pos, start)  # expired segments skipped
+                    f.seek(pos - start)
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            for line in data.split(b"\n")[:-1]:  # last piece: partial line or b""
+                pos += len(line) + 1
+                if not line.strip():
+                    continue
+                try:
+                    records.append((json.loads(line.decode("utf-8", "replace")), pos))
+                except json.JSONDecodeError:
+                    continue
+                if max_events is not None and len(records) >= max_events:
+                    break
+        if _hook_segments(event_type) != segments:
+            continue  # rotated while reading; offsets of the active file moved
+        if not records and offset > 0:
+            try:
+                end = base + active.stat().st_size
+            except FileNotFoundError:
+                end = base
+            if offset > end:  # cursor past the end: the bus was reset
+                offset = 0
+                continue
+        return records
 
 
 def _index_to_memory(work_item: "WorkItem") -> None:
-    """Best-effort upsert into agent-memory for semantic recall."""
+    """Queue a summary for agent-memory; ``drain_memory_outbox`` stores it.
+
+    One locked append — the embedding model is only loaded by the drainer,
+    so lifecycle calls do not wait for it.
+    """
+    summary = (
+        f"[work_item:{work_item.slug}] {work_item.title} "
+        f"| status={work_item.status} "
+        f"| skill={work_item.assignee_skill or 'unassigned'} "
+        f"| project={work_item.project or 'none'}"
+    )
     try:
-        from lib.memory_client import remember
-        summary = (
-            f"[work_item:{work_item.slug}] {work_item.title} "
-            f"| status={work_item.status} "
-            f"| skill={work_item.assignee_skill or 'unassigned'} "
-            f"| project={work_item.project or 'none'}"
-        )
-        remember(summary, importance=0.6, memory_type="semantic")
-    except Exception:
+        MEMORY_OUTBOX.parent.mkdir(parents=True, exist_ok=True)
+        _append_jsonl(MEMORY_OUTBOX, {
+            "slug": work_item.slug,
+            "content": summary,
+            "importance": 0.6,
+            "type": "semantic",
+            "queued_at": _now_iso(),
+            "created_at": time.time(),  # the memory keeps the event's time
+        })
+    except OSError:
         pass  # Memory indexing is best-effort
 
 
+def _ingest_outbox_file(path: Path) -> Tuple[int, int]:
+    """Store the summaries queued in *path*, latest per slug, in one ingest.
+
+    Like ``remember``, the ingest links each summary to related memories
+    by shared entities, so work items stay in the memory graph.
+
+    Returns:
+        (records read, memories stored)
+
+    Raises:
+        RuntimeError: If agent-memory rejected the batch.
+    """
+    latest = {}  # type: Dict[str, Dict[str, Any]]
+    records = _read_jsonl(path)
+    for rec in records:
+        latest.pop(rec.get("slug", ""), None)  # re-insert: keeps update order
+        latest[rec.get("slug", "")] = rec
+    if not latest:
+        return len(records), 0
+    from lib.memory_client import ingest
+    batch = path.with_name(path.stem + ".batch.jsonl")
+    with open(batch, "w") as f:
+        for rec in latest.values():
+            f.write(json.dumps({k: rec.get(k) for k in
+                                ("content", "importance", "type", "created_at")}) + "\n")
+    try:
+        result = ingest(str(batch), memory_type="semantic", link=True)
+    finally:
+        batch.unlink()
+    return len(records), result.get("chunks_imported", len(latest))
+
+
+def drain_memory_outbox() -> Dict[str, Any]:
+    """Store queued work-item summaries in agent-memory.
+
+    The outbox is renamed aside under its lock before the (slow) ingest,
+    so producers never wait for it and start a fresh file.  A batch whose
+    ingest failed stays aside and is retried first by the next drain; a
+    summary may then be stored twice, never lost.  Only one drain runs
+    at a time.
+
+    Returns:
+        {"status": "ok"|"busy"|"error", "queued", "stored"[, "error"]}
+    """
+    MEMORY_OUTBOX.parent.mkdir(parents=True, exist_ok=True)
+    draining = MEMORY_OUTBOX.with_name(MEMORY_OUTBOX.stem + ".draining.jsonl")
+    queued = stored = 0
+    with open(MEMORY_OUTBOX.with_name(MEMORY_OUTBOX.stem + ".lock"), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return {"status": "busy", "queued": 0, "stored": 0}
+        for _ in range(2):  # a batch left by a failed drain, then the outbox
+            if not draining.exists():
+                if not MEMORY_OUTBOX.exists():
+                    break
+                with _locked_append(MEMORY_OUTBOX):
+                    os.replace(MEMORY_OUTBOX, draining)
+            try:
+                n_queued, n_stored = _ingest_outbox_file(draining)
+            except Exception as exc:
+                return {"status": "error", "queued": queued, "stored": stored, "error": str(exc)}
+            draining.unlink()
+            queued += n_queued
+            stored += n_stored
+    return {"status": "ok", "queued": queued, "stored": stored}
+
+
+def memory_outbox_pending() -> int:
+    """Summaries queued for agent-memory and not yet drained."""
+    draining = MEMORY_OUTBOX.with_name(MEMORY_OUTBOX.stem + ".draining.jsonl")
+    return len(_read_jsonl(MEMORY_OUTBOX)) + len(_read_jsonl(draining))
+
+
 class WorkItem:
-    """A unit of tracked work flowing through the multi-agent system."""
+    """A unit of tracked work flowing through the multi-agent system.
+
+    Items returned by ``list_items`` are backed by their index entry and
+    load their full state on first access to anything the index lacks.
+    """
 
     def __init__(self, slug: str):
         self.slug = slug
         self._path = STATE_DIR / f"{slug}.jsonl"
+        self._data = {}  # type: Dict[str, Any]
+        self._offset = 0
+        self._inode = None  # type: Optional[int]
+        self._unsnapshotted = 0
+        self._history = None  # type: Optional[Tuple[Tuple[int, int], List[Dict[str, Any]]]]
+        self._entry = None  # type: Optional[Dict[str, Any]]
+        self._batch = None  # type: Optional[List[Dict[str, Any]]]
         self._data = self._rebuild_state()
 
-    def _rebuild_state(self) -> Dict[str, Any]:
-        """Rebuild current state by replaying all events."""
-        events = _read_jsonl(self._path)
-        if not events:
-            return {}
+    @classmethod
+    def _from_index(cls, entry: Dict[str, Any]) -> "WorkItem":
+        wi = cls.__new__(cls)
+        wi.slug = entry["slug"]
+        wi._path = STATE_DIR / f"{wi.slug}.jsonl"
+        wi._offset = 0
+        wi._inode = None
+        wi._unsnapshotted = 0
+        wi._history = None
+        wi._entry = entry
+        wi._batch = None
+        return wi
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_data":  # index-backed item: load the state on demand
+            self._data = {}
+            self._data = self._rebuild_state()
+            return self._data
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def _indexed(self) -> bool:
+        """True while properties can be answered from the index entry."""
+        return "_data" not in self.__dict__
 
-        state = {
+    def _index_entry(self) -> Optional[Dict[str, Any]]:
+        """Index entry for the loaded state, with the log's mtime and size."""
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        if not self._data:
+            return None
+        return {
             "slug": self.slug,
-            "title": "",
-            "project": "",
-            "source_task_id": "",
-            "intent": {"goal": "", "success_criteria": [], "constraints": []},
-            "lifecycle": {
-                "status": "todo",
-                "assignee_skill": None,
-                "orchestrator_workflow": None,
-                "timestamps": {},
-            },
-            "dependencies": {"blockers": [], "dependents": []},
-            "telemetry": {"metrics": [], "tests": [], "logs": []},
-            "artifacts": [],
-            "lessons": {"findings": [], "followups": []},
-            "history": events,
+            "title": self.title,
+            "status": self.status,
+            "project": self.project,
+            "assignee_skill": self.assignee_skill,
+            "blockers": list(self.blockers),
+            "dependents": list(self.dependents),
+            "timestamps": dict(self.timestamps),
+            "updated_at": self.timestamps.get("updated_at", ""),
+            "inode": self._inode,
+            "offset": self._offset,
+            # A size we have not read up to yet makes the entry stale
+            "size": st.st_size if st.st_size == self._offset else -1,
+            "mtime_ns": st.st_mtime_ns,
         }
 
-        for ev in events:
-            etype = ev.get("event", "")
-            payload = ev.get("payload", {})
-            ts = ev.get("timestamp", "")
-
-            if etype == "created":
-                state["title"] = payload.get("title", "")
-                state["project"] = payload.get("project", "")
-                state["source_task_id"] = payload.get("source_task_id", "")
-                state["intent"] = payload.get("intent", state["intent"])
-                state["lifecycle"]["assignee_skill"] = payload.get("assignee_skill")
-                state["lifecycle"]["timestamps"]["created_at"] = ts
-                if payload.get("status"):
-                    state["lifecycle"]["status"] = payload["status"]
-            elif etype == "started":
-                state["lifecycle"]["status"] = "in_progress"
-                state["lifecycle"]["timestamps"]["started_at"] = ts
-                if payload.get("assignee_skill"):
-                    state["lifecycle"]["assignee_skill"] = payload["assignee_skill"]
-            elif etype == "status_change":
-                state["lifecycle"]["status"] = payload.get("status", state["lifecycle"]["status"])
-                if payload.get("status") == "done":
-                    state["lifecycle"]["timestamps"]["completed_at"] = ts
-            elif etype == "completed":
-                state["lifecycle"]["status"] = "done"
-                state["lifecycle"]["timestamps"]["completed_at"] = ts
-            elif etype == "failed":
-                state["lifecycle"]["status"] = "failed"
-                state["lifecycle"]["timestamps"]["completed_at"] = ts
-            elif etype == "artifact_added":
-                art = payload.get("artifact", {})
-                if art:
-                    state["artifacts"].append(art)
-            elif etype == "metric_recorded":
-                m = payload.get("metric", {})
-                if m:
-                    state["telemetry"]["metrics"].append(m)
-            elif etype == "test_recorded":
-                t = payload.get("test", {})
-                if t:
-                    state["telemetry"]["tests"].append(t)
-            elif etype == "finding_added":
-                f = payload.get("finding", "")
-                if f:
-                    state["lessons"]["findings"].append(f)
-            elif etype == "followup_added":
-                f = payload.get("followup", "")
-                if f:
-                    state["lessons"]["followups"].append(f)
-            elif etype == "dependency_added":
-                dep = payload.get("dependency", {})
-                if dep.get("blocker"):
-                    bl = dep["blocker"]
-                    if bl not in state["dependencies"]["blockers"]:
-                        state["dependencies"]["blockers"].append(bl)
-                if dep.get("dependent"):
-                    d = dep["dependent"]
-                    if d not in state["dependencies"]["dependents"]:
-                        state["dependencies"]["dependents"].append(d)
-            elif etype == "handoff":
-                if payload.get("to_skill"):
-                    state["lifecycle"]["assignee_skill"] = payload["to_skill"]
-                if payload.get("workflow_id"):
-                    state["lifecycle"]["orchestrator_workflow"] = payload["workflow_id"]
+    def _rebuild_state(self) -> Dict[str, Any]:
+        """Bring the state up to date with the log.
+
+        Resumes from the in-memory state when the log has only grown since
+        the last call, otherwise from the snapshot; either way only the
+        events past that offset are replayed.
+        """
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            self._offset, self._inode, self._unsnapshotted = 0, None, 0
+            return {}
 
+        if self._data and st.st_ino == self._inode and st.st_size >= self._offset:
+            state = self._data
+        else:
+            snap = _load_snapshot(self.slug, self._path, st.st_size)
+            state = snap["state"] if snap else {}
+            self._offset = snap["offset"] if snap else 0
+            self._unsnapshotted = 0
+        self._inode = st.st_ino
+
+        if st.st_size > self._offset:
+            events, self._offset = _read_events_from(self._path, self._offset)
+            for ev in events:
+                if not state:
+                    state = _initial_state(self.slug)
+                _apply_event(state, ev)
+            self._unsnapshotted += len(events)
+            if self._unsnapshotted >= SNAPSHOT_EVERY:
+                _save_snapshot(self.slug, self._path, state, self._offset)
+                self._unsnapshotted = 0
         return state
 
     def _emit(self, event_type: str, payload: Optional[Dict[str, Any]] = None, author: str = "agent") -> Dict[str, Any]:
@@ -239,23 +807,74 @@ class WorkItem:
             "author": author,
             "payload": payload or {},
         }
+        if self._batch is not None:
+            self._batch.append(event)
+            _apply_event(self._data, event)  # visible now, written on flush
+            return event
         _append_jsonl(self._path, event)
         _publish_hook(event_type, event)
-        # Rebuild state after event
+        self._after_write([event_type])
+        return event
+
+    def _after_write(self, event_types: List[str]) -> None:
+        """Catch up with the log, refresh the index entry, index memory."""
         self._data = self._rebuild_state()
+        _update_index({self.slug: self._index_entry()})
         # Best-effort memory indexing on significant events
-        if event_type in ("created", "completed", "failed", "handoff"):
+        if any(t in ("created", "completed", "failed", "handoff") for t in event_types):
             _index_to_memory(self)
-        return event
+
+    @contextmanager
+    def batch(self) -> Iterator["WorkItem"]:
+        """Buffer events and write them as one append per file on exit.
+
+        Inside the block events update this object's state immediately but
+        reach the log, the hook bus and the index only when the outermost
+        batch exits (also on error), in order::
+
+            with wi.batch():
+                for m in metrics:
+                    wi.record_metric(m)
+        """
+        if self._batch is not None:  # nested: the outer batch flushes
+            yield self
+            return
+        if not self._data:
+            raise FileNotFoundError(f"No WorkItem found for slug '{self.slug}'")
+        self._batch = []
+        try:
+            yield self
+        finally:
+            events, self._batch = self._batch, None
+            self._flush(events)
+
+    def _flush(self, events: List[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        _ensure_dirs()
+        _append_records(self._path, events)
+        by_type = {}  # type: Dict[str, List[Dict[str, Any]]]
+        for ev in events:
+            by_type.setdefault(ev["event"], []).append(ev)
+        for event_type, group in by_type.items():
+            _publish_hooks(event_type, group)
+        # The buffered events are already applied in memory; reload from
+        # the snapshot so they are not applied twice
+        self._data, self._inode = {}, None
+        self._after_write(list(by_type))
 
     # ── Properties ──
 
     @property
     def title(self) -> str:
+        if self._indexed():
+            return self._entry["title"]
         return self._data.get("title", "")
 
     @property
     def project(self) -> str:
+        if self._indexed():
+            return self._entry["project"]
         return self._data.get("project", "")
 
     @property
@@ -264,10 +883,14 @@ class WorkItem:
 
     @property
     def status(self) -> str:
+        if self._indexed():
+            return self._entry["status"]
         return self._data.get("lifecycle", {}).get("status", "todo")
 
     @property
     def assignee_skill(self) -> Optional[str]:
+        if self._indexed():
+            return self._entry["assignee_skill"]
         return self._data.get("lifecycle", {}).get("assignee_skill")
 
     @property
@@ -292,23 +915,41 @@ class WorkItem:
 
     @property
     def blockers(self) -> List[str]:
+        if self._indexed():
+            return self._entry["blockers"]
         return self._data.get("dependencies", {}).get("blockers", [])
 
     @property
     def dependents(self) -> List[str]:
+        if self._indexed():
+            return self._entry["dependents"]
         return self._data.get("dependencies", {}).get("dependents", [])
 
     @property
     def history(self) -> List[Dict]:
-        return self._data.get("history", [])
+        """Every event of the item, archived ones included (read on demand)."""
+        key = (self._inode or 0, self._offset)
+        if self._history is None or self._history[0] != key:
+            events = _read_jsonl(self._path) if self._data else []
+            archived = 0
+            if events and events[0].get("event") == "checkpoint":
+                archived = events[0].get("payload", {}).get("archived", 0)
+            older = _read_jsonl(ARCHIVE_DIR / f"{self.slug}.jsonl")[:archived]
+            self._history = (key, older + [e for e in events if e.get("event") != "checkpoint"])
+        return self._history[1]
 
     @property
     def timestamps(self) -> Dict[str, str]:
+        if self._indexed():
+            return self._entry["timestamps"]
         return self._data.get("lifecycle", {}).get("timestamps", {})
 
     @property
     def data(self) -> Dict[str, Any]:
-        return dict(self._data)
+        d = dict(self._data)
+        if d:
+            d["history"] = self.history
+        return d
 
     # ── Lifecycle ──
 
@@ -334,6 +975,12 @@ class WorkItem:
         wi.slug = slug
         wi._path = STATE_DIR / f"{slug}.jsonl"
         wi._data = {}
+        wi._offset = 0
+        wi._inode = None
+        wi._unsnapshotted = 0
+        wi._history = None
+        wi._entry = None
+        wi._batch = None
 
         if wi._path.exists():
             raise FileExistsError(f"WorkItem '{slug}' already exists at {wi._path}")
@@ -437,9 +1084,7 @@ class WorkItem:
 
     def to_dict(self) -> Dict[str, Any]:
         """Full state as dict (excluding raw history for compactness)."""
-        d = dict(self._data)
-        d.pop("history", None)
-        return d
+        return dict(self._data)
 
     def __repr__(self) -> str:
         return f"<WorkItem slug={self.slug!r} status={self.status!r}>"
@@ -455,30 +1100,98 @@ def load_item(slug: str) -> WorkItem:
     return wi
 
 
+def refresh_index() -> int:
+    """Rebuild index rows whose log changed outside ``_emit``.
+
+    Costs one ``stat`` per log; only items whose mtime or size differ
+    from their row (another checkout, a compaction, a crash before the
+    index update) are loaded.  ``list_items`` calls this only when the
+    ``work_items`` directory changed since the last check.
+
+    Returns:
+        Number of rows rebuilt or dropped.
+    """
+    _ensure_dirs()
+    conn = _index_db()
+    dir_mtime = STATE_DIR.stat().st_mtime_ns  # before the scan: later changes recheck
+    rows = {slug: (size, mtime) for slug, size, mtime in
+            conn.execute("SELECT slug, size, mtime_ns FROM items")}
+    changes = {}  # type: Dict[str, Optional[Dict[str, Any]]]
+    seen = set()
+    for f in STATE_DIR.glob("*.jsonl"):
+        slug = f.stem
+        seen.add(slug)
+        try:
+            st = f.stat()
+        except FileNotFoundError:
+            continue
+        if rows.get(slug) == (st.st_size, st.st_mtime_ns):
+            continue
+        changes[slug] = _fresh_entry(slug)
+    for slug in rows:
+        if slug not in seen:
+            changes[slug] = None
+    _update_index(changes)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dir_mtime_ns', ?)",
+                     (str(dir_mtime),))
+    return len(changes)
+
+
+def _fresh_entry(slug: str) -> Optional[Dict[str, Any]]:
+    """Index entry for *slug* loaded from its log (None if it cannot be)."""
+    try:
+        return WorkItem(slug)._index_entry()
+    except Exception:
+        return None
+
+
+def _check_index() -> sqlite3.Connection:
+    """The index connection, after a ``refresh_index`` if the log directory changed.
+
+    Rows marked stale (``size = -1``: the log grew while they were
+    written) are rebuilt either way; appends do not touch the directory.
+    """
+    _ensure_dirs()
+    conn = _index_db()
+    row = conn.execute("SELECT value FROM meta WHERE key = 'dir_mtime_ns'").fetchone()
+    if row is None or int(row[0]) != STATE_DIR.stat().st_mtime_ns:
+        refresh_index()
+    stale = [slug for (slug,) in conn.execute("SELECT slug FROM items WHERE size = -1")]
+    if stale:
+        _update_index({slug: _fresh_entry(slug) for slug in stale})
+    return conn
+
+
 def list_items(
     status: Optional[str] = None,
     project: Optional[str] = None,
     skill: Optional[str] = None,
+    order_by: str = "slug",
+    limit: Optional[int] = None,
+    offset: int = 0,
 ) -> List[WorkItem]:
-    """List all WorkItems, optionally filtered."""
-    _ensure_dirs()
-    items = []
-    for f in sorted(STATE_DIR.glob("*.jsonl")):
-        slug = f.stem
-        try:
-            wi = WorkItem(slug)
-            if not wi._data:
-                continue
-            if status and wi.status != status:
-                continue
-            if project and wi.project != project:
-                continue
-            if skill and wi.assignee_skill != skill:
-                continue
-            items.append(wi)
-        except Exception:
-            continue
-    return items
+    """List WorkItems from the index, optionally filtered and paginated.
+
+    Args:
+        order_by: ``slug`` (ascending) or ``updated_at`` (newest first).
+        limit: Maximum items returned (all if None).
+        offset: Items skipped after filtering and sorting.
+    """
+    if order_by not in LIST_ORDERS:
+        raise ValueError(f"Invalid order_by '{order_by}'. Must be one of {LIST_ORDERS}")
+    conditions, params = [], []  # type: List[str], List[Any]
+    for column, value in (("status", status), ("project", project), ("assignee_skill", skill)):
+        if value:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = "updated_at DESC, slug DESC" if order_by == "updated_at" else "slug"
+    rows = _check_index().execute(
+        f"SELECT entry FROM items {where} ORDER BY {order} LIMIT ? OFFSET ?",
+        params + [-1 if limit is None else limit, offset],
+    ).fetchall()
+    return [WorkItem._from_index(json.loads(entry)) for (entry,) in rows]
 
 
 def dependency_graph() -> Dict[str, Dict[str, List[str]]]:
@@ -497,10 +1210,200 @@ def dependency_graph() -> Dict[str, Dict[str, List[str]]]:
     return graph
 
 
+def compact_item(slug: str, min_events: int = 0) -> Dict[str, Any]:
+    """Move a WorkItem's events to its archive and restart the log at a checkpoint.
+
+    The new log holds one ``checkpoint`` event with the reduced state and
+    the number of archived events; ``WorkItem.history`` still returns
+    everything.  The archive is first cut back to the count recorded by the
+    previous checkpoint, so rerunning after a crash does not duplicate
+    events.
+
+    Args:
+        slug: WorkItem to compact.
+        min_events: Leave logs with fewer live events than this alone.
+
+    Returns:
+        {"slug", "compacted", "events", "archived", "bytes_before", "bytes_after"}
+    """
+    path = STATE_DIR / f"{slug}.jsonl"
+    if not path.exists():
+        raise FileNotFoundError(f"No WorkItem found for slug '{slug}'")
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    archive = ARCHIVE_DIR / f"{slug}.jsonl"
+
+    with _locked_append(path):  # appenders wait, then follow the new file
+        events, offset = _read_events_from(path)
+        live = [e for e in events if e.get("event") != "checkpoint"]
+        result = {
+            "slug": slug, "compacted": False, "events": len(live),
+            "archived": 0, "bytes_before": offset, "bytes_after": offset,
+        }
+        if not live or len(live) < min_events:
+            return result
+
+        state = {}  # type: Dict[str, Any]
+        for ev in events:
+            if not state:
+                state = _initial_state(slug)
+            _apply_event(state, ev)
+        previous = 0
+        if events[0].get("event") == "checkpoint":
+            previous = events[0].get("payload", {}).get("archived", 0)
+
+        kept = b""
+        if previous and archive.exists():
+            with open(archive, "rb") as f:
+                kept = b"".join(f.readline() for _ in range(previous))
+        tmp = archive.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp, "wb") as f:
+            f.write(kept)
+            for ev in live:
+                f.write((json.dumps(ev, default=str) + "\n").encode())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, archive)
+
+        archived = previous + len(live)
+        checkpoint = {
+            "slug": slug,
+            "event": "checkpoint",
+            "timestamp": _now_iso(),
+            "author": "compact",
+            "payload": {"state": state, "archived": archived},
+        }
+        head = (json.dumps(checkpoint, default=str) + "\n").encode()
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp, "wb") as f:
+            f.write(head)
+            # Anything appended after our read (writers bypassing the
+            # lock) must survive the rewrite
+            with open(path, "rb") as src:
+                src.seek(offset)
+                f.write(src.read())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    _save_snapshot(slug, path, state, len(head))
+    result.update(compacted=True, archived=archived, bytes_after=path.stat().st_size)
+    return result
+
+
+def compact_all(min_events: int = COMPACT_MIN_EVENTS) -> List[Dict[str, Any]]:
+    """Compact every WorkItem log with at least *min_events* live events."""
+    _ensure_dirs()
+    results = []
+    for f in sorted(STATE_DIR.glob("*.jsonl")):
+        result = compact_item(f.stem, min_events=min_events)
+        if result["compacted"]:
+            results.append(result)
+    return results
+
+
 def pending_hooks(event_type: str, since: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Read hook events, optionally filtered by timestamp."""
-    hook_file = HOOKS_DIR / f"{event_type}.jsonl"
-    events = _read_jsonl(hook_file)
+    """Read hook events (retained segments included), optionally filtered by timestamp.
+
+    Rereads the whole stream; pollers should use a ``HookConsumer``.
+    """
+    events = [ev for ev, _ in _read_hook_stream(event_type)]
     if since:
         events = [e for e in events if e.get("timestamp", "") > since]
     return events
+
+
+class HookConsumer:
+    """Named reader of one hook stream with a persisted, explicitly acked cursor.
+
+    ``poll`` returns events after the last delivered one; ``ack``
+    persists the position after the delivered events, so anything not
+    acked is delivered again to the next consumer of that name (after a
+    crash or restart) — at-least-once delivery.  ``rewind`` redelivers
+    unacked events in this process.
+    """
+
+    def __init__(self, name: str, event_type: str, start: str = "earliest"):
+        """
+        Args:
+            name: Consumer identity; cursors are kept per (name, event_type).
+            event_type: Hook stream to read (one of EVENT_TYPES).
+            start: ``earliest`` or ``latest`` — where a consumer without a
+                saved cursor begins.
+        """
+        if not re.fullmatch(r"[A-Za-z0-9_.-]+", name):
+            raise ValueError(f"Invalid consumer name '{name}'")
+        if start not in ("earliest", "latest"):
+            raise ValueError(f"Invalid start '{start}'. Must be 'earliest' or 'latest'")
+        self.name = name
+        self.event_type = event_type
+        self._cursor_path = HOOK_CURSORS_DIR / f"{name}.{event_type}.offset"
+        try:
+            self.committed = int(self._cursor_path.read_text().strip())
+        except (OSError, ValueError):
+            self.committed = self._end() if start == "latest" else 0
+        self.position = self.committed
+        self._delivered = []  # type: List[int]
+
+    def _end(self) -> int:
+        base = _hook_base(_hook_segments(self.event_type))
+        try:
+            return base + (HOOKS_DIR / f"{self.event_type}.jsonl").stat().st_size
+        except FileNotFoundError:
+            return base
+
+    def poll(self, max_events: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Events published since the last delivered one (reads only new bytes)."""
+        records = _read_hook_stream(self.event_type, self.position, max_events)
+        if records:
+            self._delivered.extend(end for _, end in records)
+            self.position = records[-1][1]
+        return [ev for ev, _ in records]
+
+    def ack(self, count: Optional[int] = None) -> None:
+        """Persist the cursor past the first *count* delivered events (default: all)."""
+        if not self._delivered:
+            return
+        count = len(self._delivered) if count is None else min(count, len(self._delivered))
+        if count <= 0:
+            return
+        self.committed = self._delivered[count - 1]
+        del self._delivered[:count]
+        HOOK_CURSORS_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = self._cursor_path.with_suffix(f".tmp{os.getpid()}")
+        tmp.write_text(str(self.committed))
+        os.replace(tmp, self._cursor_path)
+
+    def rewind(self) -> None:
+        """Forget unacked deliveries; the next poll starts at the committed cursor."""
+        self.position = self.committed
+        self._delivered = []
+
+    def lag(self) -> int:
+        """Bytes published but not yet acked."""
+        return max(self._end() - self.committed, 0)
+
+    def wait(self, timeout: Optional[float] = None, max_events: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Block until events arrive (or *timeout* seconds pass) and return them.
+
+        Polls the hook file's size, sleeping HOOK_POLL_MIN doubling up to
+        HOOK_POLL_MAX between empty polls.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = HOOK_POLL_MIN
+        while True:
+            if self._end() != self.position:
+                events = self.poll(max_events)
+                if events:
+                    return events
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return []
+            time.sleep(delay if deadline is None else min(delay, deadline - now))
+            delay = min(delay * 2, HOOK_POLL_MAX)
+
+
+def wait_for_hooks(
+    consumer: HookConsumer, timeout: Optional[float] = None, max_events: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Block until *consumer* has new hook events; ack them after handling."""
+    return consumer.wait(timeout=timeout, max_events=max_events)
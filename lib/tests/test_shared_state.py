@@ -0,0 +1,75 @@
+"""
+Tests for lib.shared_state — the SQLite list index.
+
+Run with:  python -m pytest lib/tests/test_shared_state.py -v
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from lib import shared_state  # noqa: E402
+from lib.shared_state import WorkItem, list_items, load_item  # noqa: E402
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    """Point every shared_state path at a temporary workspace."""
+    state_dir = tmp_path / "work_items"
+    hooks_dir = tmp_path / "hooks"
+    for name, path in (
+        ("STATE_DIR", state_dir),
+        ("HOOKS_DIR", hooks_dir),
+        ("SNAPSHOT_DIR", state_dir / "snapshots"),
+        ("ARCHIVE_DIR", state_dir / "archive"),
+        ("INDEX_DIR", state_dir / "index"),
+        ("INDEX_PATH", state_dir / "index" / "items.db"),
+        ("HOOK_SEGMENTS_DIR", hooks_dir / "segments"),
+        ("HOOK_CURSORS_DIR", hooks_dir / "cursors"),
+        ("MEMORY_OUTBOX", tmp_path / "memory_outbox.jsonl"),
+    ):
+        monkeypatch.setattr(shared_state, name, path)
+    return tmp_path
+
+
+def _append_started(item):
+    """The first half of ``item.start()``: append and replay, no index write yet."""
+    event = {"slug": item.slug, "event": "started", "timestamp": shared_state._now_iso(),
+             "author": "agent", "payload": {}}
+    shared_state._append_jsonl(item._path, event)
+    item._data = item._rebuild_state()
+
+
+def test_late_index_write_does_not_replace_a_newer_row(state):
+    slug = WorkItem.create(slug="race", title="Race").slug
+    list_items()  # index now current: appends alone will not trigger a refresh
+    a, b = load_item(slug), load_item(slug)
+
+    _append_started(a)
+    b.complete()
+    shared_state._update_index({slug: a._index_entry()})  # A finishes its _emit
+
+    row = shared_state._index_db().execute(
+        "SELECT status FROM items WHERE slug = ?", (slug,)).fetchone()
+    assert row == ("done",)
+    assert load_item(slug).status == "done"
+    assert [wi.status for wi in list_items()] == ["done"]
+
+
+def test_stale_row_is_rebuilt_by_the_next_listing(state):
+    slug = WorkItem.create(slug="crash", title="Crash").slug
+    list_items()  # index now current: appends alone will not trigger a refresh
+    a, b = load_item(slug), load_item(slug)
+
+    _append_started(a)
+    # B appends and dies before indexing; A's row then trails the log
+    shared_state._append_jsonl(b._path, {"slug": slug, "event": "completed",
+                                         "timestamp": shared_state._now_iso(),
+                                         "author": "agent", "payload": {}})
+    shared_state._update_index({slug: a._index_entry()})
+
+    assert [wi.status for wi in list_items()] == ["done"]
+    assert [wi.status for wi in list_items(status="done")] == ["done"]
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+agent-memory / benchmarks/bench.py
+===================================
+Benchmark harness for the memory CLI on synthetic corpora.
+
+For each corpus size a pristine corpus is generated once (corpus.py, cached
+in the work directory) and copied; every operation then runs in a fresh
+worker process against that copy, through the same ``memory._DISPATCH``
+entry points the CLI and server use.  A fresh process per operation makes
+peak RSS attributable to that operation, and every first call pays the
+same cold costs (embedding sidecar, graph index) as a real CLI call.
+
+Operations (run in this order; later ones see earlier writes):
+    recall          vector recall (mode auto)
+    recall_keyword  BM25 keyword recall
+    recall_hybrid   vector + BM25 fusion
+    recall_batch    recall-batch, 8 queries per call
+    remember        single remember calls (auto-linking included)
+    import_md       one import-md of a generated markdown file
+    reflect         one full maintenance cycle
+
+Per operation the report records p50/p95 latency (first call excluded when
+there are several; it is reported as ``first_ms``), throughput, peak RSS of
+the worker and the DB size afterwards.  Reports are JSON and can be
+compared across commits with ``compare``.
+
+No model download is needed: workers install corpus.FakeEmbedder, and the
+embedding cache is disabled so every run does the same work.
+
+Usage:
+    python3 skills/agent-memory/benchmarks/bench.py run --sizes 1000,10000 --output base.json
+    python3 skills/agent-memory/benchmarks/bench.py run --sizes 100000 --ops recall,reflect
+    python3 skills/agent-memory/benchmarks/bench.py compare base.json new.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+# Workers must never touch the shared embedding cache or the real store.
+os.environ["AGENT_MEMORY_EMBED_CACHE"] = "off"
+
+import numpy as np  # noqa: E402
+
+import corpus  # noqa: E402
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+OPS = ("recall", "recall_keyword", "recall_hybrid", "recall_batch",
+       "remember", "import_md", "reflect")
+
+DEFAULT_SIZES = "1000,10000"
+_BATCH = 8
+
+
+def _json_out(data: Any) -> None:
+    print(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def _error_out(message: str, code: str) -> None:
+    print(json.dumps({"status": "error", "code": code, "message": message}), file=sys.stderr)
+    sys.exit(1)
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM belongs to this address space; ru_maxrss survives fork + exec on
+    # Linux and would report the parent's peak (e.g. corpus generation).
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0, 1)
+
+
+def _store_bytes(db_path: str) -> Dict[str, int]:
+    """On-disk size of the DB (+ WAL) and of its sidecar files."""
+    directory, name = os.path.split(db_path)
+    db = sidecars = 0
+    for entry in os.scandir(directory):
+        if entry.name in (name, name + "-wal"):
+            db += entry.stat().st_size
+        elif entry.name.startswith(name + ".") and not entry.name.endswith(".corpus.json"):
+            sidecars += entry.stat().st_size
+    return {"db_bytes": db, "sidecar_bytes": sidecars}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty", "--abbrev=12"],
+            cwd=_BENCH_DIR, capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+# ---------------------------------------------------------------------------
+# Worker: one operation in a fresh process
+# ---------------------------------------------------------------------------
+
+def _op_calls(op: str, cfg: Dict[str, Any], workdir: str) -> List[List[str]]:
+    """argv lists (without --db) for the calls making up *op*."""
+    rng = np.random.default_rng(cfg["seed"] + 1)
+    model = corpus.TextModel(cfg["size"], cfg["seed"])
+    queries = [model.query(rng) for _ in range(cfg["queries"])]
+
+    if op == "recall":
+        return [["recall", q] for q in queries]
+    if op == "recall_keyword":
+        return [["recall", q, "--mode", "keyword"] for q in queries]
+    if op == "recall_hybrid":
+        return [["recall", q, "--mode", "hybrid"] for q in queries]
+    if op == "recall_batch":
+        return [["recall-batch"] + queries[i:i + _BATCH] for i in range(0, len(queries), _BATCH)]
+    if op == "remember":
+        texts = model.texts(np.random.default_rng(cfg["seed"] + 2), cfg["remember"])
+        return [["remember", t] for t in texts]
+    if op == "import_md":
+        texts = model.texts(np.random.default_rng(cfg["seed"] + 3), cfg["import_sections"])
+        path = os.path.join(workdir, "import.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# Imported notes\n\n")
+            f.write("".join(f"## Note {i}\n\n{t}\n\n" for i, t in enumerate(texts)))
+        return [["import-md", path]]
+    if op == "reflect":
+        return [["reflect"]]
+    raise ValueError(op)
+
+
+def _items(op: str, cfg: Dict[str, Any], calls: int) -> int:
+    """Logical items processed (queries, memories) — the throughput unit."""
+    if op == "recall_batch":
+        return cfg["queries"]
+    if op == "import_md":
+        return cfg["import_sections"]
+    return calls
+
+
+def run_worker(op: str, db: str, cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Run *op* against *db* in this process and measure it."""
+    sys.path.insert(0, os.path.join(_BENCH_DIR, "..", "scripts"))
+    import memory  # noqa: E402
+    import utils  # noqa: E402
+
+    utils._model_instance = corpus.FakeEmbedder()
+    parser = memory.build_parser()
+    calls = _op_calls(op, cfg, os.path.dirname(db))
+    rss_start = _peak_rss_mb()
+
+    latencies = []  # type: List[float]
+    started = time.perf_counter()
+    for argv in calls:
+        args = parser.parse_args(["--db", db] + argv)
+        out, err = io.StringIO(), io.StringIO()
+        t0 = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                memory._DISPATCH[args.command](args)
+        except SystemExit as exc:
+            if exc.code:
+                return {"error": (err.getvalue() or out.getvalue()).strip()[-500:]}
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - started
+
+    warm = np.array(latencies[1:] if len(latencies) > 1 else latencies) * 1000.0
+    result = {
+        "calls": len(latencies),
+        "items": _items(op, cfg, len(latencies)),
+        "first_ms": round(latencies[0] * 1000.0, 3),
+        "p50_ms": round(float(np.percentile(warm, 50)), 3),
+        "p95_ms": round(float(np.percentile(warm, 95)), 3),
+        "total_s": round(total, 3),
+        "items_per_s": round(_items(op, cfg, len(latencies)) / total, 1) if total > 0 else None,
+        "rss_start_mb": rss_start,
+        "peak_rss_mb": _peak_rss_mb(),
+    }  # type: Dict[str, Any]
+    result.update(_store_bytes(db))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# run
+# ---------------------------------------------------------------------------
+
+def _spawn(op: str, db: str, cfg: Dict[str, Any]) -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "_worker", op, db, json.dumps(cfg)],
+        capture_output=True, text=True,
+        env=dict(os.environ, AGENT_MEMORY_DIR=os.path.dirname(db)),
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip()[-500:]}
+    return json.loads(proc.stdout)
+
+
+def cmd_run(args: argparse.Namespace) -> None:
+    """Benchmark every requested size and write the JSON report."""
+    try:
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError:
+        _error_out(f"Invalid --sizes: {args.sizes}", "BAD_SIZES")
+    ops = [o.strip() for o in args.ops.split(",") if o.strip()] if args.ops else list(OPS)
+    unknown = sorted(set(ops) - set(OPS))
+    if unknown:
+        _error_out(f"Unknown ops: {', '.join(unknown)} (choose from {', '.join(OPS)})", "BAD_OPS")
+    ops = [o for o in OPS if o in ops]
+
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), "agent-memory-bench")
+    os.makedirs(workdir, exist_ok=True)
+    report = {
+        "version": 1,
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "seed": args.seed, "queries": args.queries, "remember": args.remember,
+            "import_sections": args.import_sections, "ops": ops,
+        },
+        "sizes": [],
+    }  # type: Dict[str, Any]
+
+    for size in sizes:
+        pristine = os.path.join(workdir, f"corpus-{size}-s{args.seed}.db")
+        print(f"[{size}] corpus", file=sys.stderr, flush=True)
+        manifest = corpus.ensure(pristine, size, args.seed, progress=not args.quiet)
+
+        run_dir = tempfile.mkdtemp(prefix=f"run-{size}-", dir=workdir)
+        db = os.path.join(run_dir, "agent_memory.db")
+        shutil.copyfile(pristine, db)
+        cfg = {"size": size, "seed": args.seed, "queries": args.queries,
+               "remember": args.remember, "import_sections": args.import_sections}
+        entry = {"size": size, "corpus": manifest, "ops": {}}  # type: Dict[str, Any]
+        try:
+            for op in ops:
+                print(f"[{size}] {op}", file=sys.stderr, flush=True)
+                entry["ops"][op] = _spawn(op, db, cfg)
+        finally:
+            if not args.keep:
+                shutil.rmtree(run_dir, ignore_errors=True)
+        report["sizes"].append(entry)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        _json_out({"status": "ok", "output": args.output, "sizes": sizes, "ops": ops})
+    else:
+        _json_out(report)
+
+
+# ---------------------------------------------------------------------------
+# compare
+# ---------------------------------------------------------------------------
+
+_METRICS = ("p50_ms", "p95_ms", "peak_rss_mb", "db_bytes")
+
+
+def cmd_compare(args: argparse.Namespace) -> None:
+    """Per size/op ratios (new / base) of latency, RSS and DB size."""
+    reports = []
+    for path in (args.base, args.new):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError) as exc:
+            _error_out(f"Cannot read report {path}: {exc}", "BAD_REPORT")
+    base = {s["size"]: s["ops"] for s in reports[0]["sizes"]}
+
+    rows = []
+    regressions = []
+    for entry in reports[1]["sizes"]:
+        for op, new in entry["ops"].items():
+            old = base.get(entry["size"], {}).get(op)
+            if not old or "error" in old or "error" in new:
+                continue
+            row = {"size": entry["size"], "op": op}  # type: Dict[str, Any]
+            for metric in _METRICS:
+                if old.get(metric) and new.get(metric) is not None:
+                    ratio = new[metric] / old[metric]
+                    row[metric] = {"base": old[metric], "new": new[metric], "ratio": round(ratio, 3)}
+                    if ratio > 1.0 + args.threshold:
+                        regressions.append(f"{entry['size']}/{op}/{metric} x{ratio:.2f}")
+            rows.append(row)
+
+    _json_out({
+        "status": "ok",
+        "base": reports[0].get("commit"),
+        "new": reports[1].get("commit"),
+        "threshold": args.threshold,
+        "regressions": regressions,
+        "results": rows,
+    })
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="agent-memory benchmark harness.")
+    subs = parser.add_subparsers(dest="command")
+
+    p_run = subs.add_parser("run", help="Benchmark operations on synthetic corpora")
+    p_run.add_argument("--sizes", default=DEFAULT_SIZES,
+                       help=f"Comma-separated corpus sizes (default: {DEFAULT_SIZES}; "
+                            "e.g. 1000,10000,100000,1000000)")
+    p_run.add_argument("--ops", default=None,
+                       help=f"Comma-separated subset of: {', '.join(OPS)} (default: all)")
+    p_run.add_argument("--queries", type=int, default=50,
+                       help="Recall queries per recall op (default: 50)")
+    p_run.add_argument("--remember", type=int, default=50,
+                       help="remember calls (default: 50)")
+    p_run.add_argument("--import-sections", type=int, default=200,
+                       help="Sections in the import-md file (default: 200)")
+    p_run.add_argument("--seed", type=int, default=42, help="Corpus seed (default: 42)")
+    p_run.add_argument("--workdir", default=None,
+                       help="Corpus cache and scratch dir (default: $TMPDIR/agent-memory-bench)")
+    p_run.add_argument("--output", default=None, help="Write the report here instead of stdout")
+    p_run.add_argument("--keep", action="store_true",
+                       help="Keep the per-run database copies")
+    p_run.add_argument("--quiet", action="store_true", help="No corpus progress on stderr")
+
+    p_cmp = subs.add_parser("compare", help="Compare two reports")
+    p_cmp.add_argument("base", help="Baseline report (JSON)")
+    p_cmp.add_argument("new", help="New report (JSON)")
+    p_cmp.add_argument("--threshold", type=float, default=0.10,
+                       help="Flag metrics that grew by more than this fraction (default: 0.10)")
+    return parser
+
+
+def main() -> None:
+    if len(sys.argv) == 5 and sys.argv[1] == "_worker":
+        _json_out(run_worker(sys.argv[2], sys.argv[3], json.loads(sys.argv[4])))
+        return
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.command == "run":
+        cmd_run(args)
+    elif args.command == "compare":
+        cmd_compare(args)
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+agent-memory / benchmarks/corpus.py
+====================================
+Deterministic synthetic corpora for the benchmark harness (bench.py).
+
+A corpus is a ready-to-use ``agent_memory.db`` with the shape of a real
+store, generated from a seed:
+
+  - Entities (two-word names, CamelCase products, acronyms) are drawn from
+    a Zipf distribution, so a few entities appear in many memories and
+    most in a handful — the distribution auto-linking and ``--entity``
+    filters see in practice.
+  - Memories belong to topics (small word sets); memories of one topic are
+    semantically close, unrelated topics are not.  About 1% are
+    near-duplicates of an earlier memory, for ``reflect`` to find.
+  - About a third of the memories link to an earlier memory sharing their
+    first entity, like ``remember``'s auto-linking does.
+  - Creation and access times span a year, with geometric access counts.
+
+Embeddings come from ``FakeEmbedder``, a stand-in for the sentence-
+transformers model: a hashed bag-of-words random projection.  It needs no
+download, is identical on every machine, and keeps "same words → similar
+vector", so vector recall and duplicate detection have real work to do.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from utils import EMBEDDING_DIM, embedding_to_blob, get_connection  # noqa: E402
+
+# Bump when the generated corpus changes, so cached corpora are rebuilt.
+GENERATOR_VERSION: int = 1
+
+_FIRST = ("Alice Bruno Carla Deepak Elena Farid Grace Hiro Ines Jonas Kenji Lena "
+          "Marco Nadia Omar Priya Quinn Rosa Sven Tara Ugo Vera Wade Xena Yusuf "
+          "Zoe Aaron Bella Chen Dara Emil Fiona Gabe Hanna Ivan Julia Karl Lucia "
+          "Mateo Nina").split()
+_LAST = ("Park Rossi Silva Kumar Novak Haddad Moreau Tanaka Costa Weber Sato Berg "
+         "Ricci Petrov Khan Shah Lopez Meyer Quist Nilsson Ferro Adler Young Ortiz "
+         "Demir Fischer Abbott Brandt Cohen Duarte Evans Fontaine Garcia Holm Ito "
+         "Jansen Klein Larsen Moretti Nakamura").split()
+_PREFIX = ("Acme Blue Cloud Data Edge Flux Grid Hyper Iron Jet Key Lumen Meta Nova "
+           "Open Prime Quant Rapid Sky Terra Ultra Vector Wave Xeno Yield Zen Astro "
+           "Bright Core Delta Echo Fusion").split()
+_SUFFIX = ("Works Labs Soft Base Flow Forge Hub Logic Mind Net Point Scale Stack "
+           "Sync Vault Wise Bridge Cast Desk Gate Line Mark Path Ridge Shift Stream "
+           "Track Verse Ware Yard Zone Pilot").split()
+_ACRONYMS = ("API SDK CRM ERP SLA KPI ETL GPU SSO VPN CDN DNS SQL RBAC OKR ROI "
+             "SOC GDPR HIPAA PCI").split()
+_SKILLS = ("sales legal finance marketing customer-support product-management "
+           "data-analysis devops security task-planner email-manager").split()
+_VERBS = ("approved reviewed escalated proposed rejected shipped migrated "
+          "discussed flagged scheduled renegotiated audited benchmarked").split()
+_WORDS = """
+    account adoption alert allocation analytics architecture audit backlog
+    baseline billing blocker budget build bundle cache campaign capacity
+    certificate churn cluster cohort compliance config contract conversion
+    cost coverage dashboard deadline debt dependency deployment discount
+    docs domain draft encryption endpoint estimate export failover feature
+    feedback forecast funnel gateway governance handoff incident index
+    integration inventory invoice latency launch lead license limit logging
+    margin metric migration milestone monitoring onboarding outage pipeline
+    policy pricing priority procurement prototype quota quote refund region
+    release renewal report request retention retry review risk roadmap
+    rollback rollout runbook schema scope security segment session signup
+    sprint staffing storage subscription support survey target template
+    tenant testing threshold ticket timeline token traffic trial upgrade
+    uptime usage vendor warranty webhook workflow workload
+""".split()
+
+_TOPIC_WORDS = 8
+
+
+# ---------------------------------------------------------------------------
+# Fake embedder
+# ---------------------------------------------------------------------------
+
+class FakeEmbedder:
+    """Deterministic drop-in for the SentenceTransformer model.
+
+    Each lowercased whitespace token maps to a fixed Gaussian vector seeded
+    by its BLAKE2 hash; a text is the normalized sum of its tokens.
+    Install it with ``utils._model_instance = FakeEmbedder()``.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self._token_ids = {}  # type: Dict[str, int]
+        self._vectors = []  # type: List[np.ndarray]
+        self._table = np.zeros((0, dim), dtype=np.float32)
+
+    def _token_id(self, token: str) -> int:
+        tid = self._token_ids.get(token)
+        if tid is None:
+            seed = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            self._vectors.append(
+                np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            )
+            tid = self._token_ids[token] = len(self._vectors) - 1
+        return tid
+
+    def encode(self, sentences: Any, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = True, **kwargs: Any) -> np.ndarray:
+        """Embed one string or a list of strings (SentenceTransformer signature)."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        step = 4096
+        for start in range(0, len(texts), step):
+            tokens = [t.lower().split() for t in texts[start:start + step]]
+            ids = [self._token_id(tok) for toks in tokens for tok in toks]
+            if len(self._vectors) != len(self._table):
+                self._table = np.stack(self._vectors)
+            lengths = np.fromiter((len(t) for t in tokens), np.int64, len(tokens))
+            rows = np.flatnonzero(lengths)
+            if len(rows):
+                offsets = np.concatenate([[0], np.cumsum(lengths[rows])[:-1]])
+                out[start + rows] = np.add.reduceat(self._table[ids], offsets, axis=0)
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            out /= np.where(norms > 0, norms, 1.0)
+        return out[0] if single else out
+
+
+# ---------------------------------------------------------------------------
+# Text generation
+# ---------------------------------------------------------------------------
+
+class TextModel:
+    """Entity pool, topics and text templates for one (size, seed)."""
+
+    def __init__(self, size: int, seed: int):
+        rng = np.random.default_rng(seed)
+        people = [f"{f} {l}" for l in _LAST for f in _FIRST]
+        products = [p + s for p in _PREFIX for s in _SUFFIX]
+        products += [p + s + t for p in _PREFIX for s in _SUFFIX for t in _SUFFIX[:8]]
+        pool = people + products + _ACRONYMS
+        n_entities = min(len(pool), max(100, size // 20))
+        order = rng.permutation(len(pool))[:n_entities]
+        self.entities = [pool[i] for i in order]  # rank 0 = most frequent
+        self.zipf = 1.0 / np.arange(1, n_entities + 1) ** 1.1
+        self.zipf /= self.zipf.sum()
+
+        n_topics = max(20, size // 500)
+        self.topics = [rng.choice(len(_WORDS), _TOPIC_WORDS, replace=False)
+                       for _ in range(n_topics)]
+
+    def entity_ranks(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.choice(len(self.entities), size=n, p=self.zipf)
+
+    def memory(self, rng: np.random.Generator, topic: int, e1: int, e2: int) -> str:
+        words = [_WORDS[i] for i in rng.choice(self.topics[topic], 5)]
+        words += [_WORDS[i] for i in rng.integers(0, len(_WORDS), 2)]
+        return (f"[{_SKILLS[topic % len(_SKILLS)]}] {self.entities[e1]} "
+                f"{_VERBS[int(rng.integers(len(_VERBS)))]} the {words[0]} {words[1]} "
+                f"with {self.entities[e2]} — {words[2]} {words[3]} {words[4]}, "
+                f"next {words[5]} {words[6]}.")
+
+    def query(self, rng: np.random.Generator) -> str:
+        topic = int(rng.integers(len(self.topics)))
+        words = [_WORDS[i] for i in rng.choice(self.topics[topic], 3, replace=False)]
+        return f"{self.entities[int(self.entity_ranks(rng, 1)[0])]} {' '.join(words)}"
+
+    def texts(self, rng: np.random.Generator, n: int) -> List[str]:
+        topics = rng.integers(0, len(self.topics), n)
+        e1, e2 = self.entity_ranks(rng, n), self.entity_ranks(rng, n)
+        return [self.memory(rng, int(t), int(a), int(b)) for t, a, b in zip(topics, e1, e2)]
+
+
+# ---------------------------------------------------------------------------
+# Corpus generation
+# ---------------------------------------------------------------------------
+
+def _manifest_path(db_path: str) -> str:
+    return db_path + ".corpus.json"
+
+
+def load_manifest(db_path: str) -> Optional[Dict[str, Any]]:
+    """Manifest of the corpus at *db_path*, or None if there is none."""
+    path = _manifest_path(db_path)
+    if not (os.path.exists(db_path) and os.path.exists(path)):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def generate(db_path: str, size: int, seed: int = 42, chunk: int = 20_000,
+             now: Optional[float] = None, progress: bool = False) -> Dict[str, Any]:
+    """Write a synthetic corpus of *size* memories to a fresh DB at *db_path*.
+
+    Args:
+        db_path: Target database (replaced if it exists).
+        size: Number of memories.
+        seed: RNG seed; the same (size, seed) always yields the same corpus.
+        chunk: Memories generated, embedded and inserted per transaction.
+        now: Reference time for timestamps (default: current time).
+        progress: Report progress on stderr.
+
+    Returns:
+        Manifest dict (counts, generation time), also written next to the DB.
+    """
+    for suffix in ("", "-wal", "-shm", ".corpus.json"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    started = time.perf_counter()
+    now = time.time() if now is None else now
+    rng = np.random.default_rng(seed)
+    model = TextModel(size, seed)
+    embedder = FakeEmbedder()
+    conn = get_connection(db_path)
+
+    last_by_entity = {}  # type: Dict[int, str]
+    history = []  # type: List[str]  # recent texts, for near-duplicates
+    edges = entities = 0
+    year = 365 * 86400.0
+    try:
+        for start in range(0, size, chunk):
+            n = min(chunk, size - start)
+            topics = rng.integers(0, len(model.topics), n)
+            e1, e2 = model.entity_ranks(rng, n), model.entity_ranks(rng, n)
+            texts = [model.memory(rng, int(t), int(a), int(b)) for t, a, b in zip(topics, e1, e2)]
+            for i in np.flatnonzero(rng.random(n) < 0.01):
+                if history:
+                    texts[i] = history[int(rng.integers(len(history)))] + " (follow-up)"
+            history = texts[-1000:]
+            vecs = embedder.encode(texts)
+
+            created = now - rng.random(n) * year
+            accessed = created + rng.random(n) * (now - created)
+            counts = rng.geometric(0.3, n) - 1
+            importance = np.clip(np.round(rng.beta(2.0, 3.0, n) + 0.05, 3), 0.05, 1.0)
+            semantic = rng.random(n) < 0.2
+            ids = [str(uuid.UUID(bytes=rng.bytes(16), version=4)) for _ in range(n)]
+
+            mem_rows = []  # type: List[Tuple[Any, ...]]
+            ent_rows = []  # type: List[Tuple[str, str]]
+            edge_rows = []  # type: List[Tuple[Any, ...]]
+            links = rng.random(n)
+            for i in range(n):
+                mem_rows.append((
+                    ids[i], texts[i], embedding_to_blob(vecs[i]), float(created[i]),
+                    float(accessed[i]), int(counts[i]), float(importance[i]),
+                    "semantic" if semantic[i] else "episodic",
+                ))
+                a, b = int(e1[i]), int(e2[i])
+                for e in {a, b}:
+                    ent_rows.append((ids[i], model.entities[e].lower()))
+                target = last_by_entity.get(a)
+                if target is not None and links[i] < 0.33:
+                    relation = "relates_to" if links[i] < 0.28 else "supports"
+                    edge_rows.append((
+                        str(uuid.UUID(bytes=rng.bytes(16), version=4)), ids[i], target,
+                        relation, round(0.5 + 0.5 * float(links[i]) / 0.33, 3), float(created[i]),
+                    ))
+                last_by_entity[a] = ids[i]
+
+            with conn:
+                conn.executemany(
+                    """INSERT INTO memories (id, content, embedding, created_at, last_accessed,
+                                             access_count, importance, type)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    mem_rows,
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO memory_entities (memory_id, entity) VALUES (?, ?)",
+                    ent_rows,
+                )
+                conn.executemany(
+                    """INSERT INTO edges (id, source, target, relation, weight, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    edge_rows,
+                )
+            edges += len(edge_rows)
+            entities += len(ent_rows)
+            if progress:
+                print(f"  corpus {size}: {start + n}/{size}", file=sys.stderr, flush=True)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+    manifest = {
+        "generator_version": GENERATOR_VERSION,
+        "size": size,
+        "seed": seed,
+        "memories": size,
+        "edges": edges,
+        "entity_rows": entities,
+        "distinct_entities": len(model.entities),
+        "topics": len(model.topics),
+        "generated_at": now,
+        "generate_s": round(time.perf_counter() - started, 2),
+        "db_bytes": os.path.getsize(db_path),
+    }
+    with open(_manifest_path(db_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def ensure(db_path: str, size: int, seed: int = 42, progress: bool = False) -> Dict[str, Any]:
+    """Return the manifest of the corpus at *db_path*, generating it if needed."""
+    manifest = load_manifest(db_path)
+    if (manifest is None or manifest.get("generator_version") != GENERATOR_VERSION
+            or manifest.get("size") != size or manifest.get("seed") != seed):
+        manifest = generate(db_path, size, seed, progress=progress)
+    return manifest
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+agent-memory / access_log.py
+=============================
+Deferred access-statistics write-back for recall.
+
+Recall used to ``UPDATE memories SET last_accessed, access_count`` and
+commit on every call, turning a read-heavy workload into a write-heavy WAL
+workload where concurrent agents queue on the write lock.  Instead, recall
+appends one line per returned memory to a side file next to the database:
+
+    <db>.access         "#gen <token>\\n" header, then
+                        "<timestamp>\\t<memory id>\\n" per access
+    <db>.access.lock    fcntl lock (appenders shared, flush exclusive)
+
+Appends are a single ``os.write`` on an ``O_APPEND`` descriptor and never
+touch SQLite.  ``flush`` folds the log into ``memories`` in one transaction
+(``last_accessed = max``, ``access_count += n``) and replaces the file
+with an empty one under a new generation header; it runs
+from ``flush-access``, ``reflect``, server shutdown, and automatically once
+the log holds ``ACCESS_FLUSH_ENTRIES`` entries.
+
+Until then, readers merge :meth:`AccessLog.pending` over the stored values,
+so recency scoring and reported stats stay correct.  A reader that sees
+a different header knows the log was flushed and re-reads it from the
+start; inode numbers and sizes alone cannot tell, since a freed inode is
+reused and the new log soon grows past the old read offset.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Dict, Iterable, Optional, Tuple
+
+# Pending entries that trigger an automatic flush from recall.
+ACCESS_FLUSH_ENTRIES: int = int(os.environ.get("AGENT_MEMORY_ACCESS_FLUSH", "1000"))
+
+_GEN_PREFIX = b"#gen "
+
+
+class AccessLog:
+    """Append-only access log for one database, with an incremental reader."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.path = db_path + ".access"
+        self._lock_path = db_path + ".access.lock"
+        self._mutex = threading.Lock()
+        # Parsed state: id -> (access count, latest timestamp)
+        self._pending = {}  # type: Dict[str, Tuple[int, float]]
+        self._entries = 0
+        self._offset = 0
+        self._gen = None  # type: Optional[bytes]
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def record(self, ids: Iterable[str], ts: float) -> None:
+        """Append one access per id (no SQLite write)."""
+        data = "".join(f"{ts:.6f}\t{mem_id}\n" for mem_id in ids).encode("utf-8")
+        if not data:
+            return
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    def flush(self, conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+        """Fold pending accesses into ``memories`` and start a new log.
+
+        Args:
+            conn: Connection to use; a private one is opened if omitted.
+
+        Returns:
+            Counts of log entries applied and memories updated.
+        """
+        own = conn is None
+        if own:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+        try:
+            with open(self._lock_path, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)  # blocks appenders until replaced
+                with self._mutex:
+                    self._reset()
+                    self._read_new()
+                    pending, entries = dict(self._pending), self._entries
+                if pending:
+                    with conn:
+                        conn.executemany(
+                            """UPDATE memories
+                               SET last_accessed = MAX(last_accessed, ?),
+                                   access_count = access_count + ?
+                               WHERE id = ?""",
+                            [(ts, count, mem_id) for mem_id, (count, ts) in pending.items()],
+                        )
+                if os.path.exists(self.path):
+                    tmp = self.path + ".tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(_GEN_PREFIX + uuid.uuid4().hex.encode("ascii") + b"\n")
+                    os.replace(tmp, self.path)
+                with self._mutex:
+                    self._reset()
+            return {"entries": entries, "memories": len(pending)}
+        finally:
+            if own:
+                conn.close()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _reset(self) -> None:
+        self._pending, self._entries, self._offset, self._gen = {}, 0, 0, None
+
+    def _read_new(self) -> None:
+        """Parse lines appended since the last read (restart after a flush)."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._reset()
+            return
+        with f:
+            head = f.readline(64)
+            gen = head if head.startswith(_GEN_PREFIX) else b""  # b"": never flushed
+            size = os.fstat(f.fileno()).st_size
+            if gen != self._gen or size < self._offset:
+                self._reset()
+                self._gen = gen
+            if size == self._offset:
+                return
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        end = data.rfind(b"\n") + 1  # leave a partially written line for later
+        for line in data[:end].decode("utf-8", errors="replace").splitlines():
+            if line.startswith("#"):
+                continue
+            ts_str, _, mem_id = line.partition("\t")
+            try:
+                ts = float(ts_str)
+            except ValueError:
+                continue
+            count, last = self._pending.get(mem_id, (0, 0.0))
+            self._pending[mem_id] = (count + 1, max(last, ts))
+            self._entries += 1
+        self._offset += end
+
+    def pending(self) -> Dict[str, Tuple[int, float]]:
+        """Unflushed accesses: memory id -> (count, latest timestamp)."""
+        with self._mutex:
+            self._read_new()
+            return dict(self._pending)
+
+    @property
+    def entries(self) -> int:
+        """Number of unflushed access entries."""
+        with self._mutex:
+            self._read_new()
+            return self._entries
+
+    def version(self) -> Tuple[Optional[int], int, int]:
+        """Cheap change marker: (inode, size, mtime) of the log file."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0, 0
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+# ---------------------------------------------------------------------------
+# Per-process cache
+# ---------------------------------------------------------------------------
+
+_LOGS = {}  # type: Dict[str, AccessLog]
+_LOGS_LOCK = threading.Lock()
+
+
+def get_access_log(db_path: str) -> AccessLog:
+    """Return the cached access log for *db_path*."""
+    key = os.path.realpath(db_path)
+    with _LOGS_LOCK:
+        log = _LOGS.get(key)
+        if log is None:
+            log = AccessLog(key)
+            _LOGS[key] = log
+        return log
+
+
+def flush_all() -> Dict[str, Dict[str, int]]:
+    """Flush every access log opened by this process (e.g. on server exit)."""
+    with _LOGS_LOCK:
+        logs = list(_LOGS.values())
+    return {log.db_path: log.flush() for log in logs}
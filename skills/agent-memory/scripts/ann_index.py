@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+agent-memory / ann_index.py
+============================
+Approximate nearest-neighbour index (IVF-flat) for large memory stores.
+
+Exact recall scores every row of the embedding matrix.  Past ~100K memories
+that is still fast in NumPy, but at millions it dominates recall latency.
+IVF-flat partitions the matrix with spherical k-means: each row is assigned
+to its nearest centroid, and a query only scores the rows of the ``nprobe``
+lists whose centroids are closest to it.  Candidates are then re-ranked with
+the exact hybrid score, so the index only decides *which* rows are scored.
+
+Files (next to the SQLite database):
+    <db>.ivf.centroids.npy   float32 (nlist × dim) unit-norm centroids
+    <db>.ivf.assign          int32 list id per embedding-matrix row (-1 = removed)
+    <db>.ivf.json            {"nlist", "count", "epoch", "built_at"}
+
+``count`` is how many matrix rows are assigned; rows appended to the matrix
+after that are picked up by ``add`` (on remember) and scanned exactly until
+then.  ``epoch`` ties the index to one build of the embedding matrix — if the
+matrix is rebuilt, row positions change and the index is discarded.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+# Rows assigned per chunk while building (bounds the M·Cᵀ temporary)
+_ASSIGN_CHUNK = 65536
+
+
+def default_nlist(n: int) -> int:
+    """Number of inverted lists for *n* rows: ~sqrt(n), clamped to [16, 4096]."""
+    return int(min(max(round(np.sqrt(n)), 16), 4096))
+
+
+def default_nprobe(nlist: int) -> int:
+    """Lists probed per query: ~10% of lists, at least 8."""
+    return int(min(max(nlist // 10, 8), nlist))
+
+
+def _spherical_kmeans(
+    data: np.ndarray, k: int, iters: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity; returns unit-norm centroids."""
+    centroids = data[rng.choice(len(data), size=k, replace=False)].astype(np.float32)
+    for _ in range(iters):
+        labels = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        counts = np.bincount(labels, minlength=k)
+        empty = counts == 0
+        if empty.any():  # re-seed empty clusters from random points
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index over the rows of an embedding matrix."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._centroids_path = db_path + ".ivf.centroids.npy"
+        self._assign_path = db_path + ".ivf.assign"
+        self._meta_path = db_path + ".ivf.json"
+        self._lock_path = db_path + ".ivf.lock"
+
+        self.meta = {}  # type: Dict
+        self.centroids = None  # type: Optional[np.ndarray]
+        self.assign = np.zeros(0, dtype=np.int32)
+        # Inverted lists: positions grouped by list id, list i = order[offsets[i]:offsets[i+1]]
+        self._order = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._loaded_mtime = None  # type: Optional[int]
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    @property
+    def count(self) -> int:
+        return int(self.meta.get("count", 0))
+
+    @property
+    def nlist(self) -> int:
+        return int(self.meta.get("nlist", 0))
+
+    def exists(self) -> bool:
+        return os.path.exists(self._meta_path)
+
+    def load(self, epoch: str) -> bool:
+        """(Re)load the index if it changed on disk.
+
+        Returns:
+            True if a usable index for this matrix *epoch* is loaded.
+        """
+        try:
+            mtime = os.stat(self._meta_path).st_mtime_ns
+        except FileNotFoundError:
+            self.meta, self.centroids, self._loaded_mtime = {}, None, None
+            return False
+        if mtime != self._loaded_mtime:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+            self.centroids = np.load(self._centroids_path)
+            assign = np.fromfile(self._assign_path, dtype=np.int32, count=self.count)
+            self._set_assign(assign)
+            self._loaded_mtime = mtime
+        return self.meta.get("epoch") == epoch
+
+    def drop(self) -> None:
+        """Delete the index files (e.g. after the matrix was rebuilt)."""
+        for path in (self._centroids_path, self._assign_path, self._meta_path):
+            if os.path.exists(path):
+                os.unlink(path)
+        self.meta, self.centroids, self._loaded_mtime = {}, None, None
+
+    def _set_assign(self, assign: np.ndarray) -> None:
+        self.assign = assign
+        self._order = np.argsort(assign, kind="stable")
+        self._offsets = np.searchsorted(assign[self._order], np.arange(self.nlist + 1))
+
+    def _write_meta(self) -> None:
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._meta_path)
+        self._loaded_mtime = os.stat(self._meta_path).st_mtime_ns
+
+    # ------------------------------------------------------------------
+    # Build / incremental maintenance
+    # ------------------------------------------------------------------
+
+    def _assign_rows(self, rows: np.ndarray) -> np.ndarray:
+        out = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), _ASSIGN_CHUNK):
+            chunk = np.asarray(rows[start:start + _ASSIGN_CHUNK], dtype=np.float32)
+            out[start:start + len(chunk)] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return out
+
+    def build(
+        self,
+        matrix: np.ndarray,
+        epoch: str,
+        live_pos: Optional[np.ndarray] = None,
+        nlist: Optional[int] = None,
+        iters: int = 10,
+        sample: int = 256,
+        seed: int = 0,
+    ) -> Dict:
+        """Train centroids and assign every matrix row.
+
+        Args:
+            matrix: Embedding matrix (rows are unit vectors).
+            epoch: Matrix epoch the assignment is valid for.
+            live_pos: Matrix positions of live rows; others are marked removed.
+            nlist: Number of lists (default: ~sqrt(n)).
+            iters: k-means iterations.
+            sample: Training points per list (caps k-means cost).
+            seed: RNG seed for reproducible builds.
+
+        Returns:
+            The new index metadata.
+        """
+        n = len(matrix)
+        nlist = nlist or default_nlist(n)
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(seed)
+
+        train_idx = np.sort(rng.choice(n, size=min(n, nlist * sample), replace=False))
+        self.centroids = _spherical_kmeans(np.asarray(matrix[train_idx]), nlist, iters, rng)
+        assign = self._assign_rows(matrix)
+        if live_pos is not None:
+            dead = np.ones(n, dtype=bool)
+            dead[live_pos] = False
+            assign[dead] = -1
+
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            np.save(self._centroids_path, self.centroids)
+            assign.tofile(self._assign_path)
+            self.meta = {"nlist": nlist, "count": n, "epoch": epoch, "built_at": time.time()}
+            self._write_meta()
+        self._set_assign(assign)
+        return dict(self.meta)
+
+    def add(self, matrix: np.ndarray) -> int:
+        """Assign matrix rows appended since the last build/add.
+
+        Returns:
+            Number of rows added to the index.
+        """
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.load(self.meta.get("epoch", ""))
+            start = self.count
+            if self.centroids is None or start >= len(matrix):
+                return 0
+            new = self._assign_rows(matrix[start:])
+            with open(self._assign_path, "r+b") as f:
+                f.seek(start * 4)
+                f.write(new.tobytes())
+                f.truncate((start + len(new)) * 4)
+            self.meta["count"] = start + len(new)
+            self._write_meta()
+        self._set_assign(np.concatenate([self.assign[:start], new]))
+        return len(new)
+
+    def remove(self, positions: np.ndarray) -> int:
+        """Drop matrix *positions* from their lists (soft-deleted memories)."""
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.load(self.meta.get("epoch", ""))
+            positions = np.asarray(positions, dtype=np.int64)
+            positions = positions[positions < self.count]
+            if len(positions) == 0:
+                return 0
+            on_disk = np.memmap(self._assign_path, dtype=np.int32, mode="r+", shape=(self.count,))
+            on_disk[positions] = -1
+            on_disk.flush()
+            del on_disk
+            self._write_meta()
+        assign = self.assign.copy()
+        assign[positions] = -1
+        self._set_assign(assign)
+        return len(positions)
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def candidates(self, query_vec: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Matrix positions in the *nprobe* lists nearest to *query_vec* (sorted)."""
+        nprobe = min(nprobe or default_nprobe(self.nlist), self.nlist)
+        sims = self.centroids @ np.asarray(query_vec, dtype=np.float32)
+        probe = np.argpartition(-sims, nprobe - 1)[:nprobe]
+        parts = [self._order[self._offsets[c]:self._offsets[c + 1]] for c in probe]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts))
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+agent-memory / embedding_backends.py
+=====================================
+Pluggable text → 384-dim vector engines.
+
+    sentence-transformers  all-MiniLM-L6-v2 through PyTorch (the original path)
+    onnx                   the same MiniLM exported to ONNX (quantized by
+                           default), run by onnxruntime with a Rust tokenizer —
+                           no torch import, a fraction of the startup time
+    hash                   hashed word / bigram / character-trigram features;
+                           zero dependencies beyond NumPy, microseconds per text,
+                           lexical rather than semantic similarity
+
+Every backend declares the vector space it produces (``model``).  The two
+MiniLM engines share one space, so a store written by one can be searched
+with the other; the hash backend has its own.  A database records its space
+in ``settings.embedding_model`` (see utils.backend_for), and vectors from
+different spaces are never mixed in one store — switching spaces means
+re-embedding everything (``memory.py reembed``).
+
+The engine is chosen with ``AGENT_MEMORY_EMBED_BACKEND``
+(``auto`` | ``onnx`` | ``sentence-transformers`` | ``hash``).  ``auto`` tries
+them in that order, restricted to the engines matching the store's space.
+"""
+
+from __future__ import annotations
+
+import functools
+import glob
+import importlib.util
+import os
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+MINILM_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+HASH_MODEL: str = "hash-ngram-v1"
+
+# ONNX export of MiniLM inside the Hugging Face repo (or a local directory
+# holding that file and tokenizer.json).
+ONNX_FILE: str = os.environ.get("AGENT_MEMORY_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+ONNX_DIR: Optional[str] = os.environ.get("AGENT_MEMORY_ONNX_DIR") or None
+
+# MiniLM was trained with 256-token inputs; sentence-transformers truncates there too.
+_MAX_TOKENS = 256
+
+
+class EmbeddingBackend:
+    """Base class: an engine producing L2-normalized vectors in ``model``'s space."""
+
+    name = ""  # type: str
+    model = ""  # type: str
+    dim = 384  # type: int
+
+    @classmethod
+    def available(cls, explicit: bool = False) -> bool:
+        """Cheap check (no heavy imports) that the engine could load.
+
+        *explicit* is True when the user asked for this engine by name, so
+        it may do slow work on load (e.g. download a model).
+        """
+        return True
+
+    def load(self) -> None:
+        """Load weights / sessions.  Raises on failure."""
+
+    def encode(self, texts: List[str], batch_size: int = 64, **kwargs: Any) -> np.ndarray:
+        """Embed *texts* into a float32 array of shape (len(texts), dim)."""
+        raise NotImplementedError
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return (vecs / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+# ---------------------------------------------------------------------------
+# sentence-transformers
+# ---------------------------------------------------------------------------
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """all-MiniLM-L6-v2 via sentence-transformers (imports torch)."""
+
+    name = "sentence-transformers"
+    model = MINILM_MODEL
+
+    @classmethod
+    def available(cls, explicit: bool = False) -> bool:
+        return importlib.util.find_spec("sentence_transformers") is not None
+
+    def load(self) -> None:
+        from sentence_transformers import SentenceTransformer  # lazy import
+        self._model = SentenceTransformer(MINILM_MODEL)
+
+    def encode(self, texts: List[str], batch_size: int = 64, **kwargs: Any) -> np.ndarray:
+        vecs = self._model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                  normalize_embeddings=True)
+        return np.asarray(vecs, dtype=np.float32).reshape(len(texts), -1)
+
+
+# ---------------------------------------------------------------------------
+# ONNX Runtime
+# ---------------------------------------------------------------------------
+
+class OnnxBackend(EmbeddingBackend):
+    """all-MiniLM-L6-v2 exported to ONNX, on onnxruntime's CPU provider.
+
+    Mean pooling over the attention mask and L2 normalization reproduce the
+    sentence-transformers pipeline; with the default quantized export the
+    vectors agree with it to about 0.99 cosine.
+    """
+
+    name = "onnx"
+    model = MINILM_MODEL
+
+    @classmethod
+    def available(cls, explicit: bool = False) -> bool:
+        # ``auto`` only picks ONNX once the model is on disk: a Hub download
+        # (with retries when offline) is not something to do implicitly.
+        if not all(importlib.util.find_spec(m) is not None for m in ("onnxruntime", "tokenizers")):
+            return False
+        return explicit or cls._local_files() is not None
+
+    @staticmethod
+    def _local_files() -> Optional[List[str]]:
+        """(model, tokenizer) paths from ONNX_DIR or the Hugging Face cache."""
+        if ONNX_DIR:
+            model_path = os.path.join(ONNX_DIR, ONNX_FILE)
+            if not os.path.exists(model_path):
+                model_path = os.path.join(ONNX_DIR, os.path.basename(ONNX_FILE))
+            return [model_path, os.path.join(ONNX_DIR, "tokenizer.json")]
+        hub = os.environ.get("HF_HUB_CACHE") or os.path.join(
+            os.environ.get("HF_HOME") or os.path.join(os.path.expanduser("~"), ".cache", "huggingface"),
+            "hub",
+        )
+        repo = "models--" + MINILM_MODEL.replace("/", "--")
+        for snapshot in sorted(glob.glob(os.path.join(hub, repo, "snapshots", "*"))):
+            files = [os.path.join(snapshot, ONNX_FILE), os.path.join(snapshot, "tokenizer.json")]
+            if all(os.path.exists(f) for f in files):
+                return files
+        return None
+
+    def _files(self) -> List[str]:
+        files = self._local_files()
+        if files is not None:
+            return files
+        from huggingface_hub import hf_hub_download  # lazy import; cached after the first run
+        return [hf_hub_download(MINILM_MODEL, ONNX_FILE), hf_hub_download(MINILM_MODEL, "tokenizer.json")]
+
+    def load(self) -> None:
+        import onnxruntime as ort  # lazy import
+        from tokenizers import Tokenizer
+
+        model_path, tokenizer_path = self._files()
+        self._tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._tokenizer.enable_truncation(max_length=_MAX_TOKENS)
+        self._tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(model_path, options,
+                                             providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self._session.get_inputs()}
+
+    def encode(self, texts: List[str], batch_size: int = 64, **kwargs: Any) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        # Similar lengths per batch keep padding (wasted compute) small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            encoded = self._tokenizer.encode_batch([texts[i] for i in idx])
+            ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            feed = {"input_ids": ids, "attention_mask": mask,
+                    "token_type_ids": np.zeros_like(ids)}
+            hidden = self._session.run(None, {k: v for k, v in feed.items() if k in self._inputs})[0]
+            weights = mask[:, :, None].astype(np.float32)
+            out[idx] = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return _normalize(out)
+
+
+# ---------------------------------------------------------------------------
+# Hashed n-grams
+# ---------------------------------------------------------------------------
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class HashBackend(EmbeddingBackend):
+    """Signed feature hashing of words, word bigrams and character trigrams.
+
+    Each feature is CRC32-hashed (with a per-kind prefix) to a dimension and
+    a sign; a text is the weighted sum, L2-normalized.  Trigrams of
+    ``<word>`` make inflections and typos land close to each other.
+    Deterministic across processes and machines.
+    """
+
+    name = "hash"
+    model = HASH_MODEL
+
+    _WEIGHTS = {"w": 1.0, "b": 0.5, "c": 0.25}
+
+    def _hash(self, kind: str, feat: str) -> Tuple[int, float]:
+        h = zlib.crc32(f"{kind}:{feat}".encode("utf-8"))
+        return h % self.dim, (self._WEIGHTS[kind] if h & 0x80000000 else -self._WEIGHTS[kind])
+
+    @functools.lru_cache(maxsize=1 << 16)
+    def _word(self, word: str) -> Tuple[Tuple[int, float], ...]:
+        """Word + character-trigram features (vocabularies repeat: cached)."""
+        padded = "<" + word + ">"
+        return (self._hash("w", word),) + tuple(
+            self._hash("c", padded[i:i + 3]) for i in range(len(padded) - 2)
+        )
+
+    def encode(self, texts: List[str], batch_size: int = 64, **kwargs: Any) -> np.ndarray:
+        slots = []  # type: List[int]
+        values = []  # type: List[float]
+        for row, text in enumerate(texts):
+            words = _WORD_RE.findall(text.lower())
+            feats = [f for w in words for f in self._word(w)]
+            feats += [self._hash("b", a + " " + b) for a, b in zip(words, words[1:])]
+            base = row * self.dim
+            slots += [base + k for k, _ in feats]
+            values += [v for _, v in feats]
+        out = np.bincount(np.array(slots, dtype=np.int64), weights=np.array(values),
+                          minlength=len(texts) * self.dim)
+        return _normalize(out.reshape(len(texts), self.dim))
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+BACKENDS = {
+    cls.name: cls for cls in (OnnxBackend, SentenceTransformerBackend, HashBackend)
+}  # type: Dict[str, Type[EmbeddingBackend]]
+
+# ``auto`` preference for a new store: real models only, fastest first.  The
+# first engine to write a vector tags the store for good, so ``auto`` never
+# settles a store on hashing just because no model is installed yet.
+AUTO_ORDER = ("onnx", "sentence-transformers")
+
+
+def candidates(preference: str, model: Optional[str]) -> List[str]:
+    """Backend names to try, in order, for a store whose vectors are in *model*.
+
+    Args:
+        preference: ``auto`` or a backend name (AGENT_MEMORY_EMBED_BACKEND).
+        model: The store's embedding_model, or None for a store without
+            vectors yet.
+
+    Returns:
+        Names of installed engines producing *model*'s space.  For a new
+        store an explicit preference is honoured alone (no silent switch
+        to another space) and ``auto`` only tries AUTO_ORDER; hashing must
+        be chosen explicitly.  A store already in a space may use any
+        engine producing it.
+    """
+    if preference != "auto" and preference not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {preference} "
+                         f"(choose from auto, {', '.join(BACKENDS)})")
+    if model is None:
+        names = list(AUTO_ORDER) if preference == "auto" else [preference]
+    else:
+        names = ([preference] if preference != "auto" else []) + list(AUTO_ORDER) + list(BACKENDS)
+        names = [n for i, n in enumerate(names) if n not in names[:i] and BACKENDS[n].model == model]
+    return [n for n in names if BACKENDS[n].available(explicit=n == preference)]
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+agent-memory / embedding_cache.py
+==================================
+Content-addressed cache for embeddings.
+
+The same strings are embedded over and over: identical recall queries from
+different agents, work-item summaries that only differ in status, re-imports
+of the same markdown.  Each is a full model forward pass (and, in a cold CLI
+process, a multi-second model load).
+
+Keys are SHA-256 of ``model name + normalized text`` (whitespace collapsed),
+so vectors from different models never collide.  Two tiers:
+
+  - in-process LRU (``OrderedDict``) for the resident server and batch jobs
+  - on-disk SQLite table shared by every process on the host
+
+Hit/miss counters are kept per process and folded into the on-disk totals
+when the process exits (or on ``flush_stats``), so lookups stay read-only.
+The keys a process hit are stamped with ``last_used`` at the same time.
+
+The on-disk table holds at most ``EMBED_CACHE_MAX_ROWS`` entries: a write
+that pushes it over evicts the least recently used tenth.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+_WS_RE = re.compile(r"\s+")
+
+# On-disk entries kept (AGENT_MEMORY_EMBED_CACHE_ROWS); ~1.6 KB each at 384 dims.
+EMBED_CACHE_MAX_ROWS: int = int(os.environ.get("AGENT_MEMORY_EMBED_CACHE_ROWS", "200000"))
+
+# Fraction of the bound evicted at once, so eviction does not run on every write.
+_EVICT_FRACTION = 0.1
+
+_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    embedding   BLOB NOT NULL,
+    created_at  REAL NOT NULL,
+    last_used   REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    name    TEXT PRIMARY KEY,
+    value   INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def cache_key(text: str, model: str) -> str:
+    """SHA-256 of the model name and whitespace-normalized text."""
+    normalized = _WS_RE.sub(" ", text).strip()
+    return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier (LRU + SQLite) embedding cache."""
+
+    def __init__(self, path: str, capacity: int = 4096, max_rows: int = EMBED_CACHE_MAX_ROWS):
+        self.path = path
+        self.capacity = capacity
+        self.max_rows = max(max_rows, 1)
+        self._lru = OrderedDict()  # type: OrderedDict[str, np.ndarray]
+        self._lock = threading.Lock()
+        self._conn = None  # type: Optional[sqlite3.Connection]
+        self._rows = 0  # on-disk entries as of the last count + our inserts
+        self._used = {}  # type: Dict[str, float]  # key -> last hit, not yet stamped
+        self.stats = {"lru_hits": 0, "disk_hits": 0, "misses": 0}
+        self._flushed = dict(self.stats)
+        atexit.register(self.flush_stats)
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL;")
+                conn.executescript(_CACHE_SQL)
+                columns = {r[1] for r in conn.execute("PRAGMA table_info(embedding_cache)")}
+                if "last_used" not in columns:  # cache written before eviction existed
+                    conn.execute("ALTER TABLE embedding_cache "
+                                 "ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_used "
+                             "ON embedding_cache(last_used)")
+                conn.commit()
+                self._rows = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+                self._conn = conn
+            except sqlite3.Error:
+                return None  # cache is an optimisation; never fail embedding on it
+        return self._conn
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Look up *keys*; returns the ones found (LRU first, then disk)."""
+        found = {}  # type: Dict[str, np.ndarray]
+        now = time.time()
+        with self._lock:
+            missing = []
+            for key in keys:
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vec
+                    self._used[key] = now
+                    self.stats["lru_hits"] += 1
+                else:
+                    missing.append(key)
+
+            conn = self._db() if missing else None
+            if conn is not None:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = conn.execute(
+                        f"""SELECT key, embedding FROM embedding_cache
+                            WHERE key IN ({",".join("?" * len(chunk))})""",
+                        chunk,
+                    ).fetchall()
+                    for key, blob in rows:
+                        vec = np.frombuffer(blob, dtype=np.float32).copy()
+                        found[key] = vec
+                        self._remember(key, vec)
+                        self._used[key] = now
+                        self.stats["disk_hits"] += 1
+            self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray], model: str) -> None:
+        """Store freshly computed embeddings in both tiers."""
+        if not items:
+            return
+        with self._lock:
+            for key, vec in items.items():
+                self._remember(key, vec)
+            conn = self._db()
+            if conn is None:
+                return
+            now = time.time()
+            try:
+                with conn:
+                    conn.executemany(
+                        """INSERT OR REPLACE INTO embedding_cache
+                           (key, model, embedding, created_at, last_used)
+                           VALUES (?, ?, ?, ?, ?)""",
+                        [(k, model, np.asarray(v, dtype=np.float32).tobytes(), now, now)
+                         for k, v in items.items()],
+                    )
+                self._rows += len(items)
+                if self._rows > self.max_rows:
+                    self._evict(conn)
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Delete least recently used entries until under the bound (hold _lock).
+
+        Returns:
+            Entries deleted.
+        """
+        self._stamp_used(conn)
+        self._rows = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        excess = self._rows - int(self.max_rows * (1 - _EVICT_FRACTION))
+        if self._rows <= self.max_rows or excess <= 0:
+            return 0
+        with conn:
+            deleted = conn.execute(
+                """DELETE FROM embedding_cache WHERE key IN (
+                       SELECT key FROM embedding_cache ORDER BY last_used LIMIT ?)""",
+                (excess,),
+            ).rowcount
+        self._rows -= deleted
+        return deleted
+
+    def _stamp_used(self, conn: sqlite3.Connection) -> None:
+        """Write the last-hit times collected by lookups (hold _lock)."""
+        if not self._used:
+            return
+        with conn:
+            conn.executemany(
+                "UPDATE embedding_cache SET last_used = MAX(last_used, ?) WHERE key = ?",
+                [(ts, key) for key, ts in self._used.items()],
+            )
+        self._used = {}
+
+    def flush_stats(self) -> None:
+        """Add this process's hit/miss counts to the on-disk totals."""
+        with self._lock:
+            delta = {k: v - self._flushed[k] for k, v in self.stats.items()}
+            if not any(delta.values()):
+                return
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                self._stamp_used(conn)
+                with conn:
+                    for name, value in delta.items():
+                        conn.execute(
+                            """INSERT INTO cache_stats (name, value) VALUES (?, ?)
+                               ON CONFLICT(name) DO UPDATE SET value = value + excluded.value""",
+                            (name, value),
+                        )
+                self._flushed = dict(self.stats)
+            except sqlite3.Error:
+                pass
+
+    def report(self) -> Dict:
+        """Per-process and lifetime hit/miss counts plus cache size."""
+        self.flush_stats()
+        lifetime = {"lru_hits": 0, "disk_hits": 0, "misses": 0}
+        entries = 0
+        conn = self._db()
+        if conn is not None:
+            lifetime.update(dict(conn.execute("SELECT name, value FROM cache_stats").fetchall()))
+            entries = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        lookups = sum(lifetime.values())
+        hits = lifetime["lru_hits"] + lifetime["disk_hits"]
+        return {
+            "entries": entries,
+            "max_entries": self.max_rows,
+            "lru_entries": len(self._lru),
+            "path": self.path,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "process": dict(self.stats),
+            "lifetime": lifetime,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
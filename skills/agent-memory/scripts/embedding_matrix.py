@@ -0,0 +1,800 @@
+#!/usr/bin/env python3
+"""
+agent-memory / embedding_matrix.py
+===================================
+Vectorized scoring engine for recall.
+
+Keeps every stored embedding in one contiguous float32 matrix so the hybrid
+score for the whole store is a single matrix-vector product instead of a
+per-row Python loop.
+
+Sidecar files (next to the SQLite database):
+    <db>.vec        matrix codes, one row per memory with an embedding
+                    (float32, float16 or int8 — the DB's embedding_format)
+    <db>.vec.scales float32 per-row scale (int8 format only)
+    <db>.vec.ids    int64 SQLite rowid for each matrix row (ascending)
+    <db>.vec.json   {"dim", "format", "model", "count", "max_rowid", "max_id",
+                     "deleted", "covered_rows"}
+
+Embeddings are immutable once written, so keeping the sidecar in sync is an
+append of rows with ``rowid > max_rowid``.  If rows were physically deleted
+(the ``settings.memories_deleted`` counter moved past ``deleted``; on a store
+without it, ``covered_rows`` no longer matches), the row at ``max_rowid`` is no longer
+the memory ``max_id`` (SQLite reuses the highest rowid after it is deleted,
+e.g. by tiering.py), or the store switched embedding
+backends (``reembed`` rewrites vectors in place), the sidecar is rebuilt
+from scratch.
+Soft-deleted (decayed) memories stay in the matrix and are masked out by the
+live-row arrays loaded from SQLite.
+
+Importance and last_accessed are kept as parallel NumPy arrays refreshed
+whenever another connection commits (``PRAGMA data_version``), so a resident
+process re-reads them only after writes, and then only the rows added or
+stamped by the ``memories.changed`` trigger since its last load (all rows
+after a sidecar rebuild).  Accesses still waiting in the access log
+(access_log.py) are merged over last_accessed.
+
+With a quantized format the whole matrix is scored coarsely from the compact
+codes, then the best ``limit × RERANK_FACTOR`` candidates are re-scored in
+float32 against their renormalized vectors before the final top-k.
+
+Above ``ANN_MIN_ROWS`` live memories, recall narrows the scored rows with the
+IVF index from ann_index.py (when one has been built by ``reflect``) and
+re-ranks that candidate set exactly.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from access_log import get_access_log
+from ann_index import IVFIndex
+from utils import (
+    EMBEDDING_DIM,
+    EMBEDDING_FORMATS,
+    apply_profile,
+    blob_to_embedding,
+    blob_width,
+    MODEL_NAME,
+    embedding_format,
+    embedding_model,
+    get_setting,
+    quantize,
+)
+
+# Rows decoded per SELECT while syncing the sidecar.
+_SYNC_BATCH = 5000
+
+# Read size while pulling files into the OS page cache (warmup).
+_WARM_CHUNK = 4 * 1024 * 1024
+
+# Sidecar code dtype per embedding format
+_CODE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Rows dequantized per chunk when scoring a compact matrix (bounds the temporary).
+_DOT_CHUNK = 4096
+
+# Queries scored per M·Qᵀ block in top_k_batch (bounds the rows × m temporary)
+_BATCH_QUERIES = 64
+
+# Quantized formats: coarse candidates re-scored in float32 per requested result.
+RERANK_FACTOR: int = 4
+_RERANK_MIN = 50
+
+# Live-row count above which recall uses the IVF index (if built).
+ANN_MIN_ROWS: int = int(os.environ.get("AGENT_MEMORY_ANN_MIN_ROWS", "100000"))
+
+
+class QuantizedMatrix:
+    """Row view over stored codes (+ per-row scales) that yields float32.
+
+    Indexing (``m[i]``, ``m[a:b]``, ``m[positions]``) returns dequantized
+    float32 rows, so callers written against a plain float32 matrix (the
+    IVF index, reflect's similarity join) work unchanged.
+    """
+
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray] = None):
+        self.codes = codes
+        self.scales = scales
+
+    @property
+    def format(self) -> str:
+        if self.scales is not None:
+            return "int8"
+        return "float16" if self.codes.dtype == np.float16 else "float32"
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.codes.shape
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, idx) -> np.ndarray:
+        rows = np.asarray(self.codes[idx], dtype=np.float32)
+        if self.scales is not None:
+            scales = np.asarray(self.scales[idx], dtype=np.float32)
+            rows = rows * (scales[..., None] if rows.ndim > 1 else scales)
+        return rows
+
+    def dot(self, q: np.ndarray, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Similarities of *q* to rows (all, or *positions*), chunk by chunk.
+
+        *q* is one query (dim,) or a block of queries (dim × m); the result
+        is (rows,) or (rows × m) accordingly.
+        """
+        if self.format == "float32":
+            if positions is None:
+                return np.asarray(self.codes @ q)
+            if len(positions) * 2 >= len(self.codes):
+                return np.asarray(self.codes @ q)[positions]
+            return self.codes[positions] @ q
+        if positions is not None and len(positions) * 2 >= len(self.codes):
+            return self.dot(q)[positions]
+        n = len(self) if positions is None else len(positions)
+        out = np.empty((n,) + q.shape[1:], dtype=np.float32)
+        for start in range(0, n, _DOT_CHUNK):
+            stop = min(start + _DOT_CHUNK, n)
+            idx = slice(start, stop) if positions is None else positions[start:stop]
+            # Per-row scales factor out of the dot product: (s·c)·q = s·(c·q)
+            out[start:stop] = np.asarray(self.codes[idx], dtype=np.float32) @ q
+            if self.scales is not None:
+                scales = np.asarray(self.scales[idx], dtype=np.float32)
+                out[start:stop] *= scales.reshape((-1,) + (1,) * (q.ndim - 1))
+        return out
+
+    def rescore(self, q: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Float32 cosine of *q* against renormalized rows at *positions*."""
+        rows = self[positions]
+        norms = np.linalg.norm(rows, axis=1)
+        norms[norms == 0] = 1.0
+        return (rows @ q) / norms
+
+
+def _blobs_to_codes(
+    blobs: List[bytes], fmt: str, dim: int
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Encode stored blobs as sidecar codes (+ scales) in format *fmt*."""
+    width = blob_width(fmt, dim)
+    if all(len(b) == width for b in blobs):  # common case: no re-encoding
+        raw = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), width)
+        if fmt == "int8":
+            return raw[:, 4:].view(np.int8), raw[:, :4].copy().view(np.float32).ravel()
+        return raw.view(np.float16 if fmt == "float16" else np.float32), None
+    return quantize(np.stack([blob_to_embedding(b) for b in blobs]), fmt)
+
+
+class EmbeddingMatrix:
+    """Memory-mapped embedding matrix plus live-row metadata for one DB."""
+
+    def __init__(self, db_path: str, dim: int = EMBEDDING_DIM):
+        self.db_path = db_path
+        self.dim = dim
+        self._vec_path = db_path + ".vec"
+        self._ids_path = db_path + ".vec.ids"
+        self._scales_path = db_path + ".vec.scales"
+        self._meta_path = db_path + ".vec.json"
+        self._lock_path = db_path + ".vec.lock"
+
+        self._conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False)
+        apply_profile(self._conn)
+        self._mutex = threading.Lock()
+        self._data_version = None  # type: Optional[int]
+
+        self.matrix = QuantizedMatrix(np.zeros((0, dim), dtype=np.float32))
+        self.rowids = np.zeros(0, dtype=np.int64)
+        # Live (non-decayed) rows: positions into ``matrix`` + parallel metadata
+        self.live_pos = np.zeros(0, dtype=np.int64)
+        self.live_rowids = np.zeros(0, dtype=np.int64)
+        self.importance = np.zeros(0, dtype=np.float32)
+        self.last_accessed = np.zeros(0, dtype=np.float64)
+        # (epoch, memories_version, max rowid) the live arrays were loaded at
+        self._live_mark = None  # type: Optional[Tuple[str, Optional[int], int]]
+
+        self.epoch = ""
+        self.ann = IVFIndex(db_path)
+        self.access = get_access_log(db_path)
+        self._access_version = None  # type: Optional[Tuple[Optional[int], int, int]]
+
+    # ------------------------------------------------------------------
+    # Sidecar maintenance
+    # ------------------------------------------------------------------
+
+    def _read_meta(self) -> Dict[str, int]:
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("dim") == self.dim:
+                return meta
+        except (OSError, ValueError):
+            pass
+        return self._empty_meta()
+
+    def _empty_meta(self, fmt: str = "float32") -> Dict:
+        return {"dim": self.dim, "format": fmt, "count": 0, "max_rowid": 0,
+                "max_id": None, "deleted": None, "covered_rows": 0,
+                "epoch": uuid.uuid4().hex}
+
+    def _deletions(self) -> Optional[int]:
+        """settings.memories_deleted, or None if the store has no deletion trigger."""
+        has_trigger = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'memories_deleted_ad'"
+        ).fetchone()
+        if not has_trigger:
+            return None
+        return int(get_setting(self._conn, "memories_deleted", "0"))
+
+    def _covered(self, max_rowid: int) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM memories WHERE rowid <= ?", (max_rowid,)
+        ).fetchone()[0]
+
+    def _id_at(self, rowid: int) -> Optional[str]:
+        row = self._conn.execute("SELECT id FROM memories WHERE rowid = ?", (rowid,)).fetchone()
+        return row[0] if row else None
+
+    def _write_meta(self, meta: Dict[str, int]) -> None:
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path)
+
+    def _sync_sidecar(self) -> Dict[str, int]:
+        """Append embeddings written since the last sync.
+
+        The sidecar is rebuilt if rows vanished or a rowid it covers now
+        belongs to another memory, the DB's embedding format
+        changed (``quantize``) or its vector space did (``reembed``); blobs
+        in another format are re-encoded.
+        """
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            meta = self._read_meta()
+            fmt = embedding_format(self._conn)
+            model = embedding_model(self._conn) or MODEL_NAME
+
+            # The counter spares a COUNT(*) over the whole table per sync
+            deleted = self._deletions()
+            if deleted is not None and meta.get("deleted") is not None:
+                vanished = deleted != meta["deleted"]
+            else:
+                vanished = self._covered(meta["max_rowid"]) != meta["covered_rows"]
+            if (vanished
+                    or self._id_at(meta["max_rowid"]) != meta.get("max_id")
+                    or meta.get("format", "float32") != fmt
+                    or meta.get("model", MODEL_NAME) != model):
+                # Unlink rather than truncate: other processes may still map the old files
+                for path in (self._vec_path, self._ids_path, self._scales_path):
+                    if os.path.exists(path):
+                        os.unlink(path)
+                meta = self._empty_meta(fmt)
+            meta["format"] = fmt
+            meta["model"] = model
+
+            # Drop any rows appended by a writer that died before updating meta
+            widths = [(self._vec_path, self.dim * np.dtype(_CODE_DTYPES[fmt]).itemsize),
+                      (self._ids_path, 8)]
+            if fmt == "int8":
+                widths.append((self._scales_path, 4))
+            for path, width in widths:
+                with open(path, "ab") as f:
+                    f.truncate(meta["count"] * width)
+
+            valid = {blob_width(f, self.dim) for f in EMBEDDING_FORMATS}
+            last_rowid = meta["max_rowid"]
+            scales_file = open(self._scales_path, "ab") if fmt == "int8" else nullcontext()
+            with open(self._vec_path, "ab") as vec_f, open(self._ids_path, "ab") as ids_f, \
+                    scales_file as sc_f:
+                while True:
+                    rows = self._conn.execute(
+                        """SELECT rowid, embedding FROM memories
+                           WHERE rowid > ? AND embedding IS NOT NULL
+                           ORDER BY rowid LIMIT ?""",
+                        (last_rowid, _SYNC_BATCH),
+                    ).fetchall()
+                    if not rows:
+                        break
+                    last_rowid = rows[-1][0]
+                    rows = [r for r in rows if len(r[1]) in valid]
+                    if rows:
+                        codes, scales = _blobs_to_codes([r[1] for r in rows], fmt, self.dim)
+                        vec_f.write(codes.tobytes())
+                        if scales is not None:
+                            sc_f.write(scales.tobytes())
+                        ids_f.write(np.array([r[0] for r in rows], dtype=np.int64).tobytes())
+                        meta["count"] += len(rows)
+
+            max_rowid = self._conn.execute("SELECT MAX(rowid) FROM memories").fetchone()[0] or 0
+            meta["max_rowid"] = max(last_rowid, max_rowid)
+            meta["max_id"] = self._id_at(meta["max_rowid"])
+            meta["deleted"] = deleted
+            meta["covered_rows"] = (self._covered(meta["max_rowid"]) if deleted is None
+                                    else None)
+            self._write_meta(meta)
+            return meta
+
+    def _map(self, count: int, fmt: str = "float32") -> None:
+        if count == 0:
+            self.matrix = QuantizedMatrix(np.zeros((0, self.dim), dtype=np.float32))
+            self.rowids = np.zeros(0, dtype=np.int64)
+            return
+        codes = np.memmap(self._vec_path, dtype=_CODE_DTYPES[fmt], mode="r", shape=(count, self.dim))
+        scales = None
+        if fmt == "int8":
+            scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(count,))
+        self.matrix = QuantizedMatrix(codes, scales)
+        self.rowids = np.memmap(self._ids_path, dtype=np.int64, mode="r", shape=(count,))
+
+    def _change_marks(self) -> Tuple[Optional[int], int]:
+        """Current (memories_version, max rowid); version None before migration 3."""
+        try:
+            row = self._conn.execute(
+                "SELECT value FROM settings WHERE key = 'memories_version'"
+            ).fetchone()
+            self._conn.execute("SELECT changed FROM memories LIMIT 0")
+            version = int(row[0]) if row else 0  # type: Optional[int]
+        except sqlite3.OperationalError:
+            version = None
+        max_rowid = self._conn.execute("SELECT MAX(rowid) FROM memories").fetchone()[0] or 0
+        return version, max_rowid
+
+    def _load_live(self) -> None:
+        """Load importance/last_accessed for non-decayed rows present in the matrix."""
+        # Marks first: a row changed during the load is read again next time
+        self._live_mark = (self.epoch,) + self._change_marks()
+        rows = self._conn.execute(
+            """SELECT rowid, importance, last_accessed FROM memories
+               WHERE decayed = 0 ORDER BY rowid"""
+        ).fetchall()
+        if not rows or len(self.rowids) == 0:
+            self.live_pos = np.zeros(0, dtype=np.int64)
+            self.live_rowids = np.zeros(0, dtype=np.int64)
+            self.importance = np.zeros(0, dtype=np.float32)
+            self.last_accessed = np.zeros(0, dtype=np.float64)
+            return
+
+        meta = np.array(rows, dtype=np.float64)
+        rowids = meta[:, 0].astype(np.int64)
+        pos = np.searchsorted(self.rowids, rowids)
+        pos = np.minimum(pos, len(self.rowids) - 1)
+        has_vec = self.rowids[pos] == rowids  # memories without embeddings drop out
+
+        self.live_pos = pos[has_vec]
+        self.live_rowids = rowids[has_vec]
+        self.importance = meta[has_vec, 1].astype(np.float32)
+        self.last_accessed = meta[has_vec, 2]
+
+    def _update_live(self) -> None:
+        """Apply rows added or changed since the last load to the live arrays.
+
+        Falls back to :meth:`_load_live` after a sidecar rebuild (matrix
+        positions moved) or on a database without the change counter.
+        """
+        mark = self._live_mark
+        version, max_rowid = self._change_marks()
+        if mark is None or mark[0] != self.epoch or mark[1] is None or version is None:
+            self._load_live()
+            return
+        rows = self._conn.execute(
+            # Two index lookups; an OR of both terms would scan the table
+            """SELECT rowid, importance, last_accessed, decayed FROM memories
+               WHERE changed > ?
+               UNION
+               SELECT rowid, importance, last_accessed, decayed FROM memories
+               WHERE rowid > ?""",
+            (mark[1], mark[2]),
+        ).fetchall()
+        self._live_mark = (self.epoch, version, max_rowid)
+        if not rows:
+            return
+
+        meta = np.array(rows, dtype=np.float64)
+        rowids = meta[:, 0].astype(np.int64)
+        live = meta[:, 3] == 0
+        if len(self.rowids):
+            pos = np.minimum(np.searchsorted(self.rowids, rowids), len(self.rowids) - 1)
+            live &= self.rowids[pos] == rowids
+        else:
+            pos = np.zeros(len(rowids), dtype=np.int64)
+            live[:] = False
+
+        if len(self.live_rowids):
+            idx = np.minimum(np.searchsorted(self.live_rowids, rowids), len(self.live_rowids) - 1)
+            present = self.live_rowids[idx] == rowids
+        else:
+            idx = np.zeros(len(rowids), dtype=np.int64)
+            present = np.zeros(len(rowids), dtype=bool)
+        if np.array_equal(live, present):
+            # Only importance/last_accessed moved (e.g. an access flush)
+            self.importance[idx[live]] = meta[live, 1]
+            self.last_accessed[idx[live]] = meta[live, 2]
+            return
+
+        keep = np.ones(len(self.live_rowids), dtype=bool)
+        keep[idx[present]] = False
+        order = np.argsort(np.concatenate([self.live_rowids[keep], rowids[live]]), kind="stable")
+        self.live_pos = np.concatenate([self.live_pos[keep], pos[live]])[order]
+        self.live_rowids = np.concatenate([self.live_rowids[keep], rowids[live]])[order]
+        self.importance = np.concatenate(
+            [self.importance[keep], meta[live, 1].astype(np.float32)])[order]
+        self.last_accessed = np.concatenate([self.last_accessed[keep], meta[live, 2]])[order]
+
+    def sync(self) -> None:
+        """Append new embeddings to the sidecar and the IVF index.
+
+        Cheap enough to run after every write (cmd_remember): it only reads
+        rows newer than the last sync and does not reload the live arrays.
+        Safe to call from a writer thread while others score: the sidecar
+        is updated under its file lock, and the new arrays are swapped in
+        under the mutex that ``top_k`` holds.
+        """
+        meta = self._sync_sidecar()
+        with self._mutex:
+            self._adopt(meta)
+
+    def _adopt(self, meta: Dict) -> None:
+        """Map the sidecar described by *meta* and catch the IVF index up (hold _mutex)."""
+        if meta.get("epoch") == self.epoch and meta["count"] < len(self.matrix):
+            return  # a concurrent sync already mapped a newer state
+        self._map(meta["count"], meta.get("format", "float32"))
+        if meta.get("epoch") != self.epoch:
+            self.epoch = meta.get("epoch", "")
+        if self.ann.exists():
+            if self.ann.load(self.epoch):
+                self.ann.add(self.matrix)
+            else:
+                self.ann.drop()  # matrix was rebuilt; row positions changed
+
+    def refresh(self) -> None:
+        """Bring the matrix and live arrays up to date if the DB changed (hold _mutex)."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._adopt(self._sync_sidecar())
+            self._update_live()
+            self._data_version = version
+            self._access_version = None
+        self._merge_access()
+
+    def _merge_access(self) -> None:
+        """Overlay unflushed access timestamps onto ``last_accessed``."""
+        marker = self.access.version()
+        if marker == self._access_version:
+            return
+        pending = self.access.pending()
+        if pending and len(self.live_rowids):
+            ids = list(pending)
+            found = []  # type: List[Tuple[int, float]]
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT rowid, id FROM memories WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.extend((rowid, pending[mem_id][1]) for rowid, mem_id in rows)
+            if found:
+                rowids = np.array([r for r, _ in found], dtype=np.int64)
+                ts = np.array([t for _, t in found], dtype=np.float64)
+                idx = np.minimum(np.searchsorted(self.live_rowids, rowids),
+                                 len(self.live_rowids) - 1)
+                hit = self.live_rowids[idx] == rowids
+                np.maximum.at(self.last_accessed, idx[hit], ts[hit])
+        self._access_version = marker
+
+    def positions_of(self, rowids: List[int]) -> np.ndarray:
+        """Matrix positions of the given SQLite rowids (missing ones skipped)."""
+        if len(self.rowids) == 0 or not rowids:
+            return np.zeros(0, dtype=np.int64)
+        ids = np.asarray(rowids, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.rowids, ids), len(self.rowids) - 1)
+        return pos[self.rowids[pos] == ids]
+
+    def warmup(self) -> Dict:
+        """Pre-fault the pages the first recall would otherwise read from disk.
+
+        Loads the matrix, reads the sidecar, IVF and database files through
+        the OS page cache, and touches every page of the mapped matrix so a
+        resident process does not take its page faults on the first
+        queries.  Pages stay cached only while the OS has memory to spare.
+
+        Returns:
+            {"files", "bytes", "rows", "seconds"}
+        """
+        start = time.perf_counter()
+        with self._mutex:
+            self.refresh()
+            paths = [self.db_path, self.db_path + "-wal", self._vec_path, self._ids_path,
+                     self._scales_path, self.ann._centroids_path, self.ann._assign_path]
+            warmed, total = 0, 0
+            for path in paths:
+                size = _read_through(path)
+                if size is not None:
+                    warmed += 1
+                    total += size
+            for arr in (self.matrix.codes, self.matrix.scales, self.rowids):
+                if arr is not None and arr.size:
+                    step = max(_page_size() // arr.itemsize, 1)
+                    np.asarray(arr).reshape(-1)[::step].sum()  # one read per page
+            return {
+                "files": warmed,
+                "bytes": total,
+                "rows": len(self.matrix),
+                "seconds": round(time.perf_counter() - start, 4),
+            }
+
+    # ------------------------------------------------------------------
+    # ANN index maintenance
+    # ------------------------------------------------------------------
+
+    def build_index(self, nlist: Optional[int] = None) -> Dict:
+        """(Re)build the IVF index over the current matrix."""
+        with self._mutex:
+            self._data_version = None
+            self.refresh()
+            if len(self.matrix) == 0:
+                return {"status": "empty"}
+            return self.ann.build(self.matrix, self.epoch, live_pos=self.live_pos, nlist=nlist)
+
+    def forget(self, rowids: List[int]) -> int:
+        """Remove soft-deleted memories from the IVF lists."""
+        with self._mutex:
+            self._adopt(self._sync_sidecar())
+            if not self.ann.load(self.epoch):
+                return 0
+            return self.ann.remove(self.positions_of(rowids))
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _candidates(self, query_vec: np.ndarray, nprobe: Optional[int]) -> Optional[np.ndarray]:
+        """Indices into the live arrays to score via ANN, or None for a full scan."""
+        if not self.ann.load(self.epoch):
+            return None
+        pos = self.ann.candidates(query_vec, nprobe)
+        # Rows appended since the last index update are scanned exactly
+        tail = np.arange(self.ann.count, len(self.matrix), dtype=np.int64)
+        if len(tail):
+            pos = np.concatenate([pos, tail])
+        idx = np.searchsorted(self.live_pos, pos)
+        idx = np.minimum(idx, max(len(self.live_pos) - 1, 0))
+        return np.unique(idx[self.live_pos[idx] == pos])
+
+    def _rank(
+        self,
+        q: np.ndarray,
+        pos: np.ndarray,
+        sims: np.ndarray,
+        importance: np.ndarray,
+        recency: np.ndarray,
+        rowids: np.ndarray,
+        limit: int,
+    ) -> List[Tuple[int, float, float, float]]:
+        """Hybrid-score candidate rows and return the best *limit*."""
+        scores = 0.5 * sims + 0.3 * importance + 0.2 * recency
+
+        if self.matrix.format != "float32":
+            # Coarse pass above; re-score the best candidates in float32
+            k = min(max(limit * RERANK_FACTOR, _RERANK_MIN), len(scores))
+            cand = np.argpartition(-scores, k - 1)[:k]
+            sims = self.matrix.rescore(q, pos[cand])
+            importance, recency, rowids = importance[cand], recency[cand], rowids[cand]
+            scores = 0.5 * sims + 0.3 * importance + 0.2 * recency
+
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [
+            (int(rowids[i]), float(scores[i]), float(sims[i]), float(recency[i]))
+            for i in top
+        ]
+
+    def _recency(self, last_accessed: np.ndarray, now: float) -> np.ndarray:
+        hours = np.maximum((now - last_accessed) / 3600.0, 0.0)
+        return 1.0 / (1.0 + np.log1p(hours))
+
+    def _use_ann(self, mode: str, scope: Optional[np.ndarray] = None) -> bool:
+        n = len(self.live_pos) if scope is None else len(scope)
+        return mode == "ann" or (mode == "auto" and n >= ANN_MIN_ROWS)
+
+    def _scope(self, rowids: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Indices into the live arrays for the given rowids (None = all)."""
+        if rowids is None:
+            return None
+        rowids = np.asarray(rowids, dtype=np.int64)
+        if len(rowids) == 0 or len(self.live_rowids) == 0:
+            return np.zeros(0, dtype=np.int64)
+        idx = np.minimum(np.searchsorted(self.live_rowids, rowids), len(self.live_rowids) - 1)
+        return np.unique(idx[self.live_rowids[idx] == rowids])
+
+    def _top_k_one(
+        self,
+        q: np.ndarray,
+        now: float,
+        limit: int,
+        mode: str,
+        nprobe: Optional[int],
+        scope: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float, float, float]]:
+        """Single-query scoring; caller holds the mutex and has refreshed."""
+        subset = scope
+        if self._use_ann(mode, scope):
+            cand = self._candidates(q, nprobe)
+            if cand is not None and scope is None:
+                subset = cand
+            elif cand is not None:
+                hits = np.intersect1d(scope, cand, assume_unique=True)
+                # A selective filter can leave too few probed rows; scan the scope
+                subset = hits if len(hits) >= limit else scope
+        if subset is not None:
+            pos = self.live_pos[subset]
+            importance = self.importance[subset]
+            last_accessed = self.last_accessed[subset]
+            rowids = self.live_rowids[subset]
+        else:
+            pos = self.live_pos
+            importance, last_accessed, rowids = (
+                self.importance, self.last_accessed, self.live_rowids
+            )
+        if len(pos) == 0:
+            return []
+        sims = self.matrix.dot(q, pos)
+        return self._rank(q, pos, sims, importance, self._recency(last_accessed, now),
+                          rowids, limit)
+
+    @staticmethod
+    def _normalize(vecs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        vecs = np.atleast_2d(np.asarray(vecs, dtype=np.float32))
+        norms = np.linalg.norm(vecs, axis=1)
+        ok = norms > 0
+        vecs = vecs / np.where(ok, norms, 1.0)[:, None]
+        return vecs, ok
+
+    def top_k(
+        self,
+        query_vec: np.ndarray,
+        now: float,
+        limit: int,
+        mode: str = "auto",
+        nprobe: Optional[int] = None,
+        rowids: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float, float, float]]:
+        """Score live memories and return the best *limit*.
+
+        Score = 0.5·(M·q) + 0.3·importance + 0.2·recency, with
+        recency = 1 / (1 + log(1 + hours_since_access)).
+
+        Args:
+            query_vec: Query embedding.
+            now: Current timestamp for recency.
+            limit: Max results.
+            mode: "auto" (ANN above ANN_MIN_ROWS if an index exists),
+                "exact" (always full scan) or "ann" (index whenever built).
+            nprobe: IVF lists to probe (default: ann_index.default_nprobe).
+            rowids: Restrict scoring to these SQLite rowids (prefiltered
+                scope); only their matrix rows are read.
+
+        Returns:
+            List of (rowid, score, cosine_similarity, recency) tuples,
+            sorted by score descending.
+        """
+        with self._mutex:
+            self.refresh()
+            if len(self.live_pos) == 0 or limit <= 0:
+                return []
+            q, ok = self._normalize(query_vec)
+            if not ok[0]:
+                return []
+            return self._top_k_one(q[0], now, limit, mode, nprobe, self._scope(rowids))
+
+    def top_k_batch(
+        self,
+        query_vecs: np.ndarray,
+        now: float,
+        limit: int,
+        mode: str = "auto",
+        nprobe: Optional[int] = None,
+        rowids: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[int, float, float, float]]]:
+        """:meth:`top_k` for many queries with one pass over the matrix.
+
+        A full scan computes M·Qᵀ for a block of queries at once, so the
+        matrix is read once per ``_BATCH_QUERIES`` queries instead of once
+        per query; importance and recency are shared.  When the ANN index
+        applies, each query scores only its own candidate lists instead.
+        *rowids* restricts scoring as in :meth:`top_k`.
+
+        Returns:
+            One result list per query, in input order.
+        """
+        with self._mutex:
+            self.refresh()
+            queries, ok = self._normalize(query_vecs)
+            results = [[] for _ in range(len(queries))]  # type: List[List[Tuple]]
+            if len(self.live_pos) == 0 or limit <= 0:
+                return results
+
+            todo = np.flatnonzero(ok)
+            scope = self._scope(rowids)
+            if self._use_ann(mode, scope) and self.ann.load(self.epoch):
+                for j in todo:
+                    results[j] = self._top_k_one(queries[j], now, limit, mode, nprobe, scope)
+                return results
+
+            if scope is None:
+                pos, importance, last_accessed, live_rowids = (
+                    self.live_pos, self.importance, self.last_accessed, self.live_rowids
+                )
+            else:
+                pos, importance, last_accessed, live_rowids = (
+                    self.live_pos[scope], self.importance[scope],
+                    self.last_accessed[scope], self.live_rowids[scope],
+                )
+            if len(pos) == 0:
+                return results
+            recency = self._recency(last_accessed, now)
+            for start in range(0, len(todo), _BATCH_QUERIES):
+                block = todo[start:start + _BATCH_QUERIES]
+                sims = self.matrix.dot(queries[block].T, pos)
+                for col, j in enumerate(block):
+                    results[j] = self._rank(
+                        queries[j], pos, sims[:, col], importance, recency, live_rowids, limit,
+                    )
+            return results
+
+
+def _page_size() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+def _read_through(path: str) -> Optional[int]:
+    """Read *path* once so its pages land in the OS page cache; None if absent."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        size = os.fstat(fd).st_size
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+        while os.read(fd, _WARM_CHUNK):
+            pass
+        return size
+    finally:
+        os.close(fd)
+
+
+# ---------------------------------------------------------------------------
+# Per-process engine cache
+# ---------------------------------------------------------------------------
+
+_ENGINES = {}  # type: Dict[str, EmbeddingMatrix]
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_matrix(db_path: str) -> EmbeddingMatrix:
+    """Return the cached engine for *db_path*, creating it on first use.
+
+    A resident process (scripts/server.py) reuses the same engine across
+    requests; a one-shot CLI call builds it once per process.
+    """
+    key = os.path.realpath(db_path)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            engine = EmbeddingMatrix(key)
+            _ENGINES[key] = engine
+        return engine
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+agent-memory / graph_index.py
+==============================
+In-memory adjacency for graph expansion during recall.
+
+Graph expansion used to run one ``edges ⋈ memories`` query (with an ``OR``
+over both edge directions) per high-scoring result, and could only reach
+direct neighbors.  The ``edges`` table is now loaded once into compressed
+sparse row (CSR) arrays:
+
+    indptr[i] : indptr[i + 1]   slice of node i's neighbors
+    indices                     neighbor node per entry
+    weights                     edge weight per entry
+    relations                   edge relation (code into relation_names)
+
+Edges are undirected here (each is stored in both rows) and every row is
+sorted by weight, descending.  Node ids are memory ids; whether a memory is
+decayed or inside the recall filters is decided when the reached memories
+are hydrated from SQLite, in one query.
+
+The arrays are rebuilt when ``settings.edges_version`` changes; triggers on
+``edges`` bump it on every insert, update and delete (see utils._SCHEMA_SQL).
+
+Two expansions, both plain NumPy over the CSR arrays:
+
+  - ``expand``: k-hop spreading with weight decay.  A node's activation is
+    the best path product ``seed × w₁ × (decay × w₂) × …``; one hop is
+    exactly the edge weight, as in the old neighbor query.
+  - ``personalized_pagerank``: random walk with restart to the seeds
+    (power iteration on the weight-normalized transition matrix).
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Activation multiplier per hop beyond the first.
+HOP_DECAY: float = 0.5
+
+# Personalized PageRank: restart probability, iteration cap, L1 tolerance,
+# and the hop radius around the seeds the walk is restricted to.
+PPR_ALPHA: float = 0.15
+PPR_MAX_ITER: int = 50
+PPR_TOL: float = 1e-6
+PPR_RADIUS: int = 3
+
+
+class Reached(NamedTuple):
+    """A memory reached by graph expansion."""
+
+    id: str
+    activation: float
+    hops: int
+    linked_from: Optional[str]  # previous node on the best path
+    relation: Optional[str]  # relation / weight of the last edge on that path
+    weight: Optional[float]
+
+
+class GraphIndex:
+    """CSR adjacency of the ``edges`` table of one database."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False)
+        self._mutex = threading.Lock()
+        self._version = None  # type: Optional[str]
+
+        self.ids = np.zeros(0, dtype=object)
+        self._node = {}  # type: Dict[str, int]
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.weights = np.zeros(0, dtype=np.float64)
+        self.relations = np.zeros(0, dtype=np.int64)
+        self.relation_names = []  # type: List[str]
+        # Entry -> source node, and weight / weighted degree (PageRank)
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._transition = np.zeros(0, dtype=np.float64)
+
+    @property
+    def nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edges(self) -> int:
+        return len(self.indices) // 2
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """Reload the CSR arrays if ``edges`` changed since the last load."""
+        row = self._conn.execute(
+            "SELECT value FROM settings WHERE key = 'edges_version'"
+        ).fetchone()
+        version = row[0] if row else "0"
+        if version != self._version:
+            self._load()
+            self._version = version
+
+    def _load(self) -> None:
+        rows = self._conn.execute(
+            "SELECT source, target, weight, relation FROM edges WHERE source != target"
+        ).fetchall()
+        m = len(rows)
+        if m == 0:
+            self._reset(np.zeros(0, dtype=object))
+            return
+
+        # Dict encoding: much faster than np.unique over Python strings
+        node = {}  # type: Dict[str, int]
+        src = np.fromiter((node.setdefault(r[0], len(node)) for r in rows), np.int64, m)
+        dst = np.fromiter((node.setdefault(r[1], len(node)) for r in rows), np.int64, m)
+        names = {}  # type: Dict[str, int]
+        rel_codes = np.fromiter((names.setdefault(r[3], len(names)) for r in rows), np.int64, m)
+        weight = np.fromiter((r[2] for r in rows), np.float64, m)
+
+        # Both directions, grouped by row and sorted by weight descending
+        rows_ = np.concatenate([src, dst])
+        cols = np.concatenate([dst, src])
+        w = np.tile(weight, 2)
+        rel = np.tile(rel_codes, 2)
+        order = np.lexsort((-w, rows_))
+
+        ids = np.empty(len(node), dtype=object)
+        ids[:] = list(node)
+        self._reset(ids, node)
+        self.relation_names = list(names)
+        self._rows = rows_[order]
+        self.indices = cols[order]
+        self.weights = w[order]
+        self.relations = rel[order]
+        self.indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self._rows, minlength=len(ids)), out=self.indptr[1:])
+
+        degree = np.bincount(self._rows, weights=np.abs(self.weights), minlength=len(ids))
+        self._transition = np.abs(self.weights) / np.where(degree > 0, degree, 1.0)[self._rows]
+
+    def _reset(self, ids: np.ndarray, node: Optional[Dict[str, int]] = None) -> None:
+        self.ids = ids
+        self._node = node if node is not None else {}
+        self.indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.weights = np.zeros(0, dtype=np.float64)
+        self.relations = np.zeros(0, dtype=np.int64)
+        self.relation_names = []
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._transition = np.zeros(0, dtype=np.float64)
+
+    def _seed_nodes(self, seeds: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        known = [(self._node[mem_id], s) for mem_id, s in seeds.items() if mem_id in self._node]
+        nodes = np.array([n for n, _ in known], dtype=np.int64)
+        return nodes, np.array([s for _, s in known], dtype=np.float64)
+
+    # ------------------------------------------------------------------
+    # Expansion
+    # ------------------------------------------------------------------
+
+    def expand(
+        self, seeds: Dict[str, float], hops: int = 1, decay: float = HOP_DECAY,
+    ) -> List[Reached]:
+        """k-hop spreading activation from *seeds* (memory id -> activation).
+
+        Each hop multiplies the activation by the edge weight, and hops
+        after the first also by *decay*.  Every node keeps its best path.
+
+        Returns:
+            Reached non-seed memories, highest activation first.
+        """
+        with self._mutex:
+            self.refresh()
+            nodes, act0 = self._seed_nodes(seeds)
+            if len(nodes) == 0 or hops < 1:
+                return []
+
+            n = self.nodes
+            act = np.zeros(n)
+            hop = np.zeros(n, dtype=np.int64)
+            parent = np.full(n, -1, dtype=np.int64)
+            via = np.full(n, -1, dtype=np.int64)  # CSR entry of the last edge
+            is_seed = np.zeros(n, dtype=bool)
+            is_seed[nodes] = True
+            np.maximum.at(act, nodes, act0)
+
+            frontier = np.unique(nodes)
+            for h in range(1, hops + 1):
+                entry = self._entries(frontier)
+                if len(entry) == 0:
+                    break
+                counts = self.indptr[frontier + 1] - self.indptr[frontier]
+                nbr = self.indices[entry]
+                a = np.repeat(act[frontier], counts) * self.weights[entry]
+                if h > 1:
+                    a *= decay
+
+                # Best candidate per neighbor, then keep only improvements
+                order = np.argsort(-a, kind="stable")
+                nbr_o = nbr[order]
+                _, first = np.unique(nbr_o, return_index=True)
+                best = order[first]
+                cand, cand_a = nbr[best], a[best]
+                better = (cand_a > act[cand]) & ~is_seed[cand]
+                cand, best = cand[better], best[better]
+                if len(cand) == 0:
+                    break
+                act[cand] = cand_a[better]
+                hop[cand] = h
+                parent[cand] = np.repeat(frontier, counts)[best]
+                via[cand] = entry[best]
+                frontier = cand
+
+            reached = np.flatnonzero((hop > 0) & ~is_seed)
+            reached = reached[np.argsort(-act[reached], kind="stable")]
+            return [
+                Reached(
+                    str(self.ids[i]), float(act[i]), int(hop[i]), str(self.ids[parent[i]]),
+                    self.relation_names[self.relations[via[i]]], float(self.weights[via[i]]),
+                )
+                for i in reached
+            ]
+
+    def _entries(self, frontier: np.ndarray) -> np.ndarray:
+        """Flat CSR entry index of every (frontier node, neighbor) pair."""
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+
+    def personalized_pagerank(
+        self,
+        seeds: Dict[str, float],
+        alpha: float = PPR_ALPHA,
+        max_iter: int = PPR_MAX_ITER,
+        tol: float = PPR_TOL,
+        radius: int = PPR_RADIUS,
+    ) -> List[Reached]:
+        """Random walk with restart to *seeds* (memory id -> restart weight).
+
+        x ← (1 − α)·Pᵀx + α·s over the weight-normalized transition matrix P,
+        one ``np.bincount`` per iteration.  The walk is confined to nodes
+        within *radius* hops of the seeds (mass leaving it is dropped): with
+        α = 0.15 little mass gets further, and the cost no longer grows with
+        the whole graph.
+
+        Returns:
+            Non-seed memories with a positive PageRank, highest first; the
+            activation is the PageRank mass.
+        """
+        with self._mutex:
+            self.refresh()
+            nodes, weights = self._seed_nodes(seeds)
+            if len(nodes) == 0 or weights.sum() <= 0:
+                return []
+
+            # Local subgraph: BFS to *radius* hops, then the entries inside it
+            inside = np.zeros(self.nodes, dtype=bool)
+            inside[nodes] = True
+            frontier = np.unique(nodes)
+            for _ in range(radius):
+                nbr = np.unique(self.indices[self._entries(frontier)])
+                frontier = nbr[~inside[nbr]]
+                if len(frontier) == 0:
+                    break
+                inside[frontier] = True
+            local = np.flatnonzero(inside)
+            entry = self._entries(local)
+            entry = entry[inside[self.indices[entry]]]
+            rows = np.searchsorted(local, self._rows[entry])
+            cols = np.searchsorted(local, self.indices[entry])
+            transition = self._transition[entry]
+
+            n = len(local)
+            restart = np.zeros(n)
+            np.add.at(restart, np.searchsorted(local, nodes), weights)
+            restart /= restart.sum()
+            x = restart.copy()
+            for _ in range(max_iter):
+                x_new = (1.0 - alpha) * np.bincount(cols, weights=x[rows] * transition,
+                                                    minlength=n) + alpha * restart
+                done = np.abs(x_new - x).sum() < tol
+                x = x_new
+                if done:
+                    break
+
+            x[np.searchsorted(local, nodes)] = 0.0
+            reached = np.flatnonzero(x > 0)
+            reached = reached[np.argsort(-x[reached], kind="stable")]
+            return [Reached(str(self.ids[local[i]]), float(x[i]), 0, None, None, None)
+                    for i in reached]
+
+
+# ---------------------------------------------------------------------------
+# Per-process cache
+# ---------------------------------------------------------------------------
+
+_GRAPHS = {}  # type: Dict[str, GraphIndex]
+_GRAPHS_LOCK = threading.Lock()
+
+
+def get_graph(db_path: str) -> GraphIndex:
+    """Return the cached adjacency for *db_path*, creating it on first use."""
+    key = os.path.realpath(db_path)
+    with _GRAPHS_LOCK:
+        graph = _GRAPHS.get(key)
+        if graph is None:
+            graph = GraphIndex(key)
+            _GRAPHS[key] = graph
+        return graph
@@ -7,13 +7,21 @@ Unified CLI entry point for the Hybrid Vector-Graph Memory System.
 Subcommands:
     remember <text>                 Store a memory with auto-embedding & entity extraction
     recall <query>                  Hybrid vector + graph search with scored ranking
+    recall-batch <q1> <q2> ...      Many recalls with one embedding call and one store scan
     forget <id>                     Soft-delete (decay) a memory
     relate <source_id> <target_id>  Create a graph edge between two memories
     reflect                         Maintenance: prune stale memories, find near-duplicates
     timeline [--entity X] [--since] Temporal retrieval of memories
     stats                           Memory system health report
     import-md <file>                Import a markdown file (MEMORY.md or daily notes)
-    export                          Dump all memories as JSON
+    ingest <path>                   Batched import of a markdown/JSONL file or directory
+    export [--format ndjson]        Dump all memories as JSON (or stream NDJSON)
+    import <file>                   Restore an NDJSON export in batched transactions
+    ann-bench                       Recall@k vs latency report for the ANN index
+    flush-access                    Write buffered recall access stats to the DB
+    quantize --format F             Re-encode stored embeddings (float32/float16/int8)
+    reembed --backend B             Re-embed all memories with another embedding backend
+    warmup                          Pre-load the embedding matrix and DB pages into memory
 
 All output is structured JSON for reliable agent consumption.
 
@@ -27,25 +35,59 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import base64
 import json
 import math
+import os
+import re
 import sys
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
 # Local imports — utils handles DB, embeddings, entities
 from utils import (
     DEFAULT_DB_PATH,
+    EMBED_BACKEND,
+    EMBEDDING_FORMATS,
+    MODEL_NAME,
+    SQLITE_PROFILE,
     blob_to_embedding,
-    cosine_similarity,
+    blob_width,
+    db_file,
+    embedding_format,
+    embedding_model,
     embedding_to_blob,
     extract_entities,
     generate_embedding,
+    generate_embeddings,
+    fts_available,
+    get_backend,
     get_connection,
+    get_embedding_cache,
+    get_setting,
     new_id,
+    quantize,
+    schema_version,
+    set_setting,
+)
+from access_log import ACCESS_FLUSH_ENTRIES, get_access_log
+from ann_index import default_nprobe
+from embedding_backends import BACKENDS, candidates
+from embedding_matrix import ANN_MIN_ROWS, RERANK_FACTOR, QuantizedMatrix, get_matrix
+from graph_index import get_graph
+from similarity_join import similar_pairs, similar_pairs_to
+from tiering import (
+    COLD_AFTER_DAYS,
+    archive,
+    cold_path,
+    compact,
+    needs_cold,
+    open_cold,
+    restore,
+    tier_stats,
 )
-
-# numpy is imported lazily via utils — not needed at top level
 
 
 # ---------------------------------------------------------------------------
@@ -64,6 +106,18 @@ def _error_out(message: str, code: str = "ERROR") -> None:
     sys.exit(1)
 
 
+class WriteError(Exception):
+    """A rejected write (remember/relate/forget), with an _error_out code.
+
+    Raised by the write helpers shared with the write coordinator
+    (write_queue.py), which cannot exit the process on a bad request.
+    """
+
+    def __init__(self, message: str, code: str = "ERROR"):
+        super().__init__(message)
+        self.code = code
+
+
 # ---------------------------------------------------------------------------
 # REMEMBER — store a new memory
 # ---------------------------------------------------------------------------
@@ -72,7 +126,7 @@ def cmd_remember(args: argparse.Namespace) -> None:
     """Store a new memory with embedding and entity extraction.
 
     Steps:
-      1. Generate embedding via sentence-transformers (or None on failure)
+      1. Generate embedding with the store's backend (or None on failure)
       2. Extract entities via regex heuristics
       3. Assign initial importance (0.5 default, boosted if entities found)
       4. Insert into memories table
@@ -86,53 +140,94 @@ def cmd_remember(args: argparse.Namespace) -> None:
     if not text or not text.strip():
         _error_out("Empty text — nothing to remember.", "EMPTY_INPUT")
 
-    now = time.time()
-    mem_id = new_id()
-    mem_type = getattr(args, "type", "episodic") or "episodic"
+    conn = get_connection(args.db)
+    try:
+        # Generate embedding (may return None if model unavailable)
+        embedding = generate_embedding(text, conn)
+        result = _insert_memory(conn, text, getattr(args, "importance", None),
+                                getattr(args, "type", "episodic"), embedding, time.time())
+        conn.commit()
+        if embedding is not None:
+            get_matrix(db_file(conn)).sync()  # append to matrix + ANN index
+        _json_out(result)
+    finally:
+        conn.close()
 
-    # Generate embedding (may return None if model unavailable)
-    embedding = generate_embedding(text)
-    blob = embedding_to_blob(embedding) if embedding is not None else None
 
-    # Extract entities for lightweight knowledge linking
-    entities = extract_entities(text)
+def _insert_memory(
+    conn,
+    text: str,
+    importance: Optional[float],
+    mem_type: Optional[str],
+    embedding: Optional[np.ndarray],
+    now: float,
+) -> Dict[str, Any]:
+    """Insert one memory with its entities and auto-links (caller commits).
 
-    # Importance: user-specified, or heuristic based on content richness
-    importance = getattr(args, "importance", None)
-    if importance is None:
-        # Heuristic: longer, entity-rich content is more important
-        word_count = len(text.split())
-        entity_bonus = min(len(entities) * 0.05, 0.2)
-        length_bonus = min(word_count / 100.0, 0.2)
-        importance = round(min(0.5 + entity_bonus + length_bonus, 1.0), 3)
+    Shared by ``remember`` and the write coordinator, which embeds a whole
+    group of texts with one model call before inserting them.
 
-    conn = get_connection(args.db)
-    try:
-        conn.execute(
-            """INSERT INTO memories
-               (id, content, embedding, created_at, last_accessed,
-                access_count, importance, type, decayed)
-               VALUES (?, ?, ?, ?, ?, 0, ?, ?, 0)""",
-            (mem_id, text.strip(), blob, now, now, importance, mem_type),
-        )
+    Returns:
+        The ``remember`` result (status, id, type, importance, entities,
+        edges_created).
+
+    Raises:
+        WriteError: EMPTY_INPUT if *text* is blank.
+    """
+    if not text or not text.strip():
+        raise WriteError("Empty text — nothing to remember.", "EMPTY_INPUT")
 
-        # Auto-link: find existing memories containing the same entities
-        edges_created = 0
-        if entities and embedding is not None:
-            edges_created = _auto_link(conn, mem_id, embedding, entities, now)
+    mem_id = new_id()
+    mem_type = mem_type or "episodic"
 
-        conn.commit()
+    # Extract entities for lightweight knowledge linking
+    entities = extract_entities(text)
 
-        _json_out({
-            "status": "stored",
-            "id": mem_id,
-            "type": mem_type,
-            "importance": importance,
-            "entities": entities,
-            "edges_created": edges_created,
-        })
-    finally:
-        conn.close()
+    # Importance: user-specified, or heuristic based on content richness
+    if importance is None:
+        importance = _auto_importance(text, entities)
+
+    blob = None
+    if embedding is not None:
+        blob = embedding_to_blob(embedding, embedding_format(conn))
+    conn.execute(
+        """INSERT INTO memories
+           (id, content, embedding, created_at, last_accessed,
+            access_count, importance, type, decayed)
+           VALUES (?, ?, ?, ?, ?, 0, ?, ?, 0)""",
+        (mem_id, text.strip(), blob, now, now, importance, mem_type),
+    )
+    _store_entities(conn, mem_id, entities)
+
+    # Auto-link: find existing memories containing the same entities
+    edges_created = 0
+    if entities and embedding is not None:
+        edges_created = _auto_link(conn, mem_id, embedding, entities, now)
+
+    return {
+        "status": "stored",
+        "id": mem_id,
+        "type": mem_type,
+        "importance": importance,
+        "entities": entities,
+        "edges_created": edges_created,
+    }
+
+
+def _auto_importance(text: str, entities: List[str]) -> float:
+    """Heuristic importance: longer, entity-rich content is more important."""
+    word_count = len(text.split())
+    entity_bonus = min(len(entities) * 0.05, 0.2)
+    length_bonus = min(word_count / 100.0, 0.2)
+    return round(min(0.5 + entity_bonus + length_bonus, 1.0), 3)
+
+
+def _store_entities(conn, mem_id: str, entities: List[str]) -> None:
+    """Record a memory's extracted entities (lowercased) in memory_entities."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO memory_entities (memory_id, entity) VALUES (?, ?)",
+        [(mem_id, e.lower()) for e in entities],
+    )
 
 
 def _auto_link(
@@ -143,6 +238,7 @@ def _auto_link(
     now: float,
     similarity_threshold: float = 0.7,
     max_links: int = 5,
+    max_candidates: int = 2000,
 ) -> int:
     """Create graph edges to existing memories with high semantic similarity.
 
@@ -150,6 +246,10 @@ def _auto_link(
     AND share at least one extracted entity.  This prevents spurious edges
     from generic topical overlap.
 
+    Entity-first: candidates come from the memory_entities index (memories
+    sharing an entity, most recently accessed first), then similarity is
+    computed for all of them with one matrix-vector product.
+
     Args:
         conn: SQLite connection.
         mem_id: ID of the newly created memory.
@@ -158,39 +258,42 @@ def _auto_link(
         now: Current timestamp.
         similarity_threshold: Minimum cosine similarity for auto-linking.
         max_links: Maximum number of edges to create.
+        max_candidates: Cap on entity-sharing memories compared.
 
     Returns:
         Number of edges created.
     """
-    # Fetch recent non-decayed memories that have embeddings
+    keys = sorted({e.lower() for e in entities})
+    if not keys:
+        return 0
+
     rows = conn.execute(
-        """SELECT id, content, embedding FROM memories
-           WHERE id != ? AND decayed = 0 AND embedding IS NOT NULL
-           ORDER BY last_accessed DESC LIMIT 200""",
-        (mem_id,),
+        f"""SELECT m.id, m.embedding FROM memories m
+            WHERE m.id IN (
+                SELECT memory_id FROM memory_entities
+                WHERE entity IN ({",".join("?" * len(keys))})
+            )
+              AND m.id != ? AND m.decayed = 0 AND m.embedding IS NOT NULL
+            ORDER BY m.last_accessed DESC LIMIT ?""",
+        keys + [mem_id, max_candidates],
     ).fetchall()
+    if not rows:
+        return 0
 
-    candidates = []  # type: List[Tuple[str, float]]
-    entity_lower = {e.lower() for e in entities}
-
-    for row in rows:
-        other_emb = blob_to_embedding(row["embedding"])
-        sim = cosine_similarity(embedding, other_emb)
-        if sim < similarity_threshold:
-            continue
-        # Check entity overlap
-        other_entities = {e.lower() for e in extract_entities(row["content"])}
-        if entity_lower & other_entities:
-            candidates.append((row["id"], sim))
+    matrix = np.stack([blob_to_embedding(row["embedding"]) for row in rows])
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(embedding) or 1.0)
+    norms[norms == 0] = 1.0
+    sims = (matrix @ embedding) / norms
 
-    # Sort by similarity descending, take top N
-    candidates.sort(key=lambda x: x[1], reverse=True)
+    order = np.argsort(-sims, kind="stable")[:max_links]
     count = 0
-    for target_id, sim in candidates[:max_links]:
+    for i in order:
+        if sims[i] < similarity_threshold:
+            break
         conn.execute(
             """INSERT INTO edges (id, source, target, relation, weight, created_at)
                VALUES (?, ?, ?, 'relates_to', ?, ?)""",
-            (new_id(), mem_id, target_id, round(sim, 4), now),
+            (new_id(), mem_id, rows[i]["id"], round(float(sims[i]), 4), now),
         )
         count += 1
     return count
@@ -207,103 +310,529 @@ def cmd_recall(args: argparse.Namespace) -> None:
         Score = (0.5 × CosineSimilarity) + (0.3 × Importance) + (0.2 × RecencyDecay)
         RecencyDecay = 1.0 / (1.0 + log(1 + hours_since_access))
 
-    High-scoring memories (>0.85) trigger graph expansion: their directly
-    connected neighbors are also returned (deduplicated, marked as "via_graph").
+    Graph expansion (``--expand``, graph_index.py): by default high-scoring
+    memories (>0.85) seed a k-hop walk (``--hops``, weight decay per hop);
+    ``ppr`` instead spreads personalized PageRank from all results.  Reached
+    memories are also returned (deduplicated, marked as "via_graph").
+
+    Access stats of returned memories are appended to the access log
+    (access_log.py) instead of written to the DB; unflushed accesses are
+    merged into recency and the reported stats.
+
+    Search modes (``--mode``):
+        auto     vector search, or keyword search if embeddings are unavailable
+        vector   vector search only
+        keyword  BM25-ranked full-text search (no model load)
+        hybrid   vector and BM25 rankings fused with reciprocal rank fusion
 
-    Falls back to SQL LIKE keyword search if embeddings are unavailable.
+    Filters (``--type``, ``--min-importance``, ``--created-*``,
+    ``--accessed-*``, ``--entity``) are resolved in SQL first; only the
+    surviving rows are scored, and graph expansion stays inside them.
+
+    Tiers (``--tier``): the hot DB is searched first; the cold archive
+    (tiering.py) is searched too when the hot results are weak
+    (``auto``), never (``hot``) or always (``all``).
 
     Args:
-        args: Parsed CLI args with .query (str), .limit (int), .db (str|None).
+        args: Parsed CLI args with .query (str), .limit (int), .db (str|None),
+              .mode (str), .exact (bool), .nprobe (int|None), .tier (str)
+              and the filters.
     """
     query = args.query
     if not query or not query.strip():
         _error_out("Empty query.", "EMPTY_QUERY")
 
     limit = getattr(args, "limit", 7) or 7
+    search_mode = getattr(args, "mode", "auto") or "auto"
     conn = get_connection(args.db)
     now = time.time()
 
     try:
-        query_embedding = generate_embedding(query)
-
-        if query_embedding is not None:
-            results = _vector_recall(conn, query_embedding, now, limit)
-        else:
-            # Fallback: keyword search
-            results = _keyword_recall(conn, query, now, limit)
-
-        # Graph expansion for high-confidence results
-        expanded = []  # type: List[Dict]
-        seen_ids = {r["id"] for r in results}
-
-        for r in results:
-            if r["score"] > 0.85:
-                neighbors = _graph_neighbors(conn, r["id"], now)
-                for n in neighbors:
-                    if n["id"] not in seen_ids:
-                        n["via_graph"] = True
-                        n["linked_from"] = r["id"]
-                        expanded.append(n)
-                        seen_ids.add(n["id"])
-
-        # Update access timestamps for returned memories
-        all_ids = [r["id"] for r in results + expanded]
-        if all_ids:
-            placeholders = ",".join("?" * len(all_ids))
-            conn.execute(
-                f"""UPDATE memories
-                    SET last_accessed = ?, access_count = access_count + 1
-                    WHERE id IN ({placeholders})""",
-                [now] + all_ids,
-            )
-            conn.commit()
+        query_embedding = None
+        if search_mode != "keyword":
+            query_embedding = generate_embedding(query, conn)
+        if query_embedding is None:
+            search_mode = "keyword"  # model unavailable
+        elif search_mode == "auto":
+            search_mode = "vector"
+
+        query_vecs = None if query_embedding is None else query_embedding[None, :]
+        [(results, expanded, cold)], filters = _tiered_recall(
+            conn, [query], query_vecs, now, limit, search_mode, args
+        )
 
-        _json_out({
+        out = {
             "status": "ok",
             "query": query,
             "count": len(results) + len(expanded),
             "results": results + expanded[:3],  # cap graph expansion at 3
-            "search_mode": "vector" if query_embedding is not None else "keyword",
-        })
+            "search_mode": search_mode,
+            "cold_consulted": cold,
+        }  # type: Dict[str, Any]
+        if filters:
+            out["filters"] = filters
+        _json_out(out)
     finally:
         conn.close()
 
 
+def cmd_recall_batch(args: argparse.Namespace) -> None:
+    """Run several recalls in one call.
+
+    All queries are embedded with one model call and scored against the
+    store with one matrix-matrix product (EmbeddingMatrix.top_k_batch), so
+    a fan-out of N related recalls costs one scan instead of N.  Each query
+    gets the same treatment as ``recall`` (mode, graph expansion, access
+    logging, filters, cold-tier fallback).
+
+    Args:
+        args: Parsed CLI args with .queries (List[str]), .limit (int),
+              .mode (str), .exact (bool), .nprobe (int|None), .tier (str)
+              and the filters.
+    """
+    queries = args.queries
+    if not queries:
+        _error_out("No queries.", "EMPTY_QUERY")
+    # batches[i] answers queries[i]; dropping a blank one would shift the rest.
+    blank = [i for i, q in enumerate(queries) if not q.strip()]
+    if blank:
+        _error_out(f"Empty query at position {blank[0]}.", "EMPTY_QUERY")
+
+    limit = getattr(args, "limit", 7) or 7
+    search_mode = getattr(args, "mode", "auto") or "auto"
+    conn = get_connection(args.db)
+    now = time.time()
+
+    try:
+        query_vecs = None
+        if search_mode != "keyword":
+            query_vecs = generate_embeddings(queries, conn=conn)
+        if query_vecs is None:
+            search_mode = "keyword"  # model unavailable
+        elif search_mode == "auto":
+            search_mode = "vector"
+
+        per_query, filters = _tiered_recall(conn, queries, query_vecs, now, limit,
+                                            search_mode, args)
+        batches = [
+            {
+                "query": query,
+                "count": len(results) + len(expanded),
+                "results": results + expanded[:3],
+                "cold_consulted": cold,
+            }
+            for query, (results, expanded, cold) in zip(queries, per_query)
+        ]
+
+        out = {
+            "status": "ok",
+            "count": len(batches),
+            "batches": batches,
+            "search_mode": search_mode,
+        }  # type: Dict[str, Any]
+        if filters:
+            out["filters"] = filters
+        _json_out(out)
+    finally:
+        conn.close()
+
+
+def _search_tier(
+    conn, queries: List[str], query_vecs: Optional[np.ndarray], now: float,
+    limit: int, search_mode: str, args: argparse.Namespace,
+) -> List[Tuple[List[Dict], List[Dict]]]:
+    """Run *queries* against one tier: (results, graph neighbors) per query.
+
+    A single query is scored with EmbeddingMatrix.top_k, several with one
+    top_k_batch pass.  Nothing is written; see :func:`_tiered_recall`.
+    """
+    pending = get_access_log(db_file(conn)).pending()
+    scope = _recall_scope(conn, args, now, pending)
+    vector_mode = "exact" if getattr(args, "exact", False) else "auto"
+    nprobe = getattr(args, "nprobe", None)
+
+    def vector(depth: int) -> List[List[Dict]]:
+        rowids = _scope_rowids(conn, scope)
+        if len(queries) == 1:
+            return [_vector_recall(conn, query_vecs[0], now, depth, mode=vector_mode,
+                                   nprobe=nprobe, pending=pending, rowids=rowids)]
+        return _vector_recall_batch(conn, query_vecs, now, depth, mode=vector_mode,
+                                    nprobe=nprobe, pending=pending, rowids=rowids)
+
+    if search_mode == "vector":
+        per_query = vector(limit)
+    elif search_mode == "hybrid":
+        per_query = [
+            _rrf_fuse(v, _keyword_recall(conn, q, now, limit * _RRF_DEPTH,
+                                         pending=pending, scope=scope), limit)
+            for q, v in zip(queries, vector(limit * _RRF_DEPTH))
+        ]
+    else:
+        per_query = [_keyword_recall(conn, q, now, limit, pending=pending, scope=scope)
+                     for q in queries]
+    expand = getattr(args, "expand", "hops") or "hops"
+    hops = getattr(args, "hops", 1) or 1
+    return [(results, _expand_graph(conn, results, now, pending, scope, expand, hops))
+            for results in per_query]
+
+
+def _rank_key(result: Dict[str, Any]) -> float:
+    return result.get("rrf_score", result["score"])
+
+
+def _score_key(result: Dict[str, Any]) -> float:
+    return result["score"]
+
+
+def _tiered_recall(
+    conn, queries: List[str], query_vecs: Optional[np.ndarray], now: float,
+    limit: int, search_mode: str, args: argparse.Namespace,
+) -> Tuple[List[Tuple[List[Dict], List[Dict], bool]], Dict[str, Any]]:
+    """Search the hot tier, then the cold tier for queries with weak results.
+
+    Cold hits are merged by score and tagged ``"tier": "cold"``.  When both
+    tiers were searched in the same mode, fused results rank by RRF score;
+    when the cold tier fell back to keyword, by the common ``score``.  Returned
+    memories are recorded in the access log of the tier they came from
+    (a cold memory recalled here is restored to the hot tier by reflect).
+
+    Returns:
+        ((results, graph neighbors, cold consulted) per query, applied filters).
+    """
+    out = [(results, expanded, False)
+           for results, expanded in _search_tier(conn, queries, query_vecs, now,
+                                                 limit, search_mode, args)]
+    tier = getattr(args, "tier", "auto") or "auto"
+    todo = [i for i, (results, _, _) in enumerate(out)
+            if tier == "all" or (tier == "auto" and needs_cold(results, limit))]
+
+    hot_path = db_file(conn)
+    cold_ids = []  # type: List[str]
+    cold = open_cold(hot_path) if todo else None
+    if cold is not None:
+        try:
+            cold_queries = [queries[i] for i in todo]
+            cold_vecs = None if query_vecs is None else query_vecs[todo]
+            cold_mode = search_mode
+            if cold_vecs is not None and embedding_model(cold) not in (None, embedding_model(conn)):
+                # Archive still in another backend's space (reembed in progress)
+                cold_vecs = generate_embeddings(cold_queries, conn=cold)
+                cold_mode = search_mode if cold_vecs is not None else "keyword"
+            found = _search_tier(cold, cold_queries, cold_vecs, now, limit, cold_mode, args)
+        finally:
+            cold.close()
+        # RRF scores (~1/60) and plain scores (0-1) do not compare
+        key = _rank_key if cold_mode == search_mode else _score_key
+        for i, (results, expanded) in zip(todo, found):
+            for r in results + expanded:
+                r["tier"] = "cold"
+            merged = sorted(out[i][0] + results, key=key, reverse=True)[:limit]
+            # Graph neighbors only of the results that survived the merge
+            kept = {r["id"] for r in merged}
+            neighbors = out[i][1] + [n for n in expanded if n["linked_from"] in kept]
+            out[i] = (merged, neighbors, True)
+            cold_ids.extend(r["id"] for r in merged + neighbors if r.get("tier") == "cold")
+
+    # Log accesses; the DBs are only written when a buffer is flushed
+    hot_ids = [r["id"] for results, expanded, _ in out for r in results + expanded
+               if r.get("tier") != "cold"]
+    for path, ids in ((hot_path, hot_ids), (cold_path(hot_path), cold_ids)):
+        if ids:
+            access = get_access_log(path)
+            access.record(ids, now)
+            if access.entries >= ACCESS_FLUSH_ENTRIES:
+                access.flush(conn if path == hot_path else None)
+
+    return out, _applied_filters(args)
+
+
+# Relative ages accepted by the recall time filters: 30m, 24h, 7d, 2w
+_RELATIVE_TIME_RE = re.compile(r"^(\d+(?:\.\d+)?)([mhdw])$")
+_TIME_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def _parse_time(value: str, now: float) -> float:
+    """Timestamp for an ISO 8601 date/time or a relative age (``7d`` = 7 days ago)."""
+    import datetime
+
+    rel = _RELATIVE_TIME_RE.match(value.strip())
+    if rel:
+        return now - float(rel.group(1)) * _TIME_UNITS[rel.group(2)]
+    try:
+        return datetime.datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError:
+        _error_out(f"Invalid time: {value}. Use ISO 8601 or an age like 7d.", "BAD_DATE")
+
+
+# Recall filter options (CLI dest) in the order they are reported
+_SCOPE_FILTERS = ("type", "min_importance", "created_after", "created_before",
+                  "accessed_after", "accessed_before", "entity")
+
+
+def _recall_scope(
+    conn, args: argparse.Namespace, now: float,
+    pending: Optional[Dict[str, Tuple[int, float]]] = None,
+) -> Optional[List[Tuple[str, List[Any]]]]:
+    """SQL conditions on ``memories m`` for the recall filters, or None.
+
+    Each condition is answerable from one index (idx_memories_type,
+    _importance, _created_at, _last_accessed, memory_entities or FTS5), so
+    the vector scope is resolved from index pages alone, before any
+    embedding is read.  Unflushed accesses from the access log count
+    towards the ``accessed`` bounds.
+    """
+    scope = []  # type: List[Tuple[str, List[Any]]]
+
+    mem_type = getattr(args, "type", None)
+    if mem_type:
+        scope.append(("m.type = ?", [mem_type]))
+    min_importance = getattr(args, "min_importance", None)
+    if min_importance is not None:
+        scope.append(("m.importance >= ?", [min_importance]))
+    if getattr(args, "created_after", None):
+        scope.append(("m.created_at >= ?", [_parse_time(args.created_after, now)]))
+    if getattr(args, "created_before", None):
+        scope.append(("m.created_at <= ?", [_parse_time(args.created_before, now)]))
+
+    pending = pending or {}
+    if getattr(args, "accessed_after", None):
+        after = _parse_time(args.accessed_after, now)
+        recent = [mem_id for mem_id, (_, ts) in pending.items() if ts >= after]
+        if recent:
+            scope.append((f"(m.last_accessed >= ? OR m.id IN ({','.join('?' * len(recent))}))",
+                          [after] + recent))
+        else:
+            scope.append(("m.last_accessed >= ?", [after]))
+    if getattr(args, "accessed_before", None):
+        before = _parse_time(args.accessed_before, now)
+        scope.append(("m.last_accessed <= ?", [before]))
+        later = [mem_id for mem_id, (_, ts) in pending.items() if ts > before]
+        if later:
+            scope.append((
+                f"m.rowid NOT IN (SELECT rowid FROM memories WHERE id IN ({','.join('?' * len(later))}))",
+                later,
+            ))
+
+    entity = getattr(args, "entity", None)
+    if entity:
+        cond, value = _entity_condition(conn, entity, alias="m.")
+        scope.append((cond, [value]))
+
+    return scope or None
+
+
+def _scope_where(scope: Optional[List[Tuple[str, List[Any]]]]) -> Tuple[str, List[Any]]:
+    """One WHERE fragment and its parameters for *scope* ("1" if unfiltered)."""
+    if not scope:
+        return "1", []
+    return " AND ".join(cond for cond, _ in scope), [p for _, params in scope for p in params]
+
+
+def _scope_rowids(conn, scope: Optional[List[Tuple[str, List[Any]]]]) -> Optional[np.ndarray]:
+    """Rowids matching every condition in *scope* (None = no filter).
+
+    Conditions are queried one at a time so each is a covering-index scan
+    and the sets are intersected in NumPy; a combined WHERE would visit the
+    table rows, which carry the embedding blobs.  Decayed rows are dropped
+    by the engine, which only holds live memories.
+    """
+    if scope is None:
+        return None
+    cur = conn.cursor()
+    cur.row_factory = None  # plain tuples; rowid lists can be large
+    rowids = None  # type: Optional[np.ndarray]
+    for cond, params in scope:
+        found = np.fromiter(
+            (r[0] for r in cur.execute(f"SELECT m.rowid FROM memories m WHERE {cond}", params)),
+            dtype=np.int64,
+        )
+        rowids = found if rowids is None else np.intersect1d(rowids, found)
+        if len(rowids) == 0:
+            break
+    return np.unique(rowids)
+
+
+def _applied_filters(args: argparse.Namespace) -> Dict[str, Any]:
+    """Filter options given on the command line, for the JSON output."""
+    return {k: getattr(args, k) for k in _SCOPE_FILTERS if getattr(args, k, None) is not None}
+
+
+# Graph expansion: neighbors returned per seed memory
+_GRAPH_PER_SEED = 5
+
+
+def _expand_graph(
+    conn, results: List[Dict], now: float,
+    pending: Optional[Dict[str, Tuple[int, float]]] = None,
+    scope: Optional[List[Tuple[str, List[Any]]]] = None,
+    expand: str = "hops",
+    hops: int = 1,
+) -> List[Dict]:
+    """Graph expansion over the in-memory adjacency (graph_index.py).
+
+    ``hops``: memories within *hops* edges of the high-confidence (>0.85)
+    results, activation = path weight product with HOP_DECAY per extra hop.
+    ``ppr``: personalized PageRank restarting at all results, weighted by
+    score.  ``none`` disables expansion.
+
+    Reached memories are hydrated (and filtered by decay and *scope*) with
+    one SQL query; up to _GRAPH_PER_SEED per seed are returned.
+    """
+    if expand == "none" or not results:
+        return []
+    graph = get_graph(db_file(conn))
+    if expand == "ppr":
+        seeds = {r["id"]: r["score"] for r in results}
+        reached = graph.personalized_pagerank(seeds)
+    else:
+        seeds = {r["id"]: 1.0 for r in results if r["score"] > 0.85}
+        reached = graph.expand(seeds, hops=hops) if seeds else []
+
+    seen_ids = {r["id"] for r in results}
+    reached = [n for n in reached if n.id not in seen_ids]
+    cap = _GRAPH_PER_SEED * len(seeds)
+    if not reached or cap == 0:
+        return []
+    # Over-fetch: some reached memories may be decayed or outside the filters
+    reached = reached[:cap * 4]
+    top = max(n.activation for n in reached)
+
+    where, params = _scope_where(scope)
+    ids = [n.id for n in reached]
+    rows = {}  # type: Dict[str, Dict[str, Any]]
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        for row in conn.execute(
+            f"""SELECT m.id, m.content, m.importance, m.type,
+                       m.created_at, m.last_accessed, m.access_count
+                FROM memories m
+                WHERE m.id IN ({",".join("?" * len(chunk))})
+                  AND m.decayed = 0 AND {where}""",
+            chunk + params,
+        ):
+            rows[row["id"]] = _apply_pending(dict(row), pending)
+
+    expanded = []  # type: List[Dict]
+    for n in reached:
+        row = rows.get(n.id)
+        if row is None:
+            continue
+        hours_since = max((now - row["last_accessed"]) / 3600.0, 0.0)
+        recency = 1.0 / (1.0 + math.log(1.0 + hours_since))
+        # PageRank mass is relative; scale it so the best reached memory is 1
+        strength = n.activation / top if expand == "ppr" else n.activation
+        item = {
+            "id": row["id"],
+            "content": row["content"],
+            "type": row["type"],
+            "importance": row["importance"],
+            "score": round(0.3 * row["importance"] + 0.2 * recency + 0.5 * strength, 4),
+            "created_at": row["created_at"],
+            "last_accessed": row["last_accessed"],
+            "access_count": row["access_count"],
+            "via_graph": True,
+        }  # type: Dict[str, Any]
+        if expand == "ppr":
+            item["ppr"] = round(n.activation, 6)
+        else:
+            item.update({
+                "edge_relation": n.relation,
+                "edge_weight": n.weight,
+                "hops": n.hops,
+                "linked_from": n.linked_from,
+            })
+        expanded.append(item)
+        if len(expanded) >= cap:
+            break
+    return expanded
+
+
 def _vector_recall(
-    conn, query_vec: np.ndarray, now: float, limit: int
+    conn,
+    query_vec: np.ndarray,
+    now: float,
+    limit: int,
+    mode: str = "auto",
+    nprobe: Optional[int] = None,
+    pending: Optional[Dict[str, Tuple[int, float]]] = None,
+    rowids: Optional[np.ndarray] = None,
 ) -> List[Dict]:
     """Score all non-decayed memories against the query vector.
 
-    Loads embeddings from SQLite and computes the hybrid score in Python.
-    This is O(n) over all memories — acceptable for <100K memories on local
-    hardware.  For larger stores, consider sqlite-vss or FAISS indexing.
+    Scoring runs in NumPy over the embedding matrix (see embedding_matrix.py):
+    one matrix-vector product for cosine similarity, vectorized importance and
+    recency terms, and ``argpartition`` for top-k.  Only the winning rows are
+    then hydrated from SQLite.  Stores above ANN_MIN_ROWS live memories use
+    the IVF index (ann_index.py) to pick candidates, re-ranked exactly.
 
     Args:
         conn: SQLite connection.
         query_vec: The query's embedding vector.
         now: Current timestamp for recency calculation.
         limit: Max results to return.
+        mode: "auto", "exact" or "ann" (see EmbeddingMatrix.top_k).
+        nprobe: IVF lists to probe when the index is used.
+        pending: Unflushed accesses (AccessLog.pending) merged into stats.
+        rowids: Prefiltered scope (_scope_rowids); only these are scored.
 
     Returns:
         List of scored memory dicts, sorted by score descending.
     """
-    rows = conn.execute(
-        """SELECT id, content, embedding, created_at, last_accessed,
-                  access_count, importance, type
-           FROM memories WHERE decayed = 0 AND embedding IS NOT NULL"""
-    ).fetchall()
+    top = get_matrix(db_file(conn)).top_k(query_vec, now, limit, mode=mode, nprobe=nprobe,
+                                          rowids=rowids)
+    return _hydrate(conn, [top], pending)[0]
 
-    scored = []  # type: List[Tuple[float, Dict]]
-    for row in rows:
-        emb = blob_to_embedding(row["embedding"])
-        sim = cosine_similarity(query_vec, emb)
 
-        hours_since = max((now - row["last_accessed"]) / 3600.0, 0.0)
-        recency = 1.0 / (1.0 + math.log(1.0 + hours_since))
+def _vector_recall_batch(
+    conn,
+    query_vecs: np.ndarray,
+    now: float,
+    limit: int,
+    mode: str = "auto",
+    nprobe: Optional[int] = None,
+    pending: Optional[Dict[str, Tuple[int, float]]] = None,
+    rowids: Optional[np.ndarray] = None,
+) -> List[List[Dict]]:
+    """:func:`_vector_recall` for many queries with one matrix-matrix product.
+
+    The winners of all queries are hydrated with a single SELECT.
+    """
+    tops = get_matrix(db_file(conn)).top_k_batch(
+        query_vecs, now, limit, mode=mode, nprobe=nprobe, rowids=rowids
+    )
+    return _hydrate(conn, tops, pending)
+
+
+def _hydrate(
+    conn,
+    tops: List[List[Tuple[int, float, float, float]]],
+    pending: Optional[Dict[str, Tuple[int, float]]] = None,
+) -> List[List[Dict]]:
+    """Turn engine (rowid, score, sim, recency) lists into memory dicts."""
+    rowids = sorted({rowid for top in tops for rowid, _, _, _ in top})
+    by_rowid = {}  # type: Dict[int, Dict[str, Any]]
+    for start in range(0, len(rowids), 500):
+        chunk = rowids[start:start + 500]
+        rows = conn.execute(
+            f"""SELECT rowid, id, content, created_at, last_accessed,
+                       access_count, importance, type
+                FROM memories WHERE rowid IN ({",".join("?" * len(chunk))})""",
+            chunk,
+        ).fetchall()
+        by_rowid.update((row["rowid"], _apply_pending(dict(row), pending)) for row in rows)
 
-        score = (0.5 * sim) + (0.3 * row["importance"]) + (0.2 * recency)
+    return [_hydrate_one(top, by_rowid) for top in tops]
 
-        scored.append((score, {
+
+def _hydrate_one(
+    top: List[Tuple[int, float, float, float]], by_rowid: Dict[int, Dict[str, Any]]
+) -> List[Dict]:
+    results = []  # type: List[Dict]
+    for rowid, score, sim, recency in top:
+        row = by_rowid.get(rowid)
+        if row is None:
+            continue
+        results.append({
             "id": row["id"],
             "content": row["content"],
             "type": row["type"],
@@ -314,52 +843,102 @@ def _vector_recall(
             "created_at": row["created_at"],
             "last_accessed": row["last_accessed"],
             "access_count": row["access_count"],
-        }))
+        })
+    return results
 
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [item for _, item in scored[:limit]]
+
+def _apply_pending(
+    row: Dict[str, Any], pending: Optional[Dict[str, Tuple[int, float]]]
+) -> Dict[str, Any]:
+    """Merge unflushed accesses (access_log.py) into a memory row dict."""
+    count, ts = (pending or {}).get(row["id"], (0, 0.0))
+    if count:
+        row["last_accessed"] = max(row["last_accessed"], ts)
+        row["access_count"] += count
+    return row
+
+
+def _fts_query(query: str) -> Optional[str]:
+    """Build an FTS5 MATCH expression requiring every query word.
+
+    Each word is quoted as a phrase so punctuation and FTS operators in user
+    input are matched literally.
+    """
+    words = [w.strip() for w in query.split() if len(w.strip()) >= 2]
+    if not words:
+        return None
+    return " ".join('"' + w.replace('"', '""') + '"' for w in words)
 
 
 def _keyword_recall(
-    conn, query: str, now: float, limit: int
+    conn, query: str, now: float, limit: int,
+    pending: Optional[Dict[str, Tuple[int, float]]] = None,
+    scope: Optional[List[Tuple[str, List[Any]]]] = None,
 ) -> List[Dict]:
-    """Fallback search using SQL LIKE when embeddings are unavailable.
+    """Keyword search: BM25-ranked FTS5 match, or SQL LIKE without FTS5.
 
-    Splits the query into words and matches any memory containing all words
-    (case-insensitive).  Scored by importance and recency only.
+    Every query word must appear.  With FTS5 the BM25 rank is divided by
+    the query's best rank, giving a 0-1 relevance (1.0 for the best match)
+    that takes the place of cosine similarity in the hybrid score.  BM25
+    magnitudes depend on term frequency — matches on a common word score
+    near 0 — so only their ratio within one query is meaningful.  The LIKE
+    fallback has no relevance signal and is scored by importance and
+    recency only.
 
     Args:
         conn: SQLite connection.
         query: Search query string.
         now: Current timestamp.
         limit: Max results.
+        pending: Unflushed accesses merged into recency and stats.
+        scope: Recall filter conditions (see _recall_scope).
 
     Returns:
         List of scored memory dicts.
     """
-    words = [w.strip() for w in query.split() if len(w.strip()) >= 2]
-    if not words:
+    match = _fts_query(query)
+    if match is None:
         return []
+    where, scope_params = _scope_where(scope)
 
-    # Build WHERE clause: content LIKE '%word1%' AND content LIKE '%word2%' ...
-    conditions = " AND ".join(["content LIKE ?"] * len(words))
-    params = [f"%{w}%" for w in words]
+    if fts_available(conn):
+        rows = conn.execute(
+            f"""SELECT m.id, m.content, m.created_at, m.last_accessed,
+                       m.access_count, m.importance, m.type,
+                       bm25(memories_fts) AS bm25
+                FROM memories_fts
+                JOIN memories m ON m.rowid = memories_fts.rowid
+                WHERE memories_fts MATCH ? AND m.decayed = 0 AND {where}
+                ORDER BY bm25
+                LIMIT ?""",
+            [match] + scope_params + [limit * 4],
+        ).fetchall()
+    else:
+        words = [w.strip() for w in query.split() if len(w.strip()) >= 2]
+        conditions = " AND ".join(["content LIKE ?"] * len(words))
+        rows = conn.execute(
+            f"""SELECT id, content, created_at, last_accessed,
+                       access_count, importance, type, NULL AS bm25
+                FROM memories m
+                WHERE decayed = 0 AND ({conditions}) AND {where}
+                ORDER BY importance DESC, last_accessed DESC
+                LIMIT ?""",
+            [f"%{w}%" for w in words] + scope_params + [limit],
+        ).fetchall()
 
-    rows = conn.execute(
-        f"""SELECT id, content, created_at, last_accessed,
-                   access_count, importance, type
-            FROM memories
-            WHERE decayed = 0 AND ({conditions})
-            ORDER BY importance DESC, last_accessed DESC
-            LIMIT ?""",
-        params + [limit],
-    ).fetchall()
+    # FTS5 bm25(): lower (more negative) is better; rows come best first
+    best = max((-r["bm25"] for r in rows if r["bm25"] is not None), default=0.0)
 
     results = []  # type: List[Dict]
     for row in rows:
+        row = _apply_pending(dict(row), pending)
         hours_since = max((now - row["last_accessed"]) / 3600.0, 0.0)
         recency = 1.0 / (1.0 + math.log(1.0 + hours_since))
-        score = (0.3 * row["importance"]) + (0.2 * recency) + 0.5  # no sim
+        if row["bm25"] is None:
+            relevance = 1.0  # LIKE matched, no ranking signal
+        else:
+            relevance = max(-row["bm25"], 0.0) / best if best > 0 else 1.0
+        score = (0.5 * relevance) + (0.3 * row["importance"]) + (0.2 * recency)
 
         results.append({
             "id": row["id"],
@@ -368,60 +947,46 @@ def _keyword_recall(
             "importance": row["importance"],
             "score": round(score, 4),
             "cosine_similarity": None,
+            "bm25": round(row["bm25"], 4) if row["bm25"] is not None else None,
             "recency_decay": round(recency, 4),
             "created_at": row["created_at"],
             "last_accessed": row["last_accessed"],
             "access_count": row["access_count"],
         })
-    return results
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results[:limit]
 
 
-def _graph_neighbors(conn, mem_id: str, now: float) -> List[Dict]:
-    """Fetch directly connected memories via the edges table.
+# Reciprocal rank fusion: constant k and candidate depth per ranking
+_RRF_K = 60
+_RRF_DEPTH = 4
 
-    Returns neighbors sorted by edge weight descending.
 
-    Args:
-        conn: SQLite connection.
-        mem_id: Memory ID to expand from.
-        now: Current timestamp.
+def _rrf_fuse(vector: List[Dict], keyword: List[Dict], limit: int) -> List[Dict]:
+    """Fuse vector and BM25 rankings with reciprocal rank fusion.
+
+    ``rrf = Σ 1 / (k + rank)`` over the rankings a memory appears in, so a
+    memory ranked well by both beats one ranked first by only one.  The
+    vector result dict is kept when a memory appears in both, with the BM25
+    rank attached.
 
     Returns:
-        List of neighbor memory dicts with edge metadata.
+        Top *limit* fused results, each with an ``rrf_score``.
     """
-    rows = conn.execute(
-        """SELECT m.id, m.content, m.importance, m.type,
-                  m.created_at, m.last_accessed, m.access_count,
-                  e.relation, e.weight
-           FROM edges e
-           JOIN memories m ON (
-               (e.source = ? AND m.id = e.target) OR
-               (e.target = ? AND m.id = e.source)
-           )
-           WHERE m.decayed = 0
-           ORDER BY e.weight DESC
-           LIMIT 5""",
-        (mem_id, mem_id),
-    ).fetchall()
-
-    results = []  # type: List[Dict]
-    for row in rows:
-        hours_since = max((now - row["last_accessed"]) / 3600.0, 0.0)
-        recency = 1.0 / (1.0 + math.log(1.0 + hours_since))
-
-        results.append({
-            "id": row["id"],
-            "content": row["content"],
-            "type": row["type"],
-            "importance": row["importance"],
-            "score": round(0.3 * row["importance"] + 0.2 * recency + 0.5 * row["weight"], 4),
-            "edge_relation": row["relation"],
-            "edge_weight": row["weight"],
-            "created_at": row["created_at"],
-            "last_accessed": row["last_accessed"],
-            "access_count": row["access_count"],
-        })
-    return results
+    fused = {}  # type: Dict[str, Dict]
+    scores = {}  # type: Dict[str, float]
+    for ranking, key in ((vector, "vector_rank"), (keyword, "keyword_rank")):
+        for rank, item in enumerate(ranking, start=1):
+            entry = fused.setdefault(item["id"], dict(item))
+            entry[key] = rank
+            if key == "keyword_rank":
+                entry["bm25"] = item.get("bm25")
+            scores[item["id"]] = scores.get(item["id"], 0.0) + 1.0 / (_RRF_K + rank)
+
+    ranked = sorted(fused.values(), key=lambda r: scores[r["id"]], reverse=True)
+    for item in ranked:
+        item["rrf_score"] = round(scores[item["id"]], 6)
+    return ranked[:limit]
 
 
 # ---------------------------------------------------------------------------
@@ -432,24 +997,57 @@ def cmd_forget(args: argparse.Namespace) -> None:
     """Mark a memory as decayed (soft-delete).
 
     Decayed memories are excluded from recall but never physically deleted.
-    They can be restored by setting decayed=0.
+    They can be restored by setting decayed=0.  Memories already moved to
+    the cold tier are decayed there.
 
     Args:
         args: Parsed CLI args with .id (str).
     """
     conn = get_connection(args.db)
     try:
-        cur = conn.execute(
-            "UPDATE memories SET decayed = 1 WHERE id = ?", (args.id,)
-        )
+        try:
+            result, tier_path, rowid = _decay_memory(conn, args.id)
+        except WriteError as exc:
+            _error_out(str(exc), exc.code)
         conn.commit()
-        if cur.rowcount == 0:
-            _error_out(f"Memory {args.id} not found.", "NOT_FOUND")
-        _json_out({"status": "decayed", "id": args.id})
+        get_matrix(tier_path).forget([rowid])  # drop from ANN lists
+        _json_out(result)
     finally:
         conn.close()
 
 
+def _decay_memory(conn, mem_id: str) -> Tuple[Dict[str, Any], str, int]:
+    """Soft-delete *mem_id* in the hot tier, else in the cold tier.
+
+    A hot-tier update is left to the caller's transaction; a cold-tier one
+    is committed on its own connection.
+
+    Returns:
+        (``forget`` result, database path of the tier, rowid) — the rowid
+        is what the caller drops from that tier's ANN lists after commit.
+
+    Raises:
+        WriteError: NOT_FOUND if neither tier holds the memory.
+    """
+    row = conn.execute("SELECT rowid FROM memories WHERE id = ?", (mem_id,)).fetchone()
+    if row is not None:
+        conn.execute("UPDATE memories SET decayed = 1 WHERE rowid = ?", (row[0],))
+        return {"status": "decayed", "id": mem_id, "tier": "hot"}, db_file(conn), row[0]
+
+    cold = open_cold(db_file(conn))
+    if cold is None:
+        raise WriteError(f"Memory {mem_id} not found.", "NOT_FOUND")
+    try:
+        row = cold.execute("SELECT rowid FROM memories WHERE id = ?", (mem_id,)).fetchone()
+        if row is None:
+            raise WriteError(f"Memory {mem_id} not found.", "NOT_FOUND")
+        cold.execute("UPDATE memories SET decayed = 1 WHERE rowid = ?", (row[0],))
+        cold.commit()
+        return {"status": "decayed", "id": mem_id, "tier": "cold"}, db_file(cold), row[0]
+    finally:
+        cold.close()
+
+
 # ---------------------------------------------------------------------------
 # RELATE — create a graph edge
 # ---------------------------------------------------------------------------
@@ -462,133 +1060,290 @@ def cmd_relate(args: argparse.Namespace) -> None:
               .relation (str), .weight (float).
     """
     conn = get_connection(args.db)
-    now = time.time()
     try:
-        # Verify both memories exist
-        for mid in (args.source, args.target):
-            row = conn.execute(
-                "SELECT id FROM memories WHERE id = ?", (mid,)
-            ).fetchone()
-            if not row:
-                _error_out(f"Memory {mid} not found.", "NOT_FOUND")
-
-        edge_id = new_id()
-        relation = getattr(args, "relation", "relates_to") or "relates_to"
-        weight = getattr(args, "weight", 1.0) or 1.0
-
-        conn.execute(
-            """INSERT INTO edges (id, source, target, relation, weight, created_at)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (edge_id, args.source, args.target, relation, weight, now),
-        )
+        try:
+            result = _insert_edge(conn, args.source, args.target,
+                                  getattr(args, "relation", None),
+                                  getattr(args, "weight", None), time.time())
+        except WriteError as exc:
+            _error_out(str(exc), exc.code)
         conn.commit()
-        _json_out({
-            "status": "linked",
-            "edge_id": edge_id,
-            "source": args.source,
-            "target": args.target,
-            "relation": relation,
-            "weight": weight,
-        })
+        _json_out(result)
     finally:
         conn.close()
 
 
+def _insert_edge(
+    conn, source: str, target: str, relation: Optional[str], weight: Optional[float], now: float,
+) -> Dict[str, Any]:
+    """Insert one explicit edge between two existing memories (caller commits).
+
+    Returns:
+        The ``relate`` result (status, edge_id, source, target, relation,
+        weight).
+
+    Raises:
+        WriteError: NOT_FOUND if either memory is missing.
+    """
+    # Verify both memories exist
+    for mid in (source, target):
+        row = conn.execute(
+            "SELECT id FROM memories WHERE id = ?", (mid,)
+        ).fetchone()
+        if not row:
+            raise WriteError(f"Memory {mid} not found.", "NOT_FOUND")
+
+    edge_id = new_id()
+    relation = relation or "relates_to"
+    weight = weight or 1.0
+
+    conn.execute(
+        """INSERT INTO edges (id, source, target, relation, weight, created_at)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        (edge_id, source, target, relation, weight, now),
+    )
+    return {
+        "status": "linked",
+        "edge_id": edge_id,
+        "source": source,
+        "target": target,
+        "relation": relation,
+        "weight": weight,
+    }
+
+
 # ---------------------------------------------------------------------------
 # REFLECT — maintenance cycle
 # ---------------------------------------------------------------------------
 
+# Live memories above which reflect pre-buckets duplicate search with LSH
+_LSH_AUTO_ROWS = 20000
+
+# Above this share of new rows an incremental duplicate search costs about
+# as much as the full join, so the full join runs instead.
+_INCREMENTAL_MAX_SHARE = 0.5
+
+
+def _reflect_watermark(conn, args: argparse.Namespace, threshold: float) -> Optional[Dict[str, Any]]:
+    """Watermark of the last reflect, or None if this run must rescan everything.
+
+    The watermark (``settings.reflect_watermark``) records when the last run
+    started, the highest matrix rowid it processed and the parameters its
+    results depend on.  It is void after ``--full``, a new similarity
+    threshold, or a re-encoded store (``quantize``, ``reembed``).
+    """
+    if getattr(args, "full", False):
+        return None
+    raw = get_setting(conn, "reflect_watermark")
+    if raw is None:
+        return None
+    try:
+        mark = json.loads(raw)
+    except ValueError:
+        return None
+    if (mark.get("threshold") != threshold
+            or mark.get("format") != embedding_format(conn)
+            or mark.get("model") != embedding_model(conn)):
+        return None
+    return mark
+
+
 def cmd_reflect(args: argparse.Namespace) -> None:
     """Run memory maintenance: prune stale memories and detect near-duplicates.
 
+    Incremental:
+        Each run leaves a watermark (start time, highest rowid processed).
+        The next run only prunes, promotes and compares memories that are
+        new (rowid above the watermark) or were accessed since, so reflect
+        is cheap enough for every heartbeat.  The first run, ``--full``, a
+        changed ``--similarity-threshold`` or a re-encoded store rescan
+        everything.
+
+    Access log:
+        Buffered recall accesses are flushed first, so pruning and
+        promotion see current last_accessed / access_count.
+
     Pruning:
         Memories with importance < 0.2 AND last_accessed > 30 days ago
         are marked as decayed.
 
+    Tiering:
+        Decayed memories and those not accessed for ``--archive-days``
+        (default 90) move to the cold archive with their edges; cold
+        memories recalled within that window move back (tiering.py).
+
     Clustering:
-        All non-decayed memory pairs are checked for cosine similarity > 0.95.
+        New memories are compared against all live ones (full run: all
+        pairs) for cosine similarity > 0.95 with a tiled matrix product.
+        From 20K memories (or with ``--lsh-bits``) comparisons are
+        restricted to random-hyperplane LSH buckets; ``--lsh-bits 0``
+        forces the exact join.
         Near-duplicates are reported as merge candidates (not auto-merged,
         to preserve agent oversight).
 
+    Orphan edges:
+        Edges whose source or target is not a live memory are deleted
+        (one NOT EXISTS probe per edge on the memories primary key).
+
+    ANN index:
+        Rebuilt from scratch (fresh k-means centroids) by full runs once the
+        store has ANN_MIN_ROWS live memories, or always with
+        ``--rebuild-index``.  Incremental runs only build a missing or
+        invalidated index; remember/forget keep it current in between.
+
     Args:
         args: Parsed CLI args with .db (str|None), .prune_days (int),
-              .similarity_threshold (float).
+              .similarity_threshold (float), .rebuild_index (bool),
+              .lsh_bits (int|None), .archive_days (float|None),
+              .no_archive (bool), .full (bool).
     """
     conn = get_connection(args.db)
     now = time.time()
     prune_days = getattr(args, "prune_days", 30) or 30
     sim_threshold = getattr(args, "similarity_threshold", 0.95) or 0.95
+    archive_days = getattr(args, "archive_days", None) or COLD_AFTER_DAYS
 
     try:
+        mark = _reflect_watermark(conn, args, sim_threshold)
+        # Rows above since_rowid are new; rows accessed at or after
+        # since_access were touched by recall since the last run.
+        since_rowid = mark["rowid"] if mark else 0
+        since_access = mark["at"] if mark else 0.0
+
+        access_flushed = get_access_log(db_file(conn)).flush(conn)
+        if os.path.exists(cold_path(db_file(conn))):
+            get_access_log(cold_path(db_file(conn))).flush()
+
         # --- Phase 1: Prune stale low-importance memories ---
+        # Importance never changes after insert, so only memories new since
+        # the last run or whose last access has since crossed the cutoff
+        # can newly qualify (an idx_memories_last_accessed range).
         cutoff = now - (prune_days * 86400)
         cur = conn.execute(
             """UPDATE memories SET decayed = 1
                WHERE importance < 0.2
                  AND last_accessed < ?
-                 AND decayed = 0""",
-            (cutoff,),
+                 AND decayed = 0
+                 AND (last_accessed >= ? OR rowid > ?)""",
+            (cutoff, mark["prune_cutoff"] if mark else 0.0, since_rowid),
         )
         pruned_count = cur.rowcount
 
+        # --- Phase 1b: Hot/cold tiering ---
+        # Hard deletes from the hot table make the embedding sidecar rebuild
+        # itself (new epoch, ANN index dropped) on the next refresh.
+        restored = archived = None
+        if not getattr(args, "no_archive", False):
+            archive_cutoff = now - archive_days * 86400
+            restored = restore(conn, archive_cutoff)
+            archived = archive(conn, archive_cutoff)
+            if archived["memories"]:
+                archived["vacuumed"] = compact(conn)
+
         # --- Phase 2: Find near-duplicate clusters ---
-        rows = conn.execute(
-            """SELECT id, content, embedding FROM memories
-               WHERE decayed = 0 AND embedding IS NOT NULL"""
-        ).fetchall()
+        # Blocked M·Mᵀ over the embedding matrix (similarity_join.py); pairs
+        # stream out tile by tile, optionally pre-bucketed with LSH.
+        # Incremental runs only pair memories new since the watermark with
+        # the whole store (similar_pairs_to); older pairs were reported before.
+        engine = get_matrix(db_file(conn))
+        engine.refresh()
+        live = np.asarray(engine.matrix[engine.live_pos])
+        new_rows = np.flatnonzero(engine.live_rowids > since_rowid)
+        incremental = mark is not None and len(new_rows) <= _INCREMENTAL_MAX_SHARE * len(live)
+        if incremental:
+            pairs = list(similar_pairs_to(live, new_rows, sim_threshold))
+        else:
+            lsh_bits = getattr(args, "lsh_bits", None)
+            if lsh_bits is None and len(live) >= _LSH_AUTO_ROWS:
+                lsh_bits = 12
+            pairs = list(similar_pairs(live, sim_threshold, lsh_bits=lsh_bits or None))
+
+        rowids = sorted({int(engine.live_rowids[k]) for i, j, _ in pairs for k in (i, j)})
+        contents = {}  # type: Dict[int, Tuple[str, str]]
+        for start in range(0, len(rowids), 500):
+            chunk = rowids[start:start + 500]
+            for row in conn.execute(
+                f"""SELECT rowid, id, content FROM memories
+                    WHERE rowid IN ({",".join("?" * len(chunk))})""",
+                chunk,
+            ):
+                contents[row["rowid"]] = (row["id"], row["content"])
 
         duplicates = []  # type: List[Dict]
-        embeddings = []  # type: List[Tuple[str, str, np.ndarray]]
-        for row in rows:
-            embeddings.append((
-                row["id"], row["content"], blob_to_embedding(row["embedding"])
-            ))
-
-        # O(n²) comparison — acceptable for <10K memories.
-        # For larger stores, use approximate nearest neighbors.
-        checked = set()  # type: set
-        for i, (id_a, content_a, emb_a) in enumerate(embeddings):
-            for j in range(i + 1, len(embeddings)):
-                id_b, content_b, emb_b = embeddings[j]
-                pair_key = (id_a, id_b) if id_a < id_b else (id_b, id_a)
-                if pair_key in checked:
-                    continue
-                checked.add(pair_key)
-
-                sim = cosine_similarity(emb_a, emb_b)
-                if sim >= sim_threshold:
-                    duplicates.append({
-                        "memory_a": {"id": id_a, "content": content_a[:120]},
-                        "memory_b": {"id": id_b, "content": content_b[:120]},
-                        "similarity": round(sim, 4),
-                        "suggestion": "merge",
-                    })
+        for i, j, sim in pairs:
+            id_a, content_a = contents[int(engine.live_rowids[i])]
+            id_b, content_b = contents[int(engine.live_rowids[j])]
+            duplicates.append({
+                "memory_a": {"id": id_a, "content": content_a[:120]},
+                "memory_b": {"id": id_b, "content": content_b[:120]},
+                "similarity": round(sim, 4),
+                "suggestion": "merge",
+            })
 
         # --- Phase 3: Promote frequently-accessed episodic → semantic ---
+        # access_count only grows through access-log flushes, which also
+        # move last_accessed forward: untouched memories cannot qualify.
         promoted = conn.execute(
             """UPDATE memories SET type = 'semantic'
                WHERE type = 'episodic'
                  AND access_count >= 5
                  AND importance >= 0.5
-                 AND decayed = 0"""
+                 AND decayed = 0
+                 AND (last_accessed >= ? OR rowid > ?)""",
+            (since_access, since_rowid),
         ).rowcount
 
         # --- Phase 4: Orphan edge cleanup ---
+        # Hot edges only ever point at hot memories (tiering moves them
+        # along), so an edge without a live endpoint here is an orphan.
         orphan_edges = conn.execute(
             """DELETE FROM edges
-               WHERE source IN (SELECT id FROM memories WHERE decayed = 1)
-                  OR target IN (SELECT id FROM memories WHERE decayed = 1)"""
+               WHERE NOT EXISTS (SELECT 1 FROM memories m
+                                 WHERE m.id = edges.source AND m.decayed = 0)
+                  OR NOT EXISTS (SELECT 1 FROM memories m
+                                 WHERE m.id = edges.target AND m.decayed = 0)"""
         ).rowcount
 
+        # Rows inserted after the matrix refresh get higher rowids and are
+        # picked up by the next run.  Taken from the refreshed matrix, not
+        # the old mark: archiving the newest rows frees their rowids.
+        set_setting(conn, "reflect_watermark", json.dumps({
+            "at": now,
+            "rowid": int(engine.rowids[-1]) if len(engine.rowids) else 0,
+            "prune_cutoff": cutoff,
+            "threshold": sim_threshold,
+            "format": embedding_format(conn),
+            "model": embedding_model(conn),
+        }))
         conn.commit()
 
+        # --- Phase 5: Rebuild the ANN index ---
+        ann_index = None
+        engine.refresh()
+        if getattr(args, "rebuild_index", False) or (
+            len(engine.live_pos) >= ANN_MIN_ROWS
+            and not (incremental and engine.ann.load(engine.epoch))
+        ):
+            ann_index = engine.build_index()
+        if archived and (archived["memories"] or restored["memories"]):
+            cold_engine = get_matrix(cold_path(db_file(conn)))
+            cold_engine.refresh()
+            if len(cold_engine.live_pos) >= ANN_MIN_ROWS:
+                cold_engine.build_index()
+
         _json_out({
             "status": "ok",
+            "mode": "incremental" if incremental else "full",
+            "compared": len(new_rows) if incremental else len(live),
             "pruned": pruned_count,
             "near_duplicates": duplicates,
             "duplicate_count": len(duplicates),
             "promoted_to_semantic": promoted,
             "orphan_edges_removed": orphan_edges,
+            "archived": archived,
+            "restored": restored,
+            "ann_index": ann_index,
+            "access_flushed": access_flushed,
             "total_active": conn.execute(
                 "SELECT COUNT(*) FROM memories WHERE decayed = 0"
             ).fetchone()[0],
@@ -601,50 +1356,79 @@ def cmd_reflect(args: argparse.Namespace) -> None:
 # TIMELINE — temporal retrieval
 # ---------------------------------------------------------------------------
 
+def _entity_condition(conn, entity: str, alias: str = "") -> Tuple[str, str]:
+    """SQL condition (and its parameter) selecting memories about *entity*.
+
+    Entities extracted at write time go through the memory_entities index;
+    other keywords use the FTS5 index, or LIKE without FTS5.
+    """
+    key = entity.strip().lower()
+    indexed = conn.execute(
+        "SELECT 1 FROM memory_entities WHERE entity = ? LIMIT 1", (key,)
+    ).fetchone()
+    if indexed:
+        return f"{alias}id IN (SELECT memory_id FROM memory_entities WHERE entity = ?)", key
+    match = _fts_query(entity)
+    if fts_available(conn) and match:
+        # Not an extracted entity — full-text match
+        return f"{alias}rowid IN (SELECT rowid FROM memories_fts WHERE memories_fts MATCH ?)", match
+    return f"{alias}content LIKE ?", f"%{entity}%"
+
+
 def cmd_timeline(args: argparse.Namespace) -> None:
     """Retrieve memories in chronological order, optionally filtered by entity.
 
+    Entities extracted at write time are looked up through the
+    memory_entities index; other keywords use the FTS5 index (or LIKE).
+    Archived memories (tiering.py) are included, tagged ``"tier": "cold"``.
+
     Args:
         args: Parsed CLI args with .entity (str|None), .since (str|None),
               .limit (int).
     """
     conn = get_connection(args.db)
+    cold = open_cold(db_file(conn))
     limit = getattr(args, "limit", 20) or 20
 
     try:
-        conditions = ["decayed = 0"]
-        params = []  # type: List[Any]
-
-        entity = getattr(args, "entity", None)
-        if entity:
-            conditions.append("content LIKE ?")
-            params.append(f"%{entity}%")
-
+        since_ts = None
         since = getattr(args, "since", None)
         if since:
             # Parse ISO date string to timestamp
             import datetime
             try:
-                dt = datetime.datetime.fromisoformat(since)
-                conditions.append("created_at >= ?")
-                params.append(dt.timestamp())
+                since_ts = datetime.datetime.fromisoformat(since).timestamp()
             except ValueError:
                 _error_out(f"Invalid date format: {since}. Use ISO 8601.", "BAD_DATE")
 
-        where = " AND ".join(conditions)
-        params.append(limit)
-
-        rows = conn.execute(
-            f"""SELECT id, content, type, importance, created_at,
-                       last_accessed, access_count
-                FROM memories
-                WHERE {where}
-                ORDER BY created_at DESC
-                LIMIT ?""",
-            params,
-        ).fetchall()
-
-        results = [dict(row) for row in rows]
+        results = []  # type: List[Dict[str, Any]]
+        for tier_conn, tier in [(conn, None)] + ([(cold, "cold")] if cold is not None else []):
+            conditions = ["decayed = 0"]
+            params = []  # type: List[Any]
+            entity = getattr(args, "entity", None)
+            if entity:
+                cond, value = _entity_condition(tier_conn, entity)
+                conditions.append(cond)
+                params.append(value)
+            if since_ts is not None:
+                conditions.append("created_at >= ?")
+                params.append(since_ts)
+            where = " AND ".join(conditions)
+            params.append(limit)
+
+            rows = tier_conn.execute(
+                f"""SELECT id, content, type, importance, created_at,
+                           last_accessed, access_count
+                    FROM memories
+                    WHERE {where}
+                    ORDER BY created_at DESC
+                    LIMIT ?""",
+                params,
+            ).fetchall()
+            pending = get_access_log(db_file(tier_conn)).pending()
+            results.extend(_tag_tier(_apply_pending(dict(row), pending), tier) for row in rows)
+        results.sort(key=lambda r: r["created_at"], reverse=True)
+        results = results[:limit]
         _json_out({
             "status": "ok",
             "count": len(results),
@@ -652,6 +1436,8 @@ def cmd_timeline(args: argparse.Namespace) -> None:
         })
     finally:
         conn.close()
+        if cold is not None:
+            cold.close()
 
 
 # ---------------------------------------------------------------------------
@@ -661,40 +1447,37 @@ def cmd_timeline(args: argparse.Namespace) -> None:
 def cmd_stats(args: argparse.Namespace) -> None:
     """Report memory system health statistics.
 
-    No embeddings loaded — this command is instant.
+    No embeddings loaded — this command is instant.  Counts cover both
+    tiers; ``tiers`` breaks them down.
     """
     conn = get_connection(args.db)
+    cold = open_cold(db_file(conn))
     try:
-        total = conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
-        active = conn.execute(
-            "SELECT COUNT(*) FROM memories WHERE decayed = 0"
-        ).fetchone()[0]
+        # Staleness: memories not accessed in 7+ days
+        week_ago = time.time() - (7 * 86400)
+        counts = [0] * 8
+        for tier_conn in [conn] + ([cold] if cold is not None else []):
+            row = tier_conn.execute(
+                """SELECT COUNT(*),
+                          COALESCE(SUM(decayed = 0), 0),
+                          COALESCE(SUM(type = 'episodic' AND decayed = 0), 0),
+                          COALESCE(SUM(type = 'semantic' AND decayed = 0), 0),
+                          COALESCE(SUM(importance >= 0.7 AND decayed = 0), 0),
+                          COALESCE(SUM(importance >= 0.3 AND importance < 0.7 AND decayed = 0), 0),
+                          COALESCE(SUM(importance < 0.3 AND decayed = 0), 0),
+                          COALESCE(SUM(last_accessed < ? AND decayed = 0), 0)
+                   FROM memories""",
+                (week_ago,),
+            ).fetchone()
+            counts = [c + v for c, v in zip(counts, row)]
+        total, active, episodic, semantic, imp_high, imp_med, imp_low, stale = counts
         decayed = total - active
-        episodic = conn.execute(
-            "SELECT COUNT(*) FROM memories WHERE type = 'episodic' AND decayed = 0"
-        ).fetchone()[0]
-        semantic = conn.execute(
-            "SELECT COUNT(*) FROM memories WHERE type = 'semantic' AND decayed = 0"
-        ).fetchone()[0]
         edges_count = conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+        if cold is not None:
+            edges_count += cold.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
 
-        # Importance distribution
-        imp_high = conn.execute(
-            "SELECT COUNT(*) FROM memories WHERE importance >= 0.7 AND decayed = 0"
-        ).fetchone()[0]
-        imp_med = conn.execute(
-            "SELECT COUNT(*) FROM memories WHERE importance >= 0.3 AND importance < 0.7 AND decayed = 0"
-        ).fetchone()[0]
-        imp_low = conn.execute(
-            "SELECT COUNT(*) FROM memories WHERE importance < 0.3 AND decayed = 0"
-        ).fetchone()[0]
-
-        # Staleness: memories not accessed in 7+ days
-        week_ago = time.time() - (7 * 86400)
-        stale = conn.execute(
-            "SELECT COUNT(*) FROM memories WHERE last_accessed < ? AND decayed = 0",
-            (week_ago,),
-        ).fetchone()[0]
+        # Embedding cache hit/miss totals (all processes on this host)
+        cache = get_embedding_cache()
 
         # DB file size
         db_path = args.db or DEFAULT_DB_PATH
@@ -714,12 +1497,23 @@ def cmd_stats(args: argparse.Namespace) -> None:
                 "low_lt_0.3": imp_low,
             },
             "stale_7d": stale,
+            "pending_access_entries": get_access_log(db_file(conn)).entries,
+            "embedding_format": embedding_format(conn),
+            "embedding_model": embedding_model(conn),
+            "embedding_backends": {
+                "configured": EMBED_BACKEND,
+                "usable": candidates(EMBED_BACKEND, embedding_model(conn)),
+            },
+            "embedding_cache": cache.report() if cache is not None else None,
             "db_size_bytes": db_size,
             "db_size_human": _human_size(db_size),
             "db_path": db_path,
+            "tiers": tier_stats(conn),
         })
     finally:
         conn.close()
+        if cold is not None:
+            cold.close()
 
 
 def _human_size(size_bytes: int) -> str:
@@ -732,99 +1526,890 @@ def _human_size(size_bytes: int) -> str:
 
 
 # ---------------------------------------------------------------------------
-# IMPORT-MD — ingest existing markdown memory files
+# IMPORT-MD / INGEST — batched ingest of markdown and JSONL files
 # ---------------------------------------------------------------------------
 
+_DATE_STEM_RE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+
+def _split_markdown(content: str) -> List[str]:
+    """Split markdown by headings (## / ###) or double-newlines into chunks."""
+    chunks = re.split(r"\n(?=##\s|\n\n)", content)
+    return [c.strip() for c in chunks if c.strip() and len(c.strip()) > 20]
+
+
+def _file_date(path: str) -> Optional[float]:
+    """Timestamp for daily-note files named like ``2026-02-11.md``."""
+    import datetime
+    m = _DATE_STEM_RE.search(os.path.basename(path))
+    if not m:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(m.group(1)).timestamp()
+    except ValueError:
+        return None
+
+
+def _read_ingest_file(path: str, default_type: str) -> List[Dict[str, Any]]:
+    """Turn one markdown or JSONL file into ingest items.
+
+    JSONL lines are objects with ``content`` (or ``text``) and optional
+    ``importance``, ``type`` and ``created_at`` (epoch seconds).
+    """
+    items = []  # type: List[Dict[str, Any]]
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                text = (rec.get("content") or rec.get("text") or "").strip()
+                if not text:
+                    continue
+                mem_type = rec.get("type", default_type)
+                items.append({
+                    "content": text,
+                    "type": mem_type if mem_type in ("episodic", "semantic") else default_type,
+                    "importance": rec.get("importance"),
+                    "created_at": rec.get("created_at"),
+                })
+        else:
+            created_at = _file_date(path)
+            for chunk in _split_markdown(f.read()):
+                items.append({"content": chunk, "type": default_type,
+                              "importance": None, "created_at": created_at})
+    return items
+
+
+def _ingest_items(
+    conn,
+    items: List[Dict[str, Any]],
+    batch_size: int = 64,
+    link: bool = False,
+    progress: bool = False,
+) -> Dict[str, int]:
+    """Embed and insert items in batches.
+
+    Each batch is embedded with one model call and written with one
+    ``executemany`` inside a single transaction.  With *link*, the new
+    memories are auto-linked after their batch is committed.
+
+    Returns:
+        Counts of imported memories and edges created.
+    """
+    imported = 0
+    edges_created = 0
+    started = time.time()
+    total = len(items)
+    fmt = embedding_format(conn)
+
+    for start in range(0, total, batch_size):
+        batch = items[start:start + batch_size]
+        texts = [it["content"] for it in batch]
+        embeddings = generate_embeddings(texts, batch_size=batch_size, conn=conn)
+        now = time.time()
+
+        rows = []
+        entity_rows = []  # type: List[Tuple[str, str]]
+        linkable = []  # type: List[Tuple[str, Any, List[str]]]
+        for i, item in enumerate(batch):
+            mem_id = new_id()
+            entities = extract_entities(item["content"])
+            importance = item.get("importance")
+            if importance is None:
+                importance = _auto_importance(item["content"], entities)
+            emb = embeddings[i] if embeddings is not None else None
+            rows.append((
+                mem_id, item["content"],
+                embedding_to_blob(emb, fmt) if emb is not None else None,
+                item.get("created_at") or now, now,
+                importance, item.get("type") or "semantic",
+            ))
+            entity_rows.extend((mem_id, e.lower()) for e in entities)
+            if link and emb is not None and entities:
+                linkable.append((mem_id, emb, entities))
+
+        with conn:
+            conn.executemany(
+                """INSERT INTO memories
+                   (id, content, embedding, created_at, last_accessed,
+                    access_count, importance, type, decayed)
+                   VALUES (?, ?, ?, ?, ?, 0, ?, ?, 0)""",
+                rows,
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO memory_entities (memory_id, entity) VALUES (?, ?)",
+                entity_rows,
+            )
+        imported += len(rows)
+
+        if linkable:
+            with conn:
+                for mem_id, emb, entities in linkable:
+                    edges_created += _auto_link(conn, mem_id, emb, entities, now)
+
+        if progress:
+            rate = imported / max(time.time() - started, 1e-6)
+            print(f"ingest: {imported}/{total} chunks ({rate:.1f}/s)",
+                  file=sys.stderr, flush=True)
+
+    if imported:
+        get_matrix(db_file(conn)).sync()
+    return {"imported": imported, "edges_created": edges_created}
+
+
 def cmd_import_md(args: argparse.Namespace) -> None:
     """Import a markdown file into the memory store.
 
     Splits the file by headings (## or ###) or double-newlines into chunks,
-    then stores each chunk as a separate memory.  Useful for cold-starting
-    the memory system from existing MEMORY.md or daily note files.
+    then stores each chunk as a separate memory via the batched ingest
+    pipeline.  Useful for cold-starting the memory system from existing
+    MEMORY.md or daily note files.
 
     Args:
         args: Parsed CLI args with .file (str), .type (str).
     """
-    import re as re_mod
-
     filepath = args.file
     if not os.path.exists(filepath):
         _error_out(f"File not found: {filepath}", "FILE_NOT_FOUND")
 
+    mem_type = getattr(args, "type", "semantic") or "semantic"
     with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    # Split by markdown headings or double-newlines
-    chunks = re_mod.split(r"\n(?=##\s|\n\n)", content)
-    chunks = [c.strip() for c in chunks if c.strip() and len(c.strip()) > 20]
+        chunks = _split_markdown(f.read())
 
     if not chunks:
         _error_out("No meaningful content found to import.", "EMPTY_FILE")
 
     conn = get_connection(args.db)
-    now = time.time()
+    try:
+        counts = _ingest_items(
+            conn,
+            [{"content": c, "type": mem_type, "importance": None, "created_at": None}
+             for c in chunks],
+        )
+        _json_out({
+            "status": "imported",
+            "file": filepath,
+            "chunks_imported": counts["imported"],
+            "type": mem_type,
+        })
+    finally:
+        conn.close()
+
+
+def cmd_ingest(args: argparse.Namespace) -> None:
+    """Batched import of markdown and JSONL files (a single file or a directory).
+
+    Directories are walked recursively for ``*.md`` and ``*.jsonl`` files.
+    Markdown files are chunked like ``import-md``; daily notes named
+    ``YYYY-MM-DD.md`` get that date as ``created_at``.  Embeddings are
+    generated ``--batch-size`` chunks at a time and each batch is inserted
+    in one transaction; progress goes to stderr.
+
+    Args:
+        args: Parsed CLI args with .path (str), .type (str), .batch_size (int),
+              .link (bool), .quiet (bool).
+    """
+    path = args.path
+    if not os.path.exists(path):
+        _error_out(f"Path not found: {path}", "FILE_NOT_FOUND")
+
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+            if name.endswith((".md", ".jsonl"))
+        )
+    else:
+        files = [path]
+
     mem_type = getattr(args, "type", "semantic") or "semantic"
-    imported = 0
+    items = []  # type: List[Dict[str, Any]]
+    for fp in files:
+        items.extend(_read_ingest_file(fp, mem_type))
 
+    if not items:
+        _error_out("No meaningful content found to ingest.", "EMPTY_INPUT")
+
+    batch_size = max(getattr(args, "batch_size", 64) or 64, 1)
+    conn = get_connection(args.db)
+    started = time.time()
     try:
-        for chunk in chunks:
-            mem_id = new_id()
-            embedding = generate_embedding(chunk)
-            blob = embedding_to_blob(embedding) if embedding is not None else None
-            entities = extract_entities(chunk)
+        counts = _ingest_items(
+            conn, items,
+            batch_size=batch_size,
+            link=getattr(args, "link", False),
+            progress=not getattr(args, "quiet", False),
+        )
+        _json_out({
+            "status": "imported",
+            "path": path,
+            "files": len(files),
+            "chunks_imported": counts["imported"],
+            "edges_created": counts["edges_created"],
+            "batch_size": batch_size,
+            "seconds": round(time.time() - started, 2),
+        })
+    finally:
+        conn.close()
 
-            word_count = len(chunk.split())
-            entity_bonus = min(len(entities) * 0.05, 0.2)
-            length_bonus = min(word_count / 100.0, 0.2)
-            importance = round(min(0.5 + entity_bonus + length_bonus, 1.0), 3)
 
-            conn.execute(
-                """INSERT INTO memories
-                   (id, content, embedding, created_at, last_accessed,
-                    access_count, importance, type, decayed)
-                   VALUES (?, ?, ?, ?, ?, 0, ?, ?, 0)""",
-                (mem_id, chunk, blob, now, now, importance, mem_type),
-            )
-            imported += 1
+# ---------------------------------------------------------------------------
+# EXPORT — dump memories as JSON or stream NDJSON
+# ---------------------------------------------------------------------------
+
+# NDJSON dump format version (header line)
+_NDJSON_VERSION = 1
+
+# Rows fetched per cursor round-trip when streaming
+_STREAM_CHUNK = 1000
+
+
+def cmd_export(args: argparse.Namespace) -> None:
+    """Export memories and edges as JSON, or stream them as NDJSON.
+
+    ``--format json`` (default) prints one document of active memories
+    (without embeddings).  ``--format ndjson`` streams one record per line
+    straight from a cursor — a header, every memory (decayed ones included,
+    so the dump is a full backup), then every edge — in constant memory.
+    ``--embeddings`` adds each stored embedding as base64 for a lossless
+    backup that ``import`` restores without re-embedding.
+
+    Both formats include the cold archive (tiering.py); its memories and
+    edges are tagged ``"tier": "cold"``.  ``import`` restores them into
+    the hot tier, and the next ``reflect`` archives them again.
+
+    Args:
+        args: Parsed CLI args with .format (str), .embeddings (bool),
+              .output (str|None).
+    """
+    conn = get_connection(args.db)
+    cold = open_cold(db_file(conn))
+    try:
+        tiers = [(conn, None)] + ([(cold, "cold")] if cold is not None else [])
+        if getattr(args, "format", "json") != "ndjson":
+            memories, edges = [], []  # type: List[Dict[str, Any]], List[Dict[str, Any]]
+            for tier_conn, tier in tiers:
+                pending = get_access_log(db_file(tier_conn)).pending()
+                for row in tier_conn.execute(
+                    """SELECT id, content, created_at, last_accessed,
+                              access_count, importance, type
+                       FROM memories WHERE decayed = 0"""
+                ):
+                    memories.append(_tag_tier(_apply_pending(dict(row), pending), tier))
+                for row in tier_conn.execute(
+                    "SELECT source, target, relation, weight, created_at FROM edges"
+                ):
+                    edges.append(_tag_tier(dict(row), tier))
+            memories.sort(key=lambda m: m["created_at"], reverse=True)
+
+            _json_out({
+                "status": "ok",
+                "memories": memories,
+                "edges": edges,
+                "total_memories": len(memories),
+                "total_edges": len(edges),
+            })
+            return
+
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        try:
+            _stream_ndjson(tiers, out, getattr(args, "embeddings", False))
+        finally:
+            if args.output:
+                out.close()
+    finally:
+        conn.close()
+        if cold is not None:
+            cold.close()
+
+
+def _tag_tier(rec: Dict[str, Any], tier: Optional[str]) -> Dict[str, Any]:
+    """Mark a record read from the cold tier (hot records stay untagged)."""
+    if tier is not None:
+        rec["tier"] = tier
+    return rec
+
+
+def _stream_ndjson(tiers: List[Tuple[Any, Optional[str]]], out, embeddings: bool) -> None:
+    """Write header, memory and edge records to *out*, one JSON per line.
+
+    *tiers* is ``(connection, tier tag)`` per tier, hot first: all memories
+    precede all edges, so edges between tiers import cleanly.
+    """
+    conn = tiers[0][0]
+    out.write(json.dumps({
+        "record": "header",
+        "version": _NDJSON_VERSION,
+        "exported_at": time.time(),
+        "embedding_format": embedding_format(conn),
+        "embedding_model": embedding_model(conn),
+    }) + "\n")
+
+    for tier_conn, tier in tiers:
+        pending = get_access_log(db_file(tier_conn)).pending()
+        cursor = tier_conn.execute(
+            f"""SELECT id, content, {"embedding" if embeddings else "NULL AS embedding"},
+                       created_at, last_accessed, access_count, importance, type, decayed
+                FROM memories ORDER BY rowid"""
+        )
+        while True:
+            rows = cursor.fetchmany(_STREAM_CHUNK)
+            if not rows:
+                break
+            for row in rows:
+                rec = _apply_pending(dict(row), pending)
+                blob = rec.pop("embedding")
+                if blob is not None:
+                    rec["embedding"] = base64.b64encode(blob).decode("ascii")
+                out.write(json.dumps({"record": "memory", **_tag_tier(rec, tier)}) + "\n")
+
+    for tier_conn, tier in tiers:
+        cursor = tier_conn.execute(
+            "SELECT id, source, target, relation, weight, created_at FROM edges ORDER BY rowid"
+        )
+        while True:
+            rows = cursor.fetchmany(_STREAM_CHUNK)
+            if not rows:
+                break
+            for row in rows:
+                out.write(json.dumps({"record": "edge", **_tag_tier(dict(row), tier)}) + "\n")
+
+
+# ---------------------------------------------------------------------------
+# IMPORT — restore an NDJSON export
+# ---------------------------------------------------------------------------
 
+def _import_memories(
+    conn, batch: List[Dict[str, Any]], fmt: str, embed: bool, dump_model: str = MODEL_NAME,
+) -> Tuple[int, int]:
+    """Insert one batch of exported memory records in a single transaction.
+
+    Embeddings from another vector space than this store's (*dump_model*,
+    from the dump header) are dropped and re-embedded; an empty store
+    adopts the dump's space.
+
+    Returns:
+        (inserted, embedded) — rows written and embeddings generated here.
+    """
+    model = embedding_model(conn)
+    if model is None and any(rec.get("embedding") for rec in batch):
+        set_setting(conn, "embedding_model", dump_model)
         conn.commit()
+        model = dump_model
+    foreign = dump_model != model
+
+    blobs = []  # type: List[Optional[bytes]]
+    missing = []  # type: List[int]
+    for i, rec in enumerate(batch):
+        blob = None
+        if rec.get("embedding") and not foreign:
+            blob = base64.b64decode(rec["embedding"])
+        if blob is not None and len(blob) != blob_width(fmt):
+            blob = embedding_to_blob(blob_to_embedding(blob), fmt)  # other host's format
+        if blob is None:
+            missing.append(i)
+        blobs.append(blob)
+
+    embedded = 0
+    if embed and missing:
+        vecs = generate_embeddings([batch[i]["content"] for i in missing], conn=conn)
+        if vecs is not None:
+            for i, vec in zip(missing, vecs):
+                blobs[i] = embedding_to_blob(vec, fmt)
+            embedded = len(missing)
+
+    now = time.time()
+    with conn:
+        inserted = conn.executemany(
+            """INSERT OR IGNORE INTO memories
+               (id, content, embedding, created_at, last_accessed,
+                access_count, importance, type, decayed)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (rec["id"], rec["content"], blob,
+                 rec.get("created_at") or now, rec.get("last_accessed") or now,
+                 rec.get("access_count") or 0, rec.get("importance", 0.5),
+                 rec.get("type") or "episodic", rec.get("decayed") or 0)
+                for rec, blob in zip(batch, blobs)
+            ],
+        ).rowcount
+        conn.executemany(
+            "INSERT OR IGNORE INTO memory_entities (memory_id, entity) VALUES (?, ?)",
+            [(rec["id"], e.lower()) for rec in batch for e in extract_entities(rec["content"])],
+        )
+    return inserted, embedded
+
+
+def _import_edges(conn, batch: List[Dict[str, Any]]) -> int:
+    """Insert one batch of edge records; edges to unknown memories are skipped."""
+    with conn:
+        return conn.executemany(
+            """INSERT OR IGNORE INTO edges (id, source, target, relation, weight, created_at)
+               SELECT ?, ?, ?, ?, ?, ?
+               WHERE EXISTS (SELECT 1 FROM memories WHERE id = ?)
+                 AND EXISTS (SELECT 1 FROM memories WHERE id = ?)""",
+            [
+                (rec.get("id") or new_id(), rec["source"], rec["target"],
+                 rec.get("relation") or "relates_to", rec.get("weight", 1.0),
+                 rec.get("created_at") or time.time(), rec["source"], rec["target"])
+                for rec in batch
+            ],
+        ).rowcount
+
+
+def cmd_import(args: argparse.Namespace) -> None:
+    """Restore memories and edges from ``export --format ndjson``.
+
+    The file (or ``-`` for stdin) is read line by line and written in
+    ``--batch-size`` transactions, so memory use is constant.  Existing ids
+    are left untouched (re-importing is idempotent).  Embeddings in the dump
+    are converted to this database's format; memories without one, or with
+    one from another embedding backend's space, are embedded in batches
+    unless ``--no-embed``.
+
+    Args:
+        args: Parsed CLI args with .path (str), .batch_size (int),
+              .no_embed (bool), .quiet (bool).
+    """
+    path = args.path
+    if path != "-" and not os.path.exists(path):
+        _error_out(f"File not found: {path}", "FILE_NOT_FOUND")
+
+    batch_size = max(getattr(args, "batch_size", 500) or 500, 1)
+    conn = get_connection(args.db)
+    started = time.time()
+    counts = {"memories": 0, "edges": 0, "embedded": 0, "skipped": 0, "records": 0}
+    try:
+        fmt = embedding_format(conn)
+        dump_model = MODEL_NAME  # dumps without the field predate other backends
+        memories, edges = [], []  # type: List[Dict[str, Any]], List[Dict[str, Any]]
+
+        def _flush_memories() -> None:
+            inserted, embedded = _import_memories(conn, memories, fmt, not args.no_embed,
+                                                  dump_model)
+            counts["memories"] += inserted
+            counts["skipped"] += len(memories) - inserted
+            counts["embedded"] += embedded
+            memories.clear()
+            if not args.quiet:
+                print(f"import: {counts['records']} records", file=sys.stderr)
+
+        def _flush_edges() -> None:
+            inserted = _import_edges(conn, edges)
+            counts["edges"] += inserted
+            counts["skipped"] += len(edges) - inserted
+            edges.clear()
+
+        src = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+        try:
+            for lineno, line in enumerate(src, 1):
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    _error_out(f"Line {lineno}: invalid JSON ({exc})", "BAD_INPUT")
+                kind = rec.get("record")
+                if kind == "header":
+                    if rec.get("version", 0) > _NDJSON_VERSION:
+                        _error_out(f"Unsupported export version {rec['version']}", "BAD_INPUT")
+                    dump_model = rec.get("embedding_model") or MODEL_NAME
+                    continue
+                counts["records"] += 1
+                if kind == "memory":
+                    memories.append(rec)
+                    if len(memories) >= batch_size:
+                        _flush_memories()
+                elif kind == "edge":
+                    if memories:  # edges may point at memories still buffered
+                        _flush_memories()
+                    edges.append(rec)
+                    if len(edges) >= batch_size:
+                        _flush_edges()
+            if memories:
+                _flush_memories()
+            if edges:
+                _flush_edges()
+        finally:
+            if src is not sys.stdin:
+                src.close()
+
+        get_matrix(db_file(conn)).sync()  # append imported embeddings to the matrix
         _json_out({
             "status": "imported",
-            "file": filepath,
-            "chunks_imported": imported,
-            "type": mem_type,
+            "path": path,
+            **counts,
+            "seconds": round(time.time() - started, 2),
         })
     finally:
         conn.close()
 
 
 # ---------------------------------------------------------------------------
-# EXPORT — dump all memories as JSON
+# ANN-BENCH — recall@k vs latency for the IVF index
 # ---------------------------------------------------------------------------
 
-def cmd_export(args: argparse.Namespace) -> None:
-    """Export all active memories as a JSON array (without embeddings)."""
+def cmd_ann_bench(args: argparse.Namespace) -> None:
+    """Compare ANN recall against exact recall over sampled queries.
+
+    Queries are stored embeddings of randomly chosen live memories, so no
+    model is needed.  For each nprobe value the report gives recall@k (share
+    of the exact top-k also returned by ANN) and p50/p95 latency, next to the
+    exact-scan latency.  Use it to pick ``--nprobe`` for your store size.
+
+    Args:
+        args: Parsed CLI args with .queries (int), .k (int), .nprobe (str),
+              .rebuild (bool).
+    """
+    conn = get_connection(args.db)
+    try:
+        engine = get_matrix(db_file(conn))
+        engine.refresh()
+        if len(engine.live_pos) == 0:
+            _error_out("No embedded memories to benchmark.", "EMPTY_STORE")
+
+        build = None
+        if args.rebuild or not engine.ann.load(engine.epoch):
+            t0 = time.perf_counter()
+            build = engine.build_index()
+            build["build_seconds"] = round(time.perf_counter() - t0, 3)
+
+        try:
+            probes = [int(p) for p in args.nprobe.split(",") if p.strip()]
+        except ValueError:
+            _error_out(f"Invalid --nprobe list: {args.nprobe}", "BAD_ARGS")
+
+        rng = np.random.default_rng(0)
+        sample = rng.choice(engine.live_pos, size=min(args.queries, len(engine.live_pos)),
+                            replace=False)
+        queries = [np.array(engine.matrix[p]) for p in sample]
+        now = time.time()
+
+        def _run(mode: str, nprobe: Optional[int] = None) -> Tuple[List[set], List[float]]:
+            hits, times = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                top = engine.top_k(q, now, args.k, mode=mode, nprobe=nprobe)
+                times.append((time.perf_counter() - t0) * 1000.0)
+                hits.append({rowid for rowid, _, _, _ in top})
+            return hits, times
+
+        def _pct(values: List[float], q: float) -> float:
+            return round(float(np.percentile(values, q)), 3)
+
+        truth, exact_ms = _run("exact")
+        report = []
+        for nprobe in probes:
+            found, ann_ms = _run("ann", nprobe)
+            recall_at_k = np.mean([
+                len(t & f) / len(t) for t, f in zip(truth, found) if t
+            ])
+            report.append({
+                "nprobe": nprobe,
+                "recall_at_k": round(float(recall_at_k), 4),
+                "p50_ms": _pct(ann_ms, 50),
+                "p95_ms": _pct(ann_ms, 95),
+                "speedup_p50": round(_pct(exact_ms, 50) / max(_pct(ann_ms, 50), 1e-6), 2),
+            })
+
+        _json_out({
+            "status": "ok",
+            "memories": int(len(engine.live_pos)),
+            "nlist": engine.ann.nlist,
+            "default_nprobe": default_nprobe(engine.ann.nlist),
+            "ann_min_rows": ANN_MIN_ROWS,
+            "k": args.k,
+            "queries": len(queries),
+            "index_build": build,
+            "exact": {"p50_ms": _pct(exact_ms, 50), "p95_ms": _pct(exact_ms, 95)},
+            "ann": report,
+        })
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# FLUSH-ACCESS — write buffered access stats
+# ---------------------------------------------------------------------------
+
+def cmd_flush_access(args: argparse.Namespace) -> None:
+    """Fold the recall access log into memories in one transaction.
+
+    Recall only appends to the log; this also runs from ``reflect``, on
+    server shutdown and automatically every ACCESS_FLUSH_ENTRIES accesses.
+    """
     conn = get_connection(args.db)
     try:
+        counts = get_access_log(db_file(conn)).flush(conn)
+        _json_out({"status": "ok", **counts})
+    finally:
+        conn.close()
+
+
+def cmd_warmup(args: argparse.Namespace) -> None:
+    """Pull the store into the OS page cache ahead of the first recalls.
+
+    Useful after a reboot or before a latency-sensitive session; the
+    resident server does the same at startup with ``serve --warmup``.
+    """
+    conn = get_connection(args.db)
+    try:
+        version = schema_version(conn)
+        path = db_file(conn)
+    finally:
+        conn.close()
+    _json_out({
+        "status": "ok",
+        "profile": SQLITE_PROFILE,
+        "schema_version": version,
+        **get_matrix(path).warmup(),
+    })
+
+
+# ---------------------------------------------------------------------------
+# QUANTIZE — compact embedding storage
+# ---------------------------------------------------------------------------
+
+# Stored embeddings re-encoded per transaction during migration
+_QUANTIZE_BATCH = 2000
+
+
+def _quantization_accuracy(
+    vectors: np.ndarray, fmt: str, queries: int, k: int
+) -> Dict[str, Any]:
+    """Top-k agreement between float32 cosine and the quantized pipeline.
+
+    Each query (a sampled stored vector) is ranked exactly in float32, then
+    through what recall does with format *fmt*: coarse scores on the codes,
+    the best ``k × RERANK_FACTOR`` re-scored in float32.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms
+    matrix = QuantizedMatrix(*quantize(vectors, fmt))
+
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)
+    k = min(k, len(vectors))
+    shortlist = min(max(k * RERANK_FACTOR, 50), len(vectors))
+    coarse_hits, reranked_hits = [], []
+    for i in sample:
+        q = vectors[i]
+        truth = set(np.argpartition(-(vectors @ q), k - 1)[:k].tolist())
+        coarse = matrix.dot(q)
+        cand = np.argpartition(-coarse, shortlist - 1)[:shortlist]
+        exact = matrix.rescore(q, cand)
+        coarse_top = set(np.argpartition(-coarse, k - 1)[:k].tolist())
+        reranked_top = set(cand[np.argpartition(-exact, k - 1)[:k]].tolist())
+        coarse_hits.append(len(truth & coarse_top) / k)
+        reranked_hits.append(len(truth & reranked_top) / k)
+
+    return {
+        "queries": len(sample),
+        "k": k,
+        "coarse_recall_at_k": round(float(np.mean(coarse_hits)), 4),
+        "recall_at_k": round(float(np.mean(reranked_hits)), 4),
+    }
+
+
+def cmd_quantize(args: argparse.Namespace) -> None:
+    """Switch stored embeddings to float32, float16 or int8.
+
+    First measures top-k agreement of the target format against the current
+    vectors (``--check-only`` stops there).  Otherwise every embedding is
+    re-encoded in batches, the format is recorded in ``settings`` so new
+    memories use it, and the DB is vacuumed to return the freed pages.
+    Converting back to float32 does not restore precision already lost.
+
+    Args:
+        args: Parsed CLI args with .format (str), .check_only (bool),
+              .queries (int), .k (int), .no_vacuum (bool).
+    """
+    conn = get_connection(args.db)
+    try:
+        fmt = args.format
+        current = embedding_format(conn)
+        engine = get_matrix(db_file(conn))
+        engine.refresh()
+        n = len(engine.live_pos)
+
+        accuracy = None
+        if n:
+            accuracy = _quantization_accuracy(
+                np.asarray(engine.matrix[engine.live_pos]), fmt, args.queries, args.k
+            )
+        result = {
+            "status": "ok",
+            "from_format": current,
+            "to_format": fmt,
+            "embedded_memories": n,
+            "bytes_per_embedding": {"before": blob_width(current), "after": blob_width(fmt)},
+            "accuracy": accuracy,
+        }  # type: Dict[str, Any]
+        if args.check_only:
+            result["status"] = "check_only"
+            _json_out(result)
+            return
+
+        db_path = db_file(conn)
+        size_before = os.path.getsize(db_path)
+        had_index = engine.ann.exists()
+
+        set_setting(conn, "embedding_format", fmt)  # new writes use it right away
+        conn.commit()
+        width = blob_width(fmt)
+        converted = 0
+        last_rowid = 0
+        while True:
+            rows = conn.execute(
+                """SELECT rowid, embedding FROM memories
+                   WHERE rowid > ? AND embedding IS NOT NULL
+                   ORDER BY rowid LIMIT ?""",
+                (last_rowid, _QUANTIZE_BATCH),
+            ).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            updates = [
+                (embedding_to_blob(blob_to_embedding(blob), fmt), rowid)
+                for rowid, blob in rows if len(blob) != width
+            ]
+            with conn:
+                conn.executemany("UPDATE memories SET embedding = ? WHERE rowid = ?", updates)
+            converted += len(updates)
+
+        if not args.no_vacuum:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        # Sidecar is rebuilt in the new format (new epoch), so the IVF index is too
+        engine.refresh()
+        if had_index:
+            engine.build_index()
+
+        result.update({
+            "converted": converted,
+            "db_size_before": _human_size(size_before),
+            "db_size_after": _human_size(os.path.getsize(db_path)),
+            "ann_index_rebuilt": had_index,
+        })
+        _json_out(result)
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# REEMBED — switch the store to another embedding backend
+# ---------------------------------------------------------------------------
+
+_REEMBED_BATCH = 256
+
+
+def _reembed_tier(conn, backend, batch_size: int, quiet: bool, label: str) -> int:
+    """Re-encode every memory of one tier with *backend*, then retag it.
+
+    Rows are rewritten in rowid order while the old ``embedding_model``
+    stays in place, so recall keeps querying the unchanged sidecar with
+    the old engine until the tag flips.  The flip happens in the same
+    transaction as a final pass over rows inserted meanwhile.
+
+    Returns:
+        Number of memories re-embedded.
+    """
+    fmt = embedding_format(conn)
+    done = 0
+    last_rowid = 0
+
+    def _next_batch() -> bool:
+        nonlocal done, last_rowid
         rows = conn.execute(
-            """SELECT id, content, created_at, last_accessed,
-                      access_count, importance, type
-               FROM memories WHERE decayed = 0
-               ORDER BY created_at DESC"""
+            "SELECT rowid, content FROM memories WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, batch_size),
         ).fetchall()
+        if not rows:
+            return False
+        last_rowid = rows[-1][0]
+        vecs = backend.encode([r[1] for r in rows], batch_size=64)
+        conn.executemany(
+            "UPDATE memories SET embedding = ? WHERE rowid = ?",
+            [(embedding_to_blob(vec, fmt), r[0]) for vec, r in zip(vecs, rows)],
+        )
+        done += len(rows)
+        if not quiet:
+            print(f"reembed {label}: {done} memories", file=sys.stderr)
+        return True
 
-        edges = conn.execute(
-            """SELECT source, target, relation, weight, created_at
-               FROM edges"""
-        ).fetchall()
+    while _next_batch():
+        conn.commit()
+    set_setting(conn, "embedding_model", backend.model)  # takes the write lock
+    while _next_batch():
+        pass
+    conn.commit()
+    return done
 
-        _json_out({
+
+def cmd_reembed(args: argparse.Namespace) -> None:
+    """Re-embed all memories with another embedding backend.
+
+    Vectors from different backends' spaces (MiniLM vs hashed n-grams) are
+    never mixed in one store, so switching engines that produce another
+    space rewrites every embedding, in both tiers.  Engines sharing the
+    store's space (onnx ↔ sentence-transformers) need no re-embedding; set
+    AGENT_MEMORY_EMBED_BACKEND instead, or pass ``--force``.  The embedding
+    sidecar is rebuilt and the IVF index too, if there was one.
+
+    Args:
+        args: Parsed CLI args with .backend (str), .batch_size (int),
+              .force (bool), .quiet (bool).
+    """
+    backend = get_backend(args.backend)
+    if backend is None:
+        _error_out(f"Embedding backend '{args.backend}' failed to load (see log).",
+                   "BACKEND_UNAVAILABLE")
+
+    conn = get_connection(args.db)
+    try:
+        current = embedding_model(conn)
+        result = {
             "status": "ok",
-            "memories": [dict(r) for r in rows],
-            "edges": [dict(e) for e in edges],
-            "total_memories": len(rows),
-            "total_edges": len(edges),
+            "backend": args.backend,
+            "from_model": current,
+            "to_model": backend.model,
+        }  # type: Dict[str, Any]
+        if current == backend.model and not args.force:
+            result.update({"status": "unchanged", "reembedded": 0})
+            _json_out(result)
+            return
+
+        started = time.time()
+        engine = get_matrix(db_file(conn))
+        had_index = engine.ann.exists()
+        batch_size = max(getattr(args, "batch_size", _REEMBED_BATCH) or _REEMBED_BATCH, 1)
+        tiers = {"hot": _reembed_tier(conn, backend, batch_size, args.quiet, "hot")}
+        cold = open_cold(db_file(conn))
+        if cold is not None:
+            try:
+                tiers["cold"] = _reembed_tier(cold, backend, batch_size, args.quiet, "cold")
+            finally:
+                cold.close()
+
+        # New space → the sidecar is rebuilt (new epoch), so the IVF index is too
+        engine.refresh()
+        if had_index:
+            engine.build_index()
+
+        result.update({
+            "reembedded": tiers,
+            "ann_index_rebuilt": had_index,
+            "seconds": round(time.time() - started, 2),
         })
+        _json_out(result)
     finally:
         conn.close()
 
@@ -833,6 +2418,31 @@ def cmd_export(args: argparse.Namespace) -> None:
 # CLI argument parser
 # ---------------------------------------------------------------------------
 
+def _add_filter_args(p: argparse.ArgumentParser) -> None:
+    """Recall filter, tier and graph options shared by recall and recall-batch."""
+    p.add_argument("--tier", choices=["auto", "hot", "all"], default="auto",
+                   help="Cold archive: search on weak hot results (auto), never, or always")
+    p.add_argument("--expand", choices=["hops", "ppr", "none"], default="hops",
+                   help="Graph expansion: k-hop neighbors of strong hits (default), "
+                        "personalized PageRank from all hits, or none")
+    p.add_argument("--hops", type=int, default=1,
+                   help="Edges to follow for --expand hops (default: 1)")
+    p.add_argument("--type", choices=["episodic", "semantic"], default=None,
+                   help="Only memories of this type")
+    p.add_argument("--min-importance", type=float, default=None,
+                   help="Only memories with importance >= this (0.0-1.0)")
+    p.add_argument("--created-after", default=None,
+                   help="Created at/after (ISO 8601 or age like 7d, 24h)")
+    p.add_argument("--created-before", default=None,
+                   help="Created at/before (ISO 8601 or age)")
+    p.add_argument("--accessed-after", default=None,
+                   help="Last accessed at/after (ISO 8601 or age)")
+    p.add_argument("--accessed-before", default=None,
+                   help="Last accessed at/before (ISO 8601 or age)")
+    p.add_argument("--entity", default=None,
+                   help="Only memories mentioning this entity")
+
+
 def build_parser() -> argparse.ArgumentParser:
     """Build the argparse CLI for all memory subcommands."""
     parser = argparse.ArgumentParser(
@@ -858,6 +2468,27 @@ def build_parser() -> argparse.ArgumentParser:
     p_rec.add_argument("query", help="Search query")
     p_rec.add_argument("--limit", type=int, default=7,
                        help="Max results (default: 7)")
+    p_rec.add_argument("--mode", choices=["auto", "vector", "keyword", "hybrid"],
+                       default="auto",
+                       help="Search mode (default: auto = vector, keyword if no model)")
+    p_rec.add_argument("--exact", action="store_true",
+                       help="Score every memory even if an ANN index exists")
+    p_rec.add_argument("--nprobe", type=int, default=None,
+                       help="IVF lists to probe when the ANN index is used")
+    _add_filter_args(p_rec)
+
+    # recall-batch
+    p_rb = subs.add_parser("recall-batch", help="Run several recalls in one store scan")
+    p_rb.add_argument("queries", nargs="+", help="Search queries")
+    p_rb.add_argument("--limit", type=int, default=7,
+                      help="Max results per query (default: 7)")
+    p_rb.add_argument("--mode", choices=["auto", "vector", "keyword", "hybrid"],
+                      default="auto", help="Search mode (as for recall)")
+    p_rb.add_argument("--exact", action="store_true",
+                      help="Score every memory even if an ANN index exists")
+    p_rb.add_argument("--nprobe", type=int, default=None,
+                      help="IVF lists to probe when the ANN index is used")
+    _add_filter_args(p_rb)
 
     # forget
     p_fg = subs.add_parser("forget", help="Soft-delete a memory")
@@ -878,6 +2509,19 @@ def build_parser() -> argparse.ArgumentParser:
                        help="Prune memories older than N days (default: 30)")
     p_ref.add_argument("--similarity-threshold", type=float, default=0.95,
                        help="Near-duplicate threshold (default: 0.95)")
+    p_ref.add_argument("--rebuild-index", action="store_true",
+                       help="Rebuild the ANN index regardless of store size")
+    p_ref.add_argument("--lsh-bits", type=int, default=None,
+                       help="LSH bits for duplicate search (default: 12 above 20K "
+                            "memories, else exact; 0 = always exact)")
+    p_ref.add_argument("--archive-days", type=float, default=None,
+                       help=f"Archive memories not accessed for N days to the cold "
+                            f"tier (default: {COLD_AFTER_DAYS:g})")
+    p_ref.add_argument("--no-archive", action="store_true",
+                       help="Skip hot/cold tiering")
+    p_ref.add_argument("--full", action="store_true",
+                       help="Ignore the last-run watermark: rescan every memory "
+                            "and re-report all near-duplicates")
 
     # timeline
     p_tl = subs.add_parser("timeline", help="Chronological memory retrieval")
@@ -897,8 +2541,74 @@ def build_parser() -> argparse.ArgumentParser:
     p_imp.add_argument("--type", choices=["episodic", "semantic"],
                        default="semantic", help="Memory type for imports")
 
+    # ingest
+    p_ing = subs.add_parser("ingest", help="Batched import of markdown/JSONL files")
+    p_ing.add_argument("path", help="File or directory (*.md, *.jsonl)")
+    p_ing.add_argument("--type", choices=["episodic", "semantic"],
+                       default="semantic", help="Default memory type")
+    p_ing.add_argument("--batch-size", type=int, default=64,
+                       help="Chunks embedded and inserted per batch (default: 64)")
+    p_ing.add_argument("--link", action="store_true",
+                       help="Auto-link new memories after each batch")
+    p_ing.add_argument("--quiet", action="store_true",
+                       help="No progress output on stderr")
+
     # export
-    subs.add_parser("export", help="Export all memories as JSON")
+    p_exp = subs.add_parser("export", help="Export all memories as JSON or NDJSON")
+    p_exp.add_argument("--format", choices=["json", "ndjson"], default="json",
+                       help="json: one document of active memories; ndjson: streamed full dump")
+    p_exp.add_argument("--embeddings", action="store_true",
+                       help="Include embeddings as base64 (ndjson only; lossless backup)")
+    p_exp.add_argument("--output", default=None,
+                       help="Write to this file instead of stdout")
+
+    # import
+    p_imp = subs.add_parser("import", help="Restore an NDJSON export")
+    p_imp.add_argument("path", help="NDJSON file from 'export --format ndjson' ('-' = stdin)")
+    p_imp.add_argument("--batch-size", type=int, default=500,
+                       help="Records per transaction (default: 500)")
+    p_imp.add_argument("--no-embed", action="store_true",
+                       help="Do not embed memories that have no embedding in the dump")
+    p_imp.add_argument("--quiet", action="store_true",
+                       help="Suppress progress output on stderr")
+
+    # ann-bench
+    p_ab = subs.add_parser("ann-bench", help="ANN recall@k vs latency report")
+    p_ab.add_argument("--queries", type=int, default=100,
+                      help="Sample queries drawn from stored embeddings (default: 100)")
+    p_ab.add_argument("--k", type=int, default=10, help="Top-k compared (default: 10)")
+    p_ab.add_argument("--nprobe", default="1,2,4,8,16,32,64",
+                      help="Comma-separated nprobe values (default: 1,2,4,8,16,32,64)")
+    p_ab.add_argument("--rebuild", action="store_true",
+                      help="Rebuild the index before measuring")
+
+    # flush-access
+    subs.add_parser("flush-access", help="Write buffered recall access stats to the DB")
+
+    # quantize
+    p_q = subs.add_parser("quantize", help="Re-encode stored embeddings in a compact format")
+    p_q.add_argument("--format", choices=list(EMBEDDING_FORMATS), required=True,
+                     help="Target storage format")
+    p_q.add_argument("--check-only", action="store_true",
+                     help="Only report top-k accuracy of the target format")
+    p_q.add_argument("--queries", type=int, default=100,
+                     help="Sample queries for the accuracy check (default: 100)")
+    p_q.add_argument("--k", type=int, default=10, help="Top-k compared (default: 10)")
+    p_q.add_argument("--no-vacuum", action="store_true",
+                     help="Skip VACUUM after converting (DB file will not shrink)")
+
+    # reembed
+    p_re = subs.add_parser("reembed", help="Re-embed all memories with another embedding backend")
+    p_re.add_argument("--backend", choices=list(BACKENDS), required=True,
+                      help="Target engine (onnx and sentence-transformers share one space)")
+    p_re.add_argument("--batch-size", type=int, default=_REEMBED_BATCH,
+                      help=f"Memories per transaction (default: {_REEMBED_BATCH})")
+    p_re.add_argument("--force", action="store_true",
+                      help="Re-embed even if the store is already in the backend's space")
+    p_re.add_argument("--quiet", action="store_true", help="No progress on stderr")
+
+    # warmup
+    subs.add_parser("warmup", help="Pre-load the embedding matrix and DB pages into memory")
 
     return parser
 
@@ -907,19 +2617,24 @@ def build_parser() -> argparse.ArgumentParser:
 # Dispatch
 # ---------------------------------------------------------------------------
 
-# Need os for stats db_size check
-import os
-
 _DISPATCH = {
     "remember": cmd_remember,
     "recall": cmd_recall,
+    "recall-batch": cmd_recall_batch,
     "forget": cmd_forget,
     "relate": cmd_relate,
     "reflect": cmd_reflect,
     "timeline": cmd_timeline,
     "stats": cmd_stats,
     "import-md": cmd_import_md,
+    "ingest": cmd_ingest,
     "export": cmd_export,
+    "import": cmd_import,
+    "ann-bench": cmd_ann_bench,
+    "flush-access": cmd_flush_access,
+    "quantize": cmd_quantize,
+    "reembed": cmd_reembed,
+    "warmup": cmd_warmup,
 }
 
 if __name__ == "__main__":
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+agent-memory / server.py
+=========================
+Resident memory daemon for the Hybrid Vector-Graph Memory System.
+
+Every ``python3 memory.py <command>`` call pays for a cold interpreter,
+numpy import, SQLite open and — worst of all — the sentence-transformers
+model load.  This server keeps one process alive with the model warm and
+executes the exact same subcommands as ``memory.py`` over a Unix socket.
+
+Protocol (JSON lines, one request and one response per line):
+    → {"args": ["recall", "API redesign", "--limit", "5"], "timeout": 60}
+    ← {"returncode": 0, "stdout": "{...memory.py JSON...}", "stderr": ""}
+
+``timeout`` (optional) is how long the client waits; maintenance
+subprocesses are killed after it (default MAINTENANCE_TIMEOUT).
+
+    → {"op": "ping"}
+    ← {"status": "ok", "pid": 1234, "uptime_s": 12.3, "requests": 42}
+
+    → {"op": "shutdown"}
+    ← {"status": "stopping"}
+
+The response mirrors a finished subprocess so ``lib/memory_client`` can
+parse it with the same code path it uses for the subprocess fallback.
+
+``remember``, ``relate`` and ``forget`` do not run under the dispatch
+lock: they are handed to the database's write coordinator
+(write_queue.py), which commits concurrent writes in groups.  Long
+maintenance commands (``ingest``, ``export``, ``reflect``, ...) run in a
+``memory.py`` subprocess so they never hold the lock while recalls wait.
+It runs in the workspace root, like the client's own subprocess fallback,
+so relative paths name the same files whichever way a call is served.
+
+Usage:
+    python3 skills/agent-memory/scripts/server.py serve
+    python3 skills/agent-memory/scripts/server.py status
+    python3 skills/agent-memory/scripts/server.py stop
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils import (
+    DEFAULT_DB_PATH,
+    DEFAULT_SOCKET_PATH,
+    _WORKSPACE_ROOT,
+    _get_model,
+    embedding_model,
+    get_connection,
+    loaded_backends,
+    logger,
+)
+
+import access_log
+import memory
+import write_queue
+from embedding_matrix import get_matrix
+
+# memory.py commands print to the process-wide stdout/stderr, so command
+# execution is serialized while those streams are redirected.
+_DISPATCH_LOCK = threading.Lock()
+
+_PARSER = None  # memory.py's parser, built once (takes ms); used under the lock
+
+# Commands that can run for minutes.  They are executed in a subprocess —
+# paying a cold model load is cheap next to their runtime, and recalls
+# keep being served meanwhile.
+MAINTENANCE_COMMANDS = (
+    "ingest", "import", "import-md", "export", "reflect",
+    "reembed", "quantize", "ann-bench",
+)
+
+_MEMORY_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory.py")
+
+# Seconds a maintenance subprocess may run when the client sent no timeout.
+MAINTENANCE_TIMEOUT: float = float(os.environ.get("AGENT_MEMORY_MAINTENANCE_TIMEOUT", "3600"))
+
+
+def _parse(argv: List[str]):
+    """Parse memory.py arguments with the cached parser (hold _DISPATCH_LOCK)."""
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = memory.build_parser()
+    return _PARSER.parse_args(argv)
+
+
+# ---------------------------------------------------------------------------
+# Command execution
+# ---------------------------------------------------------------------------
+
+def execute(argv: List[str]) -> Dict[str, Any]:
+    """Run one memory.py subcommand in-process and capture its output.
+
+    Args:
+        argv: Arguments exactly as they would be passed to memory.py.
+
+    Returns:
+        Dict with returncode, stdout and stderr, like a finished subprocess.
+    """
+    out, err = io.StringIO(), io.StringIO()
+    returncode = 0
+    with _DISPATCH_LOCK, contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            args = _parse(argv)
+            memory._DISPATCH[args.command](args)
+        except SystemExit as exc:
+            if exc.code is None:
+                returncode = 0
+            elif isinstance(exc.code, int):
+                returncode = exc.code
+            else:
+                returncode = 1
+        except Exception as exc:  # keep the daemon alive on command bugs
+            logger.exception("Command failed: %s", argv)
+            print(json.dumps({"status": "error", "code": "INTERNAL",
+                              "message": str(exc)}), file=sys.stderr)
+            returncode = 1
+    return {"returncode": returncode, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+
+def execute_subprocess(argv: List[str], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Run a maintenance command in a ``memory.py`` subprocess.
+
+    Args:
+        argv: Arguments exactly as they would be passed to memory.py.
+        timeout: Seconds before the subprocess is killed (the client has
+            given up by then); MAINTENANCE_TIMEOUT if None.
+
+    Returns:
+        Dict with returncode, stdout and stderr of the finished subprocess.
+    """
+    timeout = timeout or MAINTENANCE_TIMEOUT
+    try:
+        proc = subprocess.run(
+            [sys.executable, _MEMORY_SCRIPT] + argv,
+            capture_output=True, text=True, cwd=_WORKSPACE_ROOT, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return {"returncode": 1, "stdout": "",
+                "stderr": json.dumps({"status": "error", "code": "TIMEOUT",
+                                      "message": f"{argv[0]} killed after {timeout:g}s"})}
+    return {"returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr}
+
+
+def execute_write(argv: List[str]) -> Dict[str, Any]:
+    """Run remember/relate/forget through the write coordinator.
+
+    Only argument parsing holds the dispatch lock; the caller's thread then
+    waits for the group commit, while other requests keep being served.
+
+    Args:
+        argv: Arguments exactly as they would be passed to memory.py.
+
+    Returns:
+        Dict with returncode, stdout and stderr, like a finished subprocess.
+    """
+    err = io.StringIO()
+    with _DISPATCH_LOCK, contextlib.redirect_stderr(err):
+        try:
+            args = _parse(argv)
+        except SystemExit as exc:
+            return {"returncode": exc.code if isinstance(exc.code, int) else 2,
+                    "stdout": "", "stderr": err.getvalue()}
+
+    writer = write_queue.get_writer(args.db)
+    try:
+        if args.command == "remember":
+            result = writer.remember(args.text, args.importance, args.type)
+        elif args.command == "relate":
+            result = writer.relate(args.source, args.target, args.relation, args.weight)
+        else:
+            result = writer.forget(args.id)
+    except memory.WriteError as exc:
+        return {"returncode": 1, "stdout": "",
+                "stderr": json.dumps({"status": "error", "code": exc.code,
+                                      "message": str(exc)})}
+    except Exception as exc:  # keep the daemon alive on command bugs
+        logger.exception("Command failed: %s", argv)
+        return {"returncode": 1, "stdout": "",
+                "stderr": json.dumps({"status": "error", "code": "INTERNAL",
+                                      "message": str(exc)})}
+    return {"returncode": 0, "stdout": json.dumps(result, indent=2, default=str) + "\n",
+            "stderr": ""}
+
+
+# ---------------------------------------------------------------------------
+# Socket server
+# ---------------------------------------------------------------------------
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serve JSON-line requests until the client closes the connection."""
+
+    def handle(self) -> None:
+        for raw in self.rfile:
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                self._reply({"returncode": 2, "stdout": "",
+                             "stderr": json.dumps({"status": "error", "code": "BAD_REQUEST",
+                                                   "message": "Request is not valid JSON"})})
+                continue
+
+            op = request.get("op")
+            if op == "ping":
+                self._reply(self.server.status())
+            elif op == "shutdown":
+                self._reply({"status": "stopping"})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            else:
+                argv = request.get("args")
+                if not isinstance(argv, list) or not argv:
+                    self._reply({"returncode": 2, "stdout": "",
+                                 "stderr": json.dumps({"status": "error", "code": "BAD_REQUEST",
+                                                       "message": "Missing 'args' list"})})
+                    continue
+                self.server.requests += 1
+                argv = [str(a) for a in argv]
+                if argv[0] in write_queue.WRITE_COMMANDS:
+                    self._reply(execute_write(argv))
+                elif argv[0] in MAINTENANCE_COMMANDS:
+                    timeout = request.get("timeout")
+                    self._reply(execute_subprocess(
+                        argv, float(timeout) if isinstance(timeout, (int, float)) else None))
+                else:
+                    self._reply(execute(argv))
+
+    def _reply(self, payload: Dict[str, Any]) -> None:
+        self.wfile.write((json.dumps(payload, default=str) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+class MemoryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix-socket server holding the warm embedding model."""
+
+    daemon_threads = True
+    # Listen backlog: with socketserver's default of 5, bursts from many
+    # agents get ECONNREFUSED and fall back to subprocesses.
+    request_queue_size = 128
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.started_at = time.time()
+        self.requests = 0
+        super().__init__(socket_path, _Handler)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "socket": self.socket_path,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "model_loaded": bool(loaded_backends()),
+            "embedding_backends": loaded_backends(),
+            "writers": [w.status() for w in write_queue.writers()],
+        }
+
+
+def _request(socket_path: str, payload: Dict[str, Any], timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+    """Send a single control request; return None if no server is listening."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            with sock.makefile("r", encoding="utf-8") as f:
+                line = f.readline()
+    except (FileNotFoundError, ConnectionRefusedError, socket.timeout, OSError):
+        return None
+    return json.loads(line) if line else None
+
+
+def serve(socket_path: str, preload: bool = True, warmup: bool = False) -> None:
+    """Bind the socket and serve until a shutdown request or SIGINT."""
+    if os.path.exists(socket_path):
+        if _request(socket_path, {"op": "ping"}) is not None:
+            raise SystemExit(f"agent-memory server already running on {socket_path}")
+        os.unlink(socket_path)  # stale socket from a crashed server
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+
+    if preload:
+        # Warm the engine matching the default store's vectors
+        conn = get_connection(DEFAULT_DB_PATH)
+        try:
+            _get_model(embedding_model(conn))
+        finally:
+            conn.close()
+    if warmup:
+        logger.info("Warmed %s", get_matrix(DEFAULT_DB_PATH).warmup())
+
+    server = MemoryServer(socket_path)
+    os.chmod(socket_path, 0o600)
+    logger.info("agent-memory server listening on %s", socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        write_queue.close_all()  # commit writes still queued
+        access_log.flush_all()  # buffered recall stats (see access_log.py)
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(socket_path)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="server.py",
+        description="Resident agent-memory daemon (Unix socket, JSON lines).",
+    )
+    parser.add_argument(
+        "--socket", default=DEFAULT_SOCKET_PATH,
+        help=f"Unix socket path (default: {DEFAULT_SOCKET_PATH})",
+    )
+    subs = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = subs.add_parser("serve", help="Run the server in the foreground")
+    p_serve.add_argument("--no-preload", action="store_true",
+                         help="Load the embedding model on first use instead of at startup")
+    p_serve.add_argument("--warmup", action="store_true",
+                         help="Pre-fault the default store's matrix and DB pages at startup")
+    subs.add_parser("status", help="Ping a running server")
+    subs.add_parser("stop", help="Ask a running server to shut down")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.socket, preload=not args.no_preload, warmup=args.warmup)
+    elif args.command == "status":
+        reply = _request(args.socket, {"op": "ping"})
+        print(json.dumps(reply or {"status": "stopped", "socket": args.socket}, indent=2))
+        sys.exit(0 if reply else 1)
+    elif args.command == "stop":
+        reply = _request(args.socket, {"op": "shutdown"})
+        print(json.dumps(reply or {"status": "stopped", "socket": args.socket}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+agent-memory / similarity_join.py
+==================================
+Blocked all-pairs similarity join for near-duplicate detection.
+
+``reflect`` needs every pair of memories whose cosine similarity is above a
+threshold.  Instead of a nested Python loop, the Gram matrix M·Mᵀ is computed
+in square tiles with NumPy; each tile is thresholded and its hits are yielded
+immediately, so peak memory is one tile (``tile²`` floats), not n² pairs.
+
+Optional random-hyperplane LSH pre-buckets rows by the sign pattern of a few
+random projections.  Only rows that share a bucket in at least one of the
+hash tables are compared — near-duplicates (cos ≥ 0.9) agree on almost every
+sign bit, so they collide with high probability while the number of compared
+pairs drops sharply.
+
+``similar_pairs_to`` is the incremental variant: only pairs involving a
+given set of rows (the memories added since the last ``reflect``), at
+O(k·n) instead of O(n²).
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+# Rows per tile side; a 2048×2048 float32 tile is 16 MB.
+DEFAULT_TILE: int = 2048
+
+
+def _blocked_pairs(
+    data: np.ndarray, index: np.ndarray, threshold: float, tile: int
+) -> Iterator[Tuple[int, int, float]]:
+    """Yield (i, j, sim) with i < j over rows ``data[index]``, tile by tile."""
+    n = len(index)
+    for a in range(0, n, tile):
+        block_a = data[index[a:a + tile]]
+        for b in range(a, n, tile):
+            block_b = block_a if b == a else data[index[b:b + tile]]
+            sims = block_a @ block_b.T
+            if b == a:
+                sims = np.triu(sims, k=1)  # each pair once, no self-pairs
+            ii, jj = np.nonzero(sims >= threshold)
+            for i, j in zip(ii.tolist(), jj.tolist()):
+                yield int(index[a + i]), int(index[b + j]), float(sims[i, j])
+
+
+def similar_pairs(
+    data: np.ndarray,
+    threshold: float,
+    tile: int = DEFAULT_TILE,
+    lsh_bits: Optional[int] = None,
+    lsh_tables: int = 4,
+    seed: int = 0,
+) -> Iterator[Tuple[int, int, float]]:
+    """Stream every pair of rows with cosine similarity ≥ *threshold*.
+
+    Args:
+        data: (n × dim) float32 matrix of L2-normalized rows.
+        threshold: Minimum cosine similarity.
+        tile: Tile side length for the blocked M·Mᵀ.
+        lsh_bits: Hyperplanes per LSH table; None compares all pairs exactly.
+        lsh_tables: Independent LSH tables (more = higher recall).
+        seed: RNG seed for the hyperplanes.
+
+    Yields:
+        (i, j, similarity) with i < j, row indices into *data*.
+    """
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    n = len(data)
+    if n < 2:
+        return
+
+    if not lsh_bits:
+        yield from _blocked_pairs(data, np.arange(n), threshold, tile)
+        return
+
+    rng = np.random.default_rng(seed)
+    weights = (1 << np.arange(lsh_bits)).astype(np.int64)
+    seen = set()  # only pairs found so far, to dedupe across tables
+    for _ in range(lsh_tables):
+        planes = rng.standard_normal((data.shape[1], lsh_bits)).astype(np.float32)
+        codes = ((data @ planes) > 0).astype(np.int64) @ weights
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        for bucket in np.split(order, bounds):
+            if len(bucket) < 2:
+                continue
+            for i, j, sim in _blocked_pairs(data, np.sort(bucket), threshold, tile):
+                if (i, j) not in seen:
+                    seen.add((i, j))
+                    yield i, j, sim
+
+
+def similar_pairs_to(
+    data: np.ndarray,
+    rows: np.ndarray,
+    threshold: float,
+    tile: int = DEFAULT_TILE,
+) -> Iterator[Tuple[int, int, float]]:
+    """Stream every pair with cosine similarity ≥ *threshold* involving *rows*.
+
+    Pairs between two rows outside *rows* are not compared; a pair of two
+    rows inside it is reported once.
+
+    Args:
+        data: (n × dim) float32 matrix of L2-normalized rows.
+        rows: Row indices into *data* (e.g. memories new since the last run).
+        threshold: Minimum cosine similarity.
+        tile: Tile side length for the blocked product.
+
+    Yields:
+        (i, j, similarity) with i < j, row indices into *data*.
+    """
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    rows = np.unique(np.asarray(rows, dtype=np.int64))
+    n = len(data)
+    if n < 2 or len(rows) == 0:
+        return
+
+    is_row = np.zeros(n, dtype=bool)
+    is_row[rows] = True
+    for a in range(0, len(rows), tile):
+        index_a = rows[a:a + tile]
+        block_a = data[index_a]
+        for b in range(0, n, tile):
+            sims = block_a @ data[b:b + tile].T
+            ii, jj = np.nonzero(sims >= threshold)
+            for i, j in zip(ii.tolist(), jj.tolist()):
+                p, q = int(index_a[i]), b + j
+                if p == q or (is_row[q] and q < p):  # self, or seen from q's side
+                    continue
+                yield (p, q, float(sims[i, j])) if p < q else (q, p, float(sims[i, j]))
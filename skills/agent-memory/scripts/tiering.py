@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+agent-memory / tiering.py
+==========================
+Hot/cold storage tiers.
+
+Soft-deleted and long-untouched memories used to share the ``memories``
+table (and its pages, indexes and embedding sidecar) with the working set.
+``reflect`` now moves them into a cold archive next to the main database:
+
+    <db>.cold.db    same schema as the hot DB (memories, edges, entities,
+                    FTS), so recall, timeline, export and stats read it
+                    with the same queries; created by the first archive
+
+A memory moves with its entities.  An edge lives in the cold tier as soon as
+either endpoint does, and returns to the hot tier once both endpoints are
+hot again.  Cold memories that were recalled within the inactivity window
+are restored to the hot tier by the next ``reflect``.
+
+Both directions run through one connection with the cold DB ATTACHed:
+rows are copied with ``INSERT OR IGNORE`` before the source rows are
+deleted, so an interrupted move is completed by the next run.  Hard deletes
+from the hot table make the embedding sidecar rebuild itself (and drop its
+ANN index) on the next refresh — see embedding_matrix.py.
+
+Recall searches the hot tier first and only consults the cold tier when
+the hot results look weak (``needs_cold``).
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from utils import (
+    db_file,
+    embedding_format,
+    embedding_model,
+    get_connection,
+    get_setting,
+    set_setting,
+)
+
+# Days without access after which reflect archives a memory.
+COLD_AFTER_DAYS: float = float(os.environ.get("AGENT_MEMORY_COLD_DAYS", "90"))
+
+# Recall consults the cold tier when the best hot cosine similarity is lower.
+COLD_MIN_SIMILARITY: float = float(os.environ.get("AGENT_MEMORY_COLD_MIN_SIM", "0.5"))
+
+_MEMORY_COLUMNS = ("id, content, embedding, created_at, last_accessed, "
+                   "access_count, importance, type, decayed")
+
+_MOVED = "(SELECT id FROM temp.tier_move)"
+
+
+def cold_path(db_path: str) -> str:
+    """Path of the cold archive for the hot database at *db_path*."""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.cold{ext or '.db'}"
+
+
+def open_cold(db_path: str, create: bool = False) -> Optional[sqlite3.Connection]:
+    """Connection to the cold archive of *db_path*, or None if there is none."""
+    path = cold_path(db_path)
+    if not create and not os.path.exists(path):
+        return None
+    return get_connection(path)
+
+
+def needs_cold(results: List[Dict[str, Any]], limit: int) -> bool:
+    """True if hot-tier *results* are weak enough to also search the cold tier.
+
+    That is fewer than *limit* results, or vector results whose best cosine
+    similarity is below COLD_MIN_SIMILARITY (keyword hits have no similarity
+    and count as confident).
+    """
+    if len(results) < limit:
+        return True
+    sims = [r["cosine_similarity"] for r in results if r.get("cosine_similarity") is not None]
+    return bool(sims) and max(sims) < COLD_MIN_SIMILARITY
+
+
+def _move(
+    conn: sqlite3.Connection, path: str, src: str, dst: str,
+    where: str, params: List[Any], edge_where: str,
+) -> Dict[str, int]:
+    """Move memories matching *where* (alias ``m`` on ``src``) to ``dst``.
+
+    ``src``/``dst`` are ``main`` or ``cold`` (the archive ATTACHed at *path*).
+    Edges matching *edge_where* (alias ``e`` on ``src``, evaluated after the
+    memories moved) go along.  Foreign keys are off during the move: edges
+    may point across tiers.
+    """
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys=OFF")
+    conn.execute("ATTACH DATABASE ? AS cold", (path,))
+    try:
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS tier_move (id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.tier_move")
+            conn.execute(f"INSERT INTO temp.tier_move SELECT m.id FROM {src}.memories m WHERE {where}",
+                         params)
+            moved = conn.execute("SELECT COUNT(*) FROM temp.tier_move").fetchone()[0]
+            if not moved:
+                return {"memories": 0, "edges": 0, "entities": 0}
+
+            conn.execute(
+                f"""INSERT OR IGNORE INTO {dst}.memories ({_MEMORY_COLUMNS})
+                    SELECT {_MEMORY_COLUMNS} FROM {src}.memories WHERE id IN {_MOVED}"""
+            )
+            entities = conn.execute(
+                f"""INSERT OR IGNORE INTO {dst}.memory_entities (memory_id, entity)
+                    SELECT memory_id, entity FROM {src}.memory_entities
+                    WHERE memory_id IN {_MOVED}"""
+            ).rowcount
+            conn.execute(f"DELETE FROM {src}.memory_entities WHERE memory_id IN {_MOVED}")
+            conn.execute(f"DELETE FROM {src}.memories WHERE id IN {_MOVED}")
+
+            conn.execute(
+                f"""INSERT OR IGNORE INTO {dst}.edges
+                        (id, source, target, relation, weight, created_at)
+                    SELECT id, source, target, relation, weight, created_at
+                    FROM {src}.edges e WHERE {edge_where}"""
+            )
+            edges = conn.execute(f"DELETE FROM {src}.edges AS e WHERE {edge_where}").rowcount
+            conn.execute("DELETE FROM temp.tier_move")
+        return {"memories": moved, "edges": edges, "entities": entities}
+    finally:
+        conn.execute("DETACH DATABASE cold")
+        conn.execute("PRAGMA foreign_keys=ON")
+
+
+def archive(conn: sqlite3.Connection, cutoff: float) -> Dict[str, int]:
+    """Move decayed memories and those not accessed since *cutoff* to the cold tier.
+
+    Args:
+        conn: Connection to the hot database (pending work is committed).
+        cutoff: Timestamp; memories with ``last_accessed`` before it move.
+
+    Returns:
+        Counts of memories, edges and entity rows moved.
+    """
+    path = cold_path(db_file(conn))
+    if not conn.execute(
+        "SELECT EXISTS(SELECT 1 FROM memories WHERE decayed = 1 OR last_accessed < ?)",
+        (cutoff,),
+    ).fetchone()[0]:
+        return {"memories": 0, "edges": 0, "entities": 0}
+    cold = open_cold(db_file(conn), create=True)
+    try:
+        if get_setting(cold, "embedding_format") is None:
+            set_setting(cold, "embedding_format", embedding_format(conn))
+        model = embedding_model(conn)
+        if model is not None and get_setting(cold, "embedding_model") is None:
+            set_setting(cold, "embedding_model", model)
+        cold.commit()
+    finally:
+        cold.close()
+    return _move(
+        conn, path, "main", "cold",
+        "m.decayed = 1 OR m.last_accessed < ?", [cutoff],
+        f"e.source IN {_MOVED} OR e.target IN {_MOVED}",
+    )
+
+
+def restore(conn: sqlite3.Connection, since: float) -> Dict[str, int]:
+    """Move cold memories accessed since *since* back to the hot tier.
+
+    Args:
+        conn: Connection to the hot database.
+        since: Timestamp; live cold memories with ``last_accessed`` at or
+            after it move (i.e. they were recalled from the cold tier).
+
+    Returns:
+        Counts of memories, edges and entity rows moved.
+    """
+    path = cold_path(db_file(conn))
+    if not os.path.exists(path):
+        return {"memories": 0, "edges": 0, "entities": 0}
+    return _move(
+        conn, path, "cold", "main",
+        "m.decayed = 0 AND m.last_accessed >= ?", [since],
+        f"""(e.source IN {_MOVED} OR e.target IN {_MOVED})
+            AND e.source NOT IN (SELECT id FROM cold.memories)
+            AND e.target NOT IN (SELECT id FROM cold.memories)""",
+    )
+
+
+def compact(conn: sqlite3.Connection, min_free: float = 0.25) -> bool:
+    """VACUUM the hot DB if at least *min_free* of its pages are free.
+
+    Archiving leaves the moved rows' pages on the freelist; compacting keeps
+    the hot working set in as few pages (and as little page cache) as
+    possible.  The WAL is checkpointed and truncated either way.
+
+    Returns:
+        True if the database was vacuumed.
+    """
+    conn.commit()
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    vacuum = pages > 0 and free >= min_free * pages
+    if vacuum:
+        conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return vacuum
+
+
+def _tier_stats(conn: sqlite3.Connection, path: str) -> Dict[str, Any]:
+    total, active = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(decayed = 0), 0) FROM memories"
+    ).fetchone()
+    size = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    return {
+        "memories": total,
+        "active": active,
+        "edges": conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0],
+        "size_bytes": size,
+        "path": path,
+    }
+
+
+def tier_stats(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Memory/edge counts and on-disk size (DB + WAL) of both tiers."""
+    path = db_file(conn)
+    stats = {"hot": _tier_stats(conn, path), "cold": None}  # type: Dict[str, Any]
+    cold = open_cold(path)
+    if cold is not None:
+        try:
+            stats["cold"] = _tier_stats(cold, cold_path(path))
+            oldest = cold.execute("SELECT MIN(last_accessed) FROM memories").fetchone()[0]
+            stats["cold"]["oldest_access_days"] = (
+                round((time.time() - oldest) / 86400, 1) if oldest else None
+            )
+        finally:
+            cold.close()
+    return stats
@@ -5,14 +5,16 @@ agent-memory / utils.py
 Shared utilities for the Hybrid Vector-Graph Memory System.
 
 Responsibilities:
-  - SQLite connection management with WAL mode
-  - Schema creation and migration
-  - Embedding generation with lazy-loaded sentence-transformers
+  - SQLite connection management with WAL mode and tuning profiles
+  - Versioned schema migrations (run once per database, not per connect)
+  - Embedding generation with lazy-loaded backends (embedding_backends.py)
+  - Content-addressed embedding cache (see embedding_cache.py)
   - Cosine similarity computation
   - Fallback keyword search when embeddings are unavailable
 
-The embedding model (all-MiniLM-L6-v2) is loaded ONCE per process and
-cached in a module-level singleton to avoid repeated 2-3s load times.
+Each embedding engine (ONNX or sentence-transformers MiniLM, hashed
+n-grams) is loaded ONCE per process and cached, to avoid repeated 2-3s
+load times.
 """
 
 from __future__ import annotations
@@ -21,20 +23,26 @@ import logging
 import os
 import re
 import sqlite3
-import struct
+import time
 import uuid
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
+from embedding_backends import BACKENDS, MINILM_MODEL, EmbeddingBackend, candidates
+from embedding_cache import EmbeddingCache, cache_key
+
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
 
 # 384 dimensions for all-MiniLM-L6-v2
 EMBEDDING_DIM: int = 384
-MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_NAME: str = MINILM_MODEL
+
+# Embedding engine: auto | onnx | sentence-transformers | hash (embedding_backends.py)
+EMBED_BACKEND: str = os.environ.get("AGENT_MEMORY_EMBED_BACKEND", "auto").strip().lower() or "auto"
 
 # Default DB location — resolved relative to the workspace root.
 # Script is at: skills/agent-memory/scripts/utils.py
@@ -47,77 +55,285 @@ _DEFAULT_DB_DIR = os.environ.get(
 )
 DEFAULT_DB_PATH: str = os.path.join(_DEFAULT_DB_DIR, "agent_memory.db")
 
+# Unix socket of the resident server (scripts/server.py).
+DEFAULT_SOCKET_PATH: str = os.environ.get(
+    "AGENT_MEMORY_SOCKET",
+    os.path.join(_DEFAULT_DB_DIR, "agent_memory.sock"),
+)
+
+# Embedding cache shared by all processes; AGENT_MEMORY_EMBED_CACHE=off disables it.
+EMBED_CACHE_PATH: str = os.environ.get(
+    "AGENT_MEMORY_EMBED_CACHE",
+    os.path.join(_DEFAULT_DB_DIR, "embedding_cache.db"),
+)
+
+# SQLite tuning applied to every connection (AGENT_MEMORY_SQLITE_PROFILE).
+#   throughput  synchronous=NORMAL: in WAL mode commits skip the fsync (a power
+#               loss can drop the last transactions, never corrupts the DB);
+#               64 MB page cache, 256 MB memory-mapped reads, in-memory temp
+#   durable     synchronous=FULL: every commit is fsynced; SQLite's default
+#               page cache, no mmap
+SQLITE_PROFILES = {
+    "throughput": {
+        "synchronous": "NORMAL",
+        "cache_size": -65536,  # KiB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "durable": {
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+}  # type: Dict[str, Dict[str, object]]
+SQLITE_PROFILE: str = os.environ.get("AGENT_MEMORY_SQLITE_PROFILE", "throughput").strip().lower()
+
 logger = logging.getLogger("agent-memory")
 
 # ---------------------------------------------------------------------------
-# Embedding model singleton (lazy-loaded)
+# Embedding backends (lazy-loaded, one instance per engine)
 # ---------------------------------------------------------------------------
 
+# Test/benchmark hook: an object with a SentenceTransformer-style ``encode``
+# that replaces every backend when set.
 _model_instance = None  # type: ignore
-_model_load_failed: bool = False
+_backends = {}  # type: Dict[str, Optional[EmbeddingBackend]]
+
+
+def get_backend(name: str) -> Optional[EmbeddingBackend]:
+    """Return the loaded backend *name*, loading it on first call.
+
+    Imports are deferred so that CLI commands that don't need embeddings
+    (e.g. ``stats``, ``--help``) start instantly.  A failed load is
+    remembered and not retried in this process.
+    """
+    if name not in _backends:
+        backend = BACKENDS[name]()
+        try:
+            backend.load()
+            logger.info("Loaded embedding backend: %s (%s)", name, backend.model)
+        except Exception as exc:
+            logger.warning("Failed to load embedding backend %s: %s", name, exc)
+            backend = None
+        _backends[name] = backend
+    return _backends[name]
 
 
-def _get_model():
-    """Return the cached SentenceTransformer model, loading it on first call.
+def loaded_backends() -> List[str]:
+    """Names of the embedding backends loaded in this process."""
+    return [name for name, backend in _backends.items() if backend is not None]
 
-    The import is deferred so that CLI commands that don't need embeddings
-    (e.g. ``stats``, ``--help``) start instantly.
+
+def _get_model(model: Optional[str] = None):
+    """Return an encoder for vectors in *model*'s space (None: a new store).
+
+    Tries the engines from ``candidates(EMBED_BACKEND, model)`` in order.
 
     Returns:
-        SentenceTransformer model instance, or None if loading failed.
+        Loaded EmbeddingBackend, or None if no matching engine loads —
+        callers then fall back to keyword search.
     """
-    global _model_instance, _model_load_failed
     if _model_instance is not None:
         return _model_instance
-    if _model_load_failed:
-        return None
-    try:
-        from sentence_transformers import SentenceTransformer  # lazy import
-        _model_instance = SentenceTransformer(MODEL_NAME)
-        logger.info("Loaded embedding model: %s", MODEL_NAME)
-        return _model_instance
-    except Exception as exc:
-        _model_load_failed = True
-        logger.warning(
-            "Failed to load embedding model (%s). "
-            "Falling back to keyword search. Error: %s",
-            MODEL_NAME, exc,
-        )
-        return None
+    if EMBED_BACKEND in BACKENDS and model is not None and BACKENDS[EMBED_BACKEND].model != model:
+        logger.warning("Store holds %s vectors; ignoring AGENT_MEMORY_EMBED_BACKEND=%s "
+                       "(use 'memory.py reembed' to switch).", model, EMBED_BACKEND)
+    for name in candidates(EMBED_BACKEND, model):
+        backend = get_backend(name)
+        if backend is not None:
+            return backend
+    if model is None:
+        logger.warning("No MiniLM embedding backend installed; falling back to keyword "
+                       "search. Install onnxruntime + tokenizers or sentence-transformers, "
+                       "or set AGENT_MEMORY_EMBED_BACKEND=hash to store hashed vectors.")
+    else:
+        logger.warning("No embedding backend available for %s; falling back to keyword search. "
+                       "Install onnxruntime + tokenizers or sentence-transformers, "
+                       "or switch the store with 'memory.py reembed --backend hash'.", model)
+    return None
+
+
+def embedding_model(conn: sqlite3.Connection) -> Optional[str]:
+    """Vector space of the embeddings stored in this database.
+
+    Stores written before backends were tagged hold MiniLM vectors; a store
+    without any embedding has no space yet (None).
+    """
+    model = get_setting(conn, "embedding_model")
+    if model is None and conn.execute(
+        "SELECT 1 FROM memories WHERE embedding IS NOT NULL LIMIT 1"
+    ).fetchone():
+        model = MODEL_NAME
+    return model
+
+
+def backend_for(conn: sqlite3.Connection):
+    """Encoder to use for this database, tagging the DB with its space.
+
+    The first time a store gets an engine, its ``embedding_model`` setting
+    is written (committed unless the caller has a transaction open), so
+    later processes pick an engine of the same space.
+    """
+    model = embedding_model(conn)
+    backend = _get_model(model)
+    if backend is not None and get_setting(conn, "embedding_model") is None:
+        owned = not conn.in_transaction
+        set_setting(conn, "embedding_model", getattr(backend, "model", None) or model or MODEL_NAME)
+        if owned:
+            conn.commit()
+    return backend
 
 
 # ---------------------------------------------------------------------------
 # Embedding helpers
 # ---------------------------------------------------------------------------
 
-def generate_embedding(text: str) -> Optional[np.ndarray]:
+_cache_instance = None  # type: Optional[EmbeddingCache]
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, or None if disabled."""
+    global _cache_instance
+    if EMBED_CACHE_PATH.lower() in ("", "off", "0", "none"):
+        return None
+    if _cache_instance is None:
+        _cache_instance = EmbeddingCache(EMBED_CACHE_PATH)
+    return _cache_instance
+
+
+def generate_embedding(
+    text: str, conn: Optional[sqlite3.Connection] = None,
+) -> Optional[np.ndarray]:
     """Encode *text* into a 384-dim float32 vector.
 
+    Served from the embedding cache when the same (normalized) text was
+    embedded before — without loading the model at all.
+
     Args:
         text: The string to embed.
+        conn: Database the vector is for; its embedding_model picks the
+            engine (see :func:`generate_embeddings`).
 
     Returns:
         numpy float32 array of shape (384,), or None if the model is
         unavailable.
     """
-    model = _get_model()
-    if model is None:
-        return None
-    vec = model.encode(text, convert_to_numpy=True, normalize_embeddings=True)
-    return vec.astype(np.float32)
+    vecs = generate_embeddings([text], conn=conn)
+    return None if vecs is None else vecs[0]
+
 
+def generate_embeddings(
+    texts: List[str], batch_size: int = 64, conn: Optional[sqlite3.Connection] = None,
+) -> Optional[np.ndarray]:
+    """Encode many strings in one model call.
 
-def embedding_to_blob(vec: np.ndarray) -> bytes:
-    """Serialize a numpy float32 vector to bytes for SQLite BLOB storage.
+    Cached texts are looked up first; only the misses go through the model,
+    batched (SentenceTransformer batches internally, which is several times
+    faster than calling the model per string), and are then cached.  Cache
+    keys include the vector space, so engines never share entries.
+
+    Args:
+        texts: Strings to embed.
+        batch_size: Forward-pass batch size handed to the model.
+        conn: Database the vectors are for.  Its ``embedding_model`` decides
+            the space (a store without one is tagged with the engine
+            chosen now); without *conn* the preferred engine is used.
 
-    Uses raw float32 little-endian packing — compact (384 × 4 = 1536 bytes)
-    and fast to deserialize.
+    Returns:
+        float32 array of shape (len(texts), 384), or None if the model is
+        unavailable.
+    """
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+    encoder = None
+    model = embedding_model(conn) if conn is not None else None
+    if model is None:  # new store: choose (and record) the engine up front
+        encoder = backend_for(conn) if conn is not None else _get_model()
+        if encoder is None:
+            return None
+        model = getattr(encoder, "model", None) or MODEL_NAME
+
+    cache = get_embedding_cache()
+    keys = [cache_key(t, model) for t in texts]
+    found = cache.get_many(keys) if cache is not None else {}
+
+    todo = [i for i, k in enumerate(keys) if k not in found]
+    computed = {}  # type: dict
+    if todo:
+        encoder = encoder or _get_model(model)
+        if encoder is None:
+            return None
+        vecs = encoder.encode([texts[i] for i in todo], batch_size=batch_size,
+                              convert_to_numpy=True, normalize_embeddings=True)
+        vecs = np.asarray(vecs, dtype=np.float32).reshape(len(todo), -1)
+        for row, i in enumerate(todo):
+            computed[keys[i]] = vecs[row]
+        if cache is not None:
+            cache.put_many(computed, model)
+
+    return np.stack([found[k] if k in found else computed[k] for k in keys]).astype(np.float32)
+
+
+# Stored embedding formats.  Blobs are self-describing by length:
+#   float32  384 × 4 = 1536 bytes
+#   float16  384 × 2 =  768 bytes
+#   int8     4-byte float32 scale + 384 codes = 388 bytes
+EMBEDDING_FORMATS: Tuple[str, ...] = ("float32", "float16", "int8")
+
+
+def blob_width(fmt: str, dim: int = EMBEDDING_DIM) -> int:
+    """Byte length of one stored embedding in format *fmt*."""
+    return {"float32": dim * 4, "float16": dim * 2, "int8": dim + 4}[fmt]
+
+
+def blob_format(blob: bytes, dim: int = EMBEDDING_DIM) -> Optional[str]:
+    """Infer the storage format of *blob* from its length (None if unknown)."""
+    for fmt in EMBEDDING_FORMATS:
+        if len(blob) == blob_width(fmt, dim):
+            return fmt
+    return None
+
+
+def quantize(data: np.ndarray, fmt: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Encode rows of *data* as (codes, per-row scales).
+
+    int8 uses a symmetric per-vector scale (max |x| / 127); float formats
+    have no scales.
     """
-    return vec.astype(np.float32).tobytes()
+    data = np.asarray(data, dtype=np.float32)
+    if fmt == "float16":
+        return data.astype(np.float16), None
+    if fmt == "int8":
+        scales = (np.max(np.abs(data), axis=-1) / 127.0).astype(np.float32)
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(data / scales[..., None]), -127, 127).astype(np.int8)
+        return codes, scales
+    return data, None
+
+
+def embedding_to_blob(vec: np.ndarray, fmt: str = "float32") -> bytes:
+    """Serialize an embedding to bytes for SQLite BLOB storage.
+
+    float32 (the default) is raw little-endian packing — 1536 bytes and fast
+    to deserialize.  float16 halves that; int8 stores a float32 scale
+    followed by 384 signed codes (~4× smaller).
+    """
+    codes, scales = quantize(vec[None, :], fmt)
+    if scales is not None:
+        return scales[0].tobytes() + codes[0].tobytes()
+    return codes[0].tobytes()
 
 
 def blob_to_embedding(blob: bytes) -> np.ndarray:
-    """Deserialize a BLOB back to a numpy float32 vector."""
+    """Deserialize a BLOB (any stored format) back to a float32 vector."""
+    fmt = blob_format(blob)
+    if fmt == "float16":
+        return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+    if fmt == "int8":
+        scale = np.frombuffer(blob[:4], dtype=np.float32)[0]
+        return np.frombuffer(blob[4:], dtype=np.int8).astype(np.float32) * scale
     return np.frombuffer(blob, dtype=np.float32).copy()
 
 
@@ -229,24 +445,79 @@ CREATE TABLE IF NOT EXISTS edges (
     created_at  REAL NOT NULL
 );
 
+-- Entities extracted at write time (lowercased) for entity-first lookups
+CREATE TABLE IF NOT EXISTS memory_entities (
+    memory_id   TEXT NOT NULL REFERENCES memories(id) ON DELETE CASCADE,
+    entity      TEXT NOT NULL,
+    PRIMARY KEY (memory_id, entity)
+) WITHOUT ROWID;
+
+-- Per-database settings (e.g. embedding_format)
+CREATE TABLE IF NOT EXISTS settings (
+    key     TEXT PRIMARY KEY,
+    value   TEXT NOT NULL
+);
+
 -- Indexes for common query patterns
 CREATE INDEX IF NOT EXISTS idx_memories_type      ON memories(type);
 CREATE INDEX IF NOT EXISTS idx_memories_importance ON memories(importance);
 CREATE INDEX IF NOT EXISTS idx_memories_decayed    ON memories(decayed);
 CREATE INDEX IF NOT EXISTS idx_memories_last_accessed ON memories(last_accessed);
+CREATE INDEX IF NOT EXISTS idx_memories_created_at ON memories(created_at);
 CREATE INDEX IF NOT EXISTS idx_edges_source        ON edges(source);
 CREATE INDEX IF NOT EXISTS idx_edges_target        ON edges(target);
+CREATE INDEX IF NOT EXISTS idx_memory_entities_entity ON memory_entities(entity);
+
+-- Edge change counter: the in-memory adjacency (graph_index.py) reloads
+-- when settings.edges_version moves
+CREATE TRIGGER IF NOT EXISTS edges_version_ai AFTER INSERT ON edges BEGIN
+    INSERT INTO settings (key, value) VALUES ('edges_version', '1')
+    ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS edges_version_ad AFTER DELETE ON edges BEGIN
+    INSERT INTO settings (key, value) VALUES ('edges_version', '1')
+    ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS edges_version_au AFTER UPDATE ON edges BEGIN
+    INSERT INTO settings (key, value) VALUES ('edges_version', '1')
+    ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1;
+END;
+"""
+
+# Full-text index mirrored from memories.content by triggers.  Kept separate
+# from _SCHEMA_SQL because some SQLite builds ship without FTS5; keyword
+# recall then falls back to LIKE.
+_FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+    content, content='memories', content_rowid='rowid'
+);
+
+CREATE TRIGGER IF NOT EXISTS memories_fts_ai AFTER INSERT ON memories BEGIN
+    INSERT INTO memories_fts(rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS memories_fts_ad AFTER DELETE ON memories BEGIN
+    INSERT INTO memories_fts(memories_fts, rowid, content)
+    VALUES ('delete', old.rowid, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS memories_fts_au AFTER UPDATE OF content ON memories BEGIN
+    INSERT INTO memories_fts(memories_fts, rowid, content)
+    VALUES ('delete', old.rowid, old.content);
+    INSERT INTO memories_fts(rowid, content) VALUES (new.rowid, new.content);
+END;
 """
 
 
-def get_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
+def get_connection(db_path: Optional[str] = None, profile: Optional[str] = None) -> sqlite3.Connection:
     """Open (or create) the SQLite database and ensure the schema exists.
 
     Enables WAL mode for concurrent read/write safety and sets a 5-second
-    busy timeout so parallel CLI calls don't immediately fail.
+    busy timeout so parallel CLI calls don't immediately fail.  Pending
+    migrations run once per database (see :func:`migrate`); an up-to-date
+    database costs one version lookup.
 
     Args:
         db_path: Path to the SQLite file.  Falls back to DEFAULT_DB_PATH.
+        profile: Key of SQLITE_PROFILES; defaults to SQLITE_PROFILE.
 
     Returns:
         sqlite3.Connection with row_factory = sqlite3.Row.
@@ -258,6 +529,173 @@ def get_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA foreign_keys=ON;")
+    apply_profile(conn, profile)
+    if schema_version(conn) < SCHEMA_VERSION:
+        migrate(conn)
+    return conn
+
+
+def apply_profile(conn: sqlite3.Connection, profile: Optional[str] = None) -> None:
+    """Set the per-connection PRAGMAs of a tuning profile (SQLITE_PROFILES)."""
+    name = profile or SQLITE_PROFILE
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile: {name} "
+                         f"(choose from {', '.join(SQLITE_PROFILES)})")
+    for pragma, value in SQLITE_PROFILES[name].items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+
+
+# ---------------------------------------------------------------------------
+# Schema migrations
+# ---------------------------------------------------------------------------
+
+def _migrate_core(conn: sqlite3.Connection) -> None:
+    """Tables, indexes and triggers; entity backfill for pre-entity stores."""
+    had_entities = _has_table(conn, "memory_entities")
     conn.executescript(_SCHEMA_SQL)
+    if not had_entities and _has_table(conn, "memories"):
+        _backfill_entities(conn)
+
+
+def _migrate_fts(conn: sqlite3.Connection) -> None:
+    """FTS5 index over memories.content, built from existing rows."""
+    if _has_table(conn, "memories_fts"):
+        return
+    try:
+        conn.executescript(_FTS_SQL)
+        conn.execute("INSERT INTO memories_fts(memories_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError as exc:  # SQLite built without FTS5
+        logger.warning("FTS5 unavailable, keyword recall uses LIKE: %s", exc)
+
+
+# Row change counter: an update of the fields the embedding matrix keeps in
+# memory stamps the row with the next settings.memories_version, so a
+# resident matrix re-reads only rows stamped after its last load.
+_CHANGES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_memories_changed ON memories(changed);
+
+CREATE TRIGGER IF NOT EXISTS memories_changed_au
+AFTER UPDATE OF importance, last_accessed, decayed ON memories BEGIN
+    INSERT INTO settings (key, value) VALUES ('memories_version', '1')
+    ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1;
+    UPDATE memories SET changed =
+        (SELECT CAST(value AS INTEGER) FROM settings WHERE key = 'memories_version')
+    WHERE rowid = new.rowid;
+END;
+
+-- Deletion counter: the sidecar (embedding_matrix.py) is rebuilt when it moves
+CREATE TRIGGER IF NOT EXISTS memories_deleted_ad AFTER DELETE ON memories BEGIN
+    INSERT INTO settings (key, value) VALUES ('memories_deleted', '1')
+    ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1;
+END;
+"""
+
+
+def _migrate_changes(conn: sqlite3.Connection) -> None:
+    """memories.changed column, the trigger that stamps it, the deletion counter."""
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(memories)")}
+    if "changed" not in columns:
+        conn.execute("ALTER TABLE memories ADD COLUMN changed INTEGER NOT NULL DEFAULT 0")
+    conn.executescript(_CHANGES_SQL)
+
+
+# Append-only: (version, step).  Steps are idempotent, so two processes
+# migrating the same new database at once do redundant work, not damage.
+# Databases created before versioning start at 0 and run every step.
+_MIGRATIONS = (
+    (1, _migrate_core),
+    (2, _migrate_fts),
+    (3, _migrate_changes),
+)
+SCHEMA_VERSION: int = _MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """Highest migration applied to this database (0 if none recorded)."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    except sqlite3.OperationalError:  # table not created yet
+        return 0
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    """Apply pending migrations in order, recording each in schema_migrations.
+
+    Returns:
+        Versions applied by this call.
+    """
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS schema_migrations (
+               version     INTEGER PRIMARY KEY,
+               applied_at  REAL NOT NULL
+           )"""
+    )
     conn.commit()
-    return conn
+    current = schema_version(conn)
+    applied = []  # type: List[int]
+    for version, step in _MIGRATIONS:
+        if version <= current:
+            continue
+        step(conn)
+        conn.execute(
+            "INSERT OR IGNORE INTO schema_migrations (version, applied_at) VALUES (?, ?)",
+            (version, time.time()),
+        )
+        conn.commit()
+        applied.append(version)
+    if applied:
+        logger.info("Migrated %s to schema version %d", db_file(conn) or "database", SCHEMA_VERSION)
+    return applied
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def fts_available(conn: sqlite3.Connection) -> bool:
+    """True if the memories_fts full-text index exists in this database."""
+    return _has_table(conn, "memories_fts")
+
+
+def _backfill_entities(conn: sqlite3.Connection) -> None:
+    """Populate memory_entities for memories stored before the table existed."""
+    cursor = conn.execute("SELECT id, content FROM memories")
+    while True:
+        rows = cursor.fetchmany(1000)
+        if not rows:
+            break
+        conn.executemany(
+            "INSERT OR IGNORE INTO memory_entities (memory_id, entity) VALUES (?, ?)",
+            [(row[0], e.lower()) for row in rows for e in extract_entities(row[1])],
+        )
+
+
+def get_setting(conn: sqlite3.Connection, key: str, default: Optional[str] = None) -> Optional[str]:
+    """Read a per-database setting, or *default* if unset."""
+    try:
+        row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+    except sqlite3.OperationalError:  # opened without get_connection's schema
+        return default
+    return row[0] if row else default
+
+
+def set_setting(conn: sqlite3.Connection, key: str, value: str) -> None:
+    """Write a per-database setting (caller commits)."""
+    conn.execute(
+        "INSERT INTO settings (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+
+
+def embedding_format(conn: sqlite3.Connection) -> str:
+    """Storage format for new embeddings in this database (see ``quantize``)."""
+    return get_setting(conn, "embedding_format", "float32")
+
+
+def db_file(conn: sqlite3.Connection) -> str:
+    """Return the filesystem path of the main database behind *conn*."""
+    return conn.execute("PRAGMA database_list").fetchone()[2]
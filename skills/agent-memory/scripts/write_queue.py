@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+agent-memory / write_queue.py
+==============================
+Single-writer queue with group commit for remember / relate / forget.
+
+Every ``remember`` used to open its own connection, embed one text, take
+the SQLite write lock and commit (an fsync), then append one row to the
+embedding sidecar.  With many agents writing at once they mostly wait on
+each other in SQLite's busy handler.
+
+A :class:`WriteCoordinator` owns the only writing connection for one
+database.  Callers on any thread enqueue operations and block on a
+future; one writer thread drains whatever has queued up (at most
+``WRITE_BATCH`` ops) and applies it as a group:
+
+    1. embed all remembered texts with one model call
+    2. BEGIN, then apply each op inside a SAVEPOINT nested in that
+       transaction, so a rejected op (unknown id, empty text) does not
+       undo the others
+    3. one COMMIT for the group — if the group fails as a whole, nothing
+       of it was committed and every caller gets the error
+    4. one embedding-matrix sync, one ANN removal per tier
+
+While a group is being written the next one accumulates, so the group
+size adapts to the load without adding latency when writes are sparse.
+Ops are applied in submission order: a ``relate`` may refer to a memory
+remembered earlier in the same group.
+
+Used by the resident server for the ``remember``, ``relate`` and
+``forget`` commands, and as a library::
+
+    from write_queue import get_writer
+    result = get_writer(db_path).remember("Deploy moved to Fridays")
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import DEFAULT_DB_PATH, generate_embeddings, get_connection, logger
+
+import memory
+from embedding_matrix import get_matrix
+
+# Maximum operations applied in one transaction.
+WRITE_BATCH: int = int(os.environ.get("AGENT_MEMORY_WRITE_BATCH", "256"))
+
+# memory.py subcommands the server routes through the coordinator.
+WRITE_COMMANDS = ("remember", "relate", "forget")
+
+_STOP = object()
+
+
+class _Op:
+    """One queued write and the future its caller waits on."""
+
+    __slots__ = ("kind", "params", "future")
+
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        self.kind = kind
+        self.params = params
+        self.future = Future()  # type: Future
+
+
+class WriteCoordinator:
+    """Serializes and group-commits the writes to one database."""
+
+    def __init__(self, db_path: str, max_batch: int = WRITE_BATCH):
+        self.db_path = db_path
+        self.max_batch = max(max_batch, 1)
+        self._queue = queue.Queue()  # type: queue.Queue
+        self._thread = None  # type: Optional[threading.Thread]
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self.groups = 0
+        self.ops = 0
+
+    # ------------------------------------------------------------------
+    # Caller side
+    # ------------------------------------------------------------------
+
+    def submit(self, kind: str, **params: Any) -> Future:
+        """Queue one write; the future resolves to its result dict.
+
+        Args:
+            kind: ``remember`` (text, importance, memory_type), ``relate``
+                (source, target, relation, weight) or ``forget`` (memory_id).
+
+        Returns:
+            Future whose result is what the memory.py command would print,
+            or whose exception is a :class:`memory.WriteError`.
+        """
+        if kind not in WRITE_COMMANDS:
+            raise ValueError(f"Unknown write operation: {kind}")
+        op = _Op(kind, params)
+        with self._start_lock:
+            if self._closed:
+                raise RuntimeError(f"Write coordinator for {self.db_path} is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="agent-memory-writer", daemon=True,
+                )
+                self._thread.start()
+            self._queue.put(op)
+        return op.future
+
+    def remember(
+        self, text: str, importance: Optional[float] = None,
+        memory_type: str = "episodic", timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Store a memory; blocks until its group is committed."""
+        return self.submit("remember", text=text, importance=importance,
+                           memory_type=memory_type).result(timeout)
+
+    def relate(
+        self, source: str, target: str, relation: str = "relates_to",
+        weight: float = 1.0, timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Create an explicit edge; blocks until its group is committed."""
+        return self.submit("relate", source=source, target=target, relation=relation,
+                           weight=weight).result(timeout)
+
+    def forget(self, memory_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Soft-delete a memory; blocks until its group is committed."""
+        return self.submit("forget", memory_id=memory_id).result(timeout)
+
+    def close(self) -> None:
+        """Apply everything queued so far, then stop the writer thread."""
+        with self._start_lock:
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "db": self.db_path,
+            "groups": self.groups,
+            "ops": self.ops,
+            "queued": self._queue.qsize(),
+        }
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        conn = None
+        try:
+            stop = False
+            while not stop:
+                group = []  # type: List[_Op]
+                item = self._queue.get()
+                while True:
+                    if item is _STOP:
+                        stop = True
+                    else:
+                        group.append(item)
+                    if stop or len(group) >= self.max_batch:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if not group:
+                    continue
+                try:
+                    conn = conn or get_connection(self.db_path)
+                except Exception as exc:  # e.g. unwritable path; retried next group
+                    for op in group:
+                        op.future.set_exception(exc)
+                    continue
+                self._apply(conn, group)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _apply(self, conn, group: List[_Op]) -> None:
+        """Write one group in a single transaction and resolve its futures."""
+        now = time.time()
+        results = []  # type: List[Tuple[_Op, Any, Optional[BaseException]]]
+        decayed = {}  # type: Dict[str, List[int]]
+        try:
+            embeddings = self._embed(conn, group)
+            # Without an open transaction each SAVEPOINT would start its own
+            # and RELEASE would commit it.  IMMEDIATE takes the write lock now
+            # rather than upgrading a read lock mid-group.
+            conn.execute("BEGIN IMMEDIATE")
+            for op in group:
+                conn.execute("SAVEPOINT write_op")
+                try:
+                    if op.kind == "remember":
+                        result = memory._insert_memory(
+                            conn, op.params.get("text") or "", op.params.get("importance"),
+                            op.params.get("memory_type"), embeddings.get(id(op)), now,
+                        )
+                    elif op.kind == "relate":
+                        result = memory._insert_edge(
+                            conn, op.params["source"], op.params["target"],
+                            op.params.get("relation"), op.params.get("weight"), now,
+                        )
+                    else:
+                        result, tier_path, rowid = memory._decay_memory(conn, op.params["memory_id"])
+                        decayed.setdefault(tier_path, []).append(rowid)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO write_op")
+                    conn.execute("RELEASE write_op")
+                    results.append((op, None, exc))
+                    continue
+                conn.execute("RELEASE write_op")
+                results.append((op, result, None))
+            conn.commit()
+        except BaseException as exc:
+            conn.rollback()
+            logger.exception("Write group of %d failed", len(group))
+            for op in group:
+                op.future.set_exception(exc)
+            return
+
+        self.groups += 1
+        self.ops += len(group)
+        try:
+            engine = get_matrix(self.db_path)
+            if embeddings:
+                engine.sync()  # append the group to matrix + ANN index
+            for tier_path, rowids in decayed.items():
+                get_matrix(tier_path).forget(rowids)  # drop from ANN lists
+        except Exception:  # committed; the next refresh catches up
+            logger.exception("Embedding matrix update after a write group failed")
+
+        for op, result, exc in results:
+            if exc is None:
+                op.future.set_result(result)
+            else:
+                op.future.set_exception(exc)
+
+    def _embed(self, conn, group: List[_Op]) -> Dict[int, Any]:
+        """Embed the group's remembered texts with one model call.
+
+        Returns:
+            Vector per op (keyed by ``id(op)``); empty if the model is
+            unavailable (memories are then stored without embedding).
+        """
+        todo = [op for op in group
+                if op.kind == "remember" and (op.params.get("text") or "").strip()]
+        if not todo:
+            return {}
+        vecs = generate_embeddings([op.params["text"] for op in todo], conn=conn)
+        if vecs is None:
+            return {}
+        return {id(op): vec for op, vec in zip(todo, vecs)}
+
+
+# ---------------------------------------------------------------------------
+# Per-process cache
+# ---------------------------------------------------------------------------
+
+_WRITERS = {}  # type: Dict[str, WriteCoordinator]
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_writer(db_path: Optional[str] = None) -> WriteCoordinator:
+    """Return the cached write coordinator for *db_path* (default store)."""
+    key = os.path.realpath(db_path or DEFAULT_DB_PATH)
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = WriteCoordinator(key)
+            _WRITERS[key] = writer
+        return writer
+
+
+def writers() -> List[WriteCoordinator]:
+    """Coordinators created by this process."""
+    with _WRITERS_LOCK:
+        return list(_WRITERS.values())
+
+
+def close_all() -> None:
+    """Drain and stop every coordinator of this process (e.g. on server exit)."""
+    with _WRITERS_LOCK:
+        writers = list(_WRITERS.values())
+        _WRITERS.clear()
+    for writer in writers:
+        writer.close()
@@ -0,0 +1,98 @@
+"""
+Tests for scripts/embedding_matrix.py — incremental refresh of the live arrays.
+
+Run with:  python -m pytest skills/agent-memory/tests/test_embedding_matrix.py -v
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+# Engine and cache are chosen at import time: hashed vectors, no shared cache
+os.environ.setdefault("AGENT_MEMORY_EMBED_BACKEND", "hash")
+os.environ.setdefault("AGENT_MEMORY_EMBED_CACHE", "off")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from embedding_matrix import EmbeddingMatrix  # noqa: E402
+from utils import embedding_to_blob, generate_embeddings, get_connection  # noqa: E402
+
+_LIVE = ("live_pos", "live_rowids", "importance", "last_accessed")
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = get_connection(str(tmp_path / "memory.db"))
+    yield conn
+    conn.close()
+
+
+def _add(conn, texts, embed=True):
+    now = time.time()
+    vecs = generate_embeddings(texts, conn=conn)
+    conn.executemany(
+        """INSERT INTO memories (id, content, embedding, created_at, last_accessed)
+           VALUES (?, ?, ?, ?, ?)""",
+        [(t, t, embedding_to_blob(v) if embed else None, now, now) for t, v in zip(texts, vecs)],
+    )
+    conn.commit()
+
+
+def _refresh(matrix):
+    with matrix._mutex:
+        matrix.refresh()
+
+
+def _assert_matches_full_load(matrix, path):
+    fresh = EmbeddingMatrix(path)
+    _refresh(fresh)
+    for name in _LIVE:
+        np.testing.assert_array_equal(getattr(matrix, name), getattr(fresh, name), err_msg=name)
+
+
+def test_refresh_applies_only_changed_rows(conn):
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    _add(conn, [f"note {i}" for i in range(20)])
+    matrix = EmbeddingMatrix(path)
+    _refresh(matrix)
+    epoch = matrix.epoch
+
+    statements = []
+    matrix._conn.set_trace_callback(statements.append)
+    conn.execute("UPDATE memories SET importance = 0.9 WHERE content = 'note 3'")
+    conn.execute("UPDATE memories SET decayed = 1 WHERE content = 'note 7'")
+    conn.commit()
+    _refresh(matrix)
+    matrix._conn.set_trace_callback(None)
+
+    assert not any("WHERE decayed = 0" in sql for sql in statements), "no full reload"
+    assert matrix.epoch == epoch
+    assert len(matrix.live_rowids) == 19
+    _assert_matches_full_load(matrix, path)
+
+    conn.execute("UPDATE memories SET decayed = 0 WHERE content = 'note 7'")
+    conn.execute("UPDATE memories SET last_accessed = 1.0 WHERE content = 'note 5'")
+    conn.commit()
+    _add(conn, ["late note"])
+    _add(conn, ["no vector"], embed=False)
+    _refresh(matrix)
+    assert len(matrix.live_rowids) == 21
+    _assert_matches_full_load(matrix, path)
+
+
+def test_deletion_rebuilds_and_reloads(conn):
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    _add(conn, [f"note {i}" for i in range(10)])
+    matrix = EmbeddingMatrix(path)
+    _refresh(matrix)
+    epoch = matrix.epoch
+
+    conn.execute("DELETE FROM memories WHERE content = 'note 2'")
+    conn.commit()
+    _refresh(matrix)
+
+    assert matrix.epoch != epoch
+    assert len(matrix.matrix) == 9
+    _assert_matches_full_load(matrix, path)
@@ -0,0 +1,102 @@
+"""
+Tests for scripts/write_queue.py — group commit of queued writes.
+
+Run with:  python -m pytest skills/agent-memory/tests/test_write_queue.py -v
+"""
+
+import os
+import sys
+
+import pytest
+
+# Engine and cache are chosen at import time: hashed vectors, no shared cache
+os.environ.setdefault("AGENT_MEMORY_EMBED_BACKEND", "hash")
+os.environ.setdefault("AGENT_MEMORY_EMBED_CACHE", "off")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import memory  # noqa: E402
+from utils import get_connection  # noqa: E402
+from write_queue import WriteCoordinator, _Op  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "memory.db")
+    get_connection(path).close()  # create the schema
+    return path
+
+
+def _contents(path):
+    conn = get_connection(path)
+    try:
+        return sorted(r[0] for r in conn.execute("SELECT content FROM memories"))
+    finally:
+        conn.close()
+
+
+def _apply(db, group):
+    """Apply *group* on a traced connection; return the SQL it ran.
+
+    Statements before the group's BEGIN (tagging a new store with its
+    embedding model) are not part of the group and are dropped.
+    """
+    statements = []
+    conn = get_connection(db)
+    conn.set_trace_callback(statements.append)
+    try:
+        WriteCoordinator(db)._apply(conn, group)
+    finally:
+        conn.close()
+    begins = [i for i, sql in enumerate(statements) if sql.startswith("BEGIN IMMEDIATE")]
+    assert begins, "the group must run in one explicit transaction"
+    return statements[begins[0]:]
+
+
+def test_rejected_op_keeps_the_rest_of_the_group(db):
+    group = [
+        _Op("remember", {"text": "first note", "importance": 0.5, "memory_type": "episodic"}),
+        _Op("remember", {"text": "second note", "importance": 0.5, "memory_type": "episodic"}),
+        _Op("relate", {"source": "no-such-id", "target": "other-id"}),
+        _Op("remember", {"text": "third note", "importance": 0.5, "memory_type": "episodic"}),
+    ]
+    statements = _apply(db, group)
+
+    # Savepoints nest in the group's transaction: one COMMIT for the group
+    assert [sql for sql in statements if sql == "COMMIT"] == ["COMMIT"]
+    assert _contents(db) == ["first note", "second note", "third note"]
+    assert group[0].future.result()["status"] == "stored"
+    with pytest.raises(memory.WriteError):
+        group[2].future.result()
+
+
+def test_failed_group_commits_nothing(db, monkeypatch):
+    class Crash(BaseException):
+        pass
+
+    def crash(*args, **kwargs):
+        raise Crash()
+
+    monkeypatch.setattr(memory, "_insert_edge", crash)
+    group = [
+        _Op("remember", {"text": "before the crash", "importance": 0.5, "memory_type": "episodic"}),
+        _Op("relate", {"source": "a", "target": "b"}),
+    ]
+    _apply(db, group)
+
+    # Every caller sees the failure, so nothing may have been committed
+    for op in group:
+        with pytest.raises(Crash):
+            op.future.result()
+    assert _contents(db) == []
+
+
+def test_queued_writes_are_stored_once(db):
+    writer = WriteCoordinator(db)
+    try:
+        futures = [writer.submit("remember", text=f"note {i}", importance=0.5,
+                                 memory_type="episodic") for i in range(20)]
+        for f in futures:
+            f.result(timeout=30)
+    finally:
+        writer.close()
+    assert _contents(db) == sorted(f"note {i}" for i in range(20))